@@ -0,0 +1,216 @@
+"""
+エージェント同時実行ベンチマーク
+
+外部API（GCS・SerpApi・Gemini）を固定レイテンシのスタブに置き換え、
+同時リクエスト数を増やしたときのスループットとレイテンシを計測する。
+
+- legacy: 旧実装の再現（vision_nodeはスレッド + asyncio.run、
+  search/priceは同期invokeでワーカースレッドをブロック）
+- native: 現行実装（全ノードがサーバーのイベントループ上で動作）
+
+使い方:
+    uv run python benchmarks/bench_agent_concurrency.py
+    uv run python benchmarks/bench_agent_concurrency.py --levels 1 16 64 128 --llm-latency 0.2
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import io
+import os
+import statistics
+import threading
+import time
+
+# 設定の必須項目をダミー値で埋める（.envがなくても実行できるように）
+os.environ.setdefault("GCP_PROJECT_ID", "bench-project")
+os.environ.setdefault("GCP_LOCATION", "us-central1")
+os.environ.setdefault("MODEL_VISION_NODE", "gemini-2.5-flash")
+os.environ.setdefault("MODEL_SEARCH_NODE", "gemini-2.5-flash")
+os.environ.setdefault("SERPAPI_API_KEY", "bench")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# パイプライン自体を計測するため結果キャッシュは無効化
+os.environ.setdefault("APPRAISAL_CACHE_ENABLED", "false")
+os.environ.setdefault("SERPAPI_CACHE_ENABLED", "false")
+os.environ.setdefault("SINGLEFLIGHT_ENABLED", "false")
+os.environ.setdefault("SEARCH_FAST_PATH_ENABLED", "false")
+os.environ.setdefault("SEARCH_CACHE_ENABLED", "false")
+os.environ.setdefault("PRICE_CACHE_ENABLED", "false")
+
+import json  # noqa: E402
+
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+from langchain_google_genai import ChatGoogleGenerativeAI  # noqa: E402
+from langgraph.graph import END, START, StateGraph  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from backend.core.image import ImagePayload  # noqa: E402
+from backend.core.logging import setup_logging  # noqa: E402
+from backend.core.serpapi import serpapi_client  # noqa: E402
+from backend.core.storage import storage_client  # noqa: E402
+from backend.features.agent import graph  # noqa: E402
+from backend.features.agent.price import node as price_module  # noqa: E402
+from backend.features.agent.search import node as search_module  # noqa: E402
+from backend.features.agent.state import AgentState  # noqa: E402
+from backend.features.agent.vision import node as vision_module  # noqa: E402
+from backend.features.agent.vision.serpapi_schema import (  # noqa: E402
+    GoogleLensKnowledgeGraph,
+    GoogleLensResponse,
+    GoogleLensVisualMatch,
+)
+
+# 全スキーマ（SearchAnalysis / PriceAnalysis）を満たすスタブ応答
+FAKE_LLM_PAYLOAD = json.dumps(
+    {
+        "classification": "mass_product",
+        "confidence": "high",
+        "reasoning": "bench",
+        "identified_product": "NIKE Air Max 90, 白",
+        "min_price": 8000,
+        "max_price": 12000,
+        "display_message": "bench",
+        "price_factors": None,
+    },
+    ensure_ascii=False,
+)
+
+
+def install_stubs(gcs_latency: float, lens_latency: float, llm_latency: float) -> None:
+    """外部API呼び出しを固定レイテンシのスタブに置き換える"""
+
+    async def fake_upload(*args, **kwargs) -> str:
+        await asyncio.sleep(gcs_latency)
+        return "https://storage.example.com/bench.jpg"
+
+    async def fake_lens(*args, **kwargs) -> GoogleLensResponse:
+        await asyncio.sleep(lens_latency)
+        return GoogleLensResponse(
+            status="Success",
+            visual_matches=[
+                GoogleLensVisualMatch(position=i, title="NIKE Air Max 90", source="mercari")
+                for i in range(5)
+            ],
+            knowledge_graph=GoogleLensKnowledgeGraph(title="NIKE Air Max 90"),
+        )
+
+    def result() -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=FAKE_LLM_PAYLOAD))])
+
+    async def fake_agenerate(self, *args, **kwargs) -> ChatResult:
+        await asyncio.sleep(llm_latency)
+        return result()
+
+    def fake_generate(self, *args, **kwargs) -> ChatResult:
+        time.sleep(llm_latency)
+        return result()
+
+    storage_client.upload_temp_image_for_serpapi = fake_upload
+    serpapi_client.search_by_image_url = fake_lens
+    ChatGoogleGenerativeAI._agenerate = fake_agenerate
+    ChatGoogleGenerativeAI._generate = fake_generate
+
+
+def build_legacy_app():
+    """旧実装と同じ実行形態のグラフを構築する"""
+
+    def legacy_vision_node(state: AgentState) -> dict:
+        # 旧実装: リクエストごとにスレッドと専用イベントループを起動
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            future = executor.submit(asyncio.run, vision_module._vision_node_async(state))
+            return future.result()
+
+    def legacy_search_node(state: AgentState) -> dict:
+        # 旧実装: 同期invokeでワーカースレッドをノード完了までブロック
+        return asyncio.run(search_module.search_node(state))
+
+    def legacy_price_node(state: AgentState) -> dict:
+        return asyncio.run(price_module.price_node(state))
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("node_vision", legacy_vision_node)
+    workflow.add_node("node_search", legacy_search_node)
+    workflow.add_node("node_price", legacy_price_node)
+    workflow.add_edge(START, "node_vision")
+    workflow.add_conditional_edges("node_vision", graph.should_search, {"search": "node_search", "end": END})
+    workflow.add_conditional_edges("node_search", graph.should_price, {"price": "node_price", "end": END})
+    workflow.add_edge("node_price", END)
+    return workflow.compile()
+
+
+def bench_image() -> ImagePayload:
+    """ベンチマーク用の小さなJPEG画像"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 30, 30)).save(buffer, format="JPEG")
+    return ImagePayload.from_bytes(buffer.getvalue())
+
+
+BENCH_IMAGE = bench_image()
+
+
+def initial_state() -> dict:
+    return graph.build_initial_state(BENCH_IMAGE)
+
+
+async def run_level(app, concurrency: int) -> dict:
+    """指定した同時実行数でリクエストを投げ、統計を返す"""
+    peak_threads = threading.active_count()
+    stop = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not stop.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    async def one_request() -> float:
+        start = time.perf_counter()
+        await app.ainvoke(initial_state())
+        return time.perf_counter() - start
+
+    sampler = asyncio.create_task(sample_threads())
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(one_request() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await sampler
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "wall": wall,
+        "throughput": concurrency / wall,
+        "p50": statistics.median(latencies),
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "threads": peak_threads,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 64, 128])
+    parser.add_argument("--gcs-latency", type=float, default=0.05)
+    parser.add_argument("--lens-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    setup_logging()
+    install_stubs(args.gcs_latency, args.lens_latency, args.llm_latency)
+
+    apps = {
+        "legacy": build_legacy_app(),
+        "native": graph.app,
+    }
+
+    print(f"{'mode':<8}{'conc':>6}{'wall(s)':>10}{'req/s':>10}{'p50(s)':>10}{'p95(s)':>10}{'threads':>9}")
+    for name, app in apps.items():
+        for level in args.levels:
+            stats = await run_level(app, level)
+            print(
+                f"{name:<8}{stats['concurrency']:>6}{stats['wall']:>10.2f}{stats['throughput']:>10.1f}"
+                f"{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['threads']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
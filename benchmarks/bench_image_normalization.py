@@ -0,0 +1,143 @@
+"""
+画像正規化ベンチマーク
+
+外部API（SerpApi用のGCS一時画像・Geminiのガードレール）に渡す画像について、
+正規化前後のバイト数・解像度と、正規化の各段階（デコード・向き補正・縮小・
+エンコード）の処理時間を計測する。アップロード時間とGeminiの画像トークン数は
+帯域・タイル数からの推定値。
+
+使い方:
+    uv run python benchmarks/bench_image_normalization.py
+    uv run python benchmarks/bench_image_normalization.py --images photo1.jpg photo2.jpg --max-edge 768
+"""
+
+import argparse
+import io
+import math
+import os
+import statistics
+import time
+
+# 設定の必須項目をダミー値で埋める（.envがなくても実行できるように）
+os.environ.setdefault("GCP_PROJECT_ID", "bench-project")
+os.environ.setdefault("GCP_LOCATION", "us-central1")
+os.environ.setdefault("MODEL_VISION_NODE", "gemini-2.5-flash")
+os.environ.setdefault("MODEL_SEARCH_NODE", "gemini-2.5-flash")
+os.environ.setdefault("SERPAPI_API_KEY", "bench")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from PIL import Image  # noqa: E402
+
+from backend.core.image import (  # noqa: E402
+    ImagePayload,
+    apply_orientation,
+    downscale,
+    encode_jpeg,
+    normalize_image,
+    open_for_normalize,
+)
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(__file__), "..", "test_images", "sample_shoe.jpg")
+
+# Geminiは768x768のタイルごとに258トークンとして画像を数える
+GEMINI_TILE_SIZE = 768
+GEMINI_TOKENS_PER_TILE = 258
+
+
+def phone_photo() -> tuple[str, bytes]:
+    """スマートフォン写真を模した画像（4032x3024、EXIFで90度回転）"""
+    img = Image.effect_noise((4032, 3024), 64).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: 90度回転
+    exif[0x010F] = "bench-phone"  # Make
+    output = io.BytesIO()
+    img.save(output, format="JPEG", quality=92, exif=exif)
+    return "synthetic phone photo (EXIF rotated)", output.getvalue()
+
+
+def gemini_tokens(width: int, height: int) -> int:
+    """画像トークン数の推定"""
+    if width <= 384 and height <= 384:
+        return GEMINI_TOKENS_PER_TILE
+    return math.ceil(width / GEMINI_TILE_SIZE) * math.ceil(height / GEMINI_TILE_SIZE) * GEMINI_TOKENS_PER_TILE
+
+
+def upload_ms(size_bytes: int, uplink_mbps: float) -> float:
+    """アップロード時間の推定（ミリ秒）"""
+    return size_bytes * 8 / (uplink_mbps * 1_000_000) * 1000
+
+
+def time_stages(image: ImagePayload, max_edge: int, quality: int) -> dict[str, float]:
+    """正規化の各段階の処理時間（ミリ秒）"""
+    timings: dict[str, float] = {}
+
+    started = time.perf_counter()
+    img = open_for_normalize(image, max_edge)
+    img.load()
+    timings["decode"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    img = apply_orientation(img)
+    timings["orient"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    img = downscale(img, max_edge)
+    timings["downscale"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    encode_jpeg(img, quality)
+    timings["encode"] = (time.perf_counter() - started) * 1000
+
+    return timings
+
+
+def bench(label: str, data: bytes, args: argparse.Namespace) -> None:
+    original = ImagePayload.from_bytes(data)
+    normalized = normalize_image(original, args.max_edge, args.quality)
+
+    runs = [time_stages(original, args.max_edge, args.quality) for _ in range(args.repeat)]
+    totals = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        normalize_image(original, args.max_edge, args.quality)
+        totals.append((time.perf_counter() - started) * 1000)
+
+    saved = original.size_bytes - normalized.size_bytes
+    print(f"\n== {label}")
+    print(
+        f"{'':>12} {'size':>11} {'bytes':>10} {'upload_ms':>10} {'gemini_tok':>10}"
+    )
+    for name, image in (("original", original), ("normalized", normalized)):
+        print(
+            f"{name:>12} {f'{image.width}x{image.height}':>11} {image.size_bytes:>10} "
+            f"{upload_ms(image.size_bytes, args.uplink_mbps):>10.1f} "
+            f"{gemini_tokens(image.width, image.height):>10}"
+        )
+    print(f"bytes saved: {saved} ({saved / original.size_bytes:.1%})")
+    print("stage latency (median ms): " + ", ".join(
+        f"{stage}={statistics.median(run[stage] for run in runs):.1f}" for stage in runs[0]
+    ))
+    print(f"normalize_image total: median={statistics.median(totals):.1f}ms max={max(totals):.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", nargs="*", default=[DEFAULT_IMAGE], help="計測する画像ファイル")
+    parser.add_argument("--max-edge", type=int, default=1024, help="長辺の上限（px）")
+    parser.add_argument("--quality", type=int, default=85, help="JPEG画質")
+    parser.add_argument("--uplink-mbps", type=float, default=20.0, help="アップロード帯域の想定（Mbps）")
+    parser.add_argument("--repeat", type=int, default=5, help="繰り返し回数")
+    args = parser.parse_args()
+
+    print(f"max_edge={args.max_edge} quality={args.quality} uplink={args.uplink_mbps}Mbps repeat={args.repeat}")
+    inputs = [phone_photo()]
+    for path in args.images:
+        with open(path, "rb") as image_file:
+            inputs.append((os.path.basename(path), image_file.read()))
+
+    for label, data in inputs:
+        bench(label, data, args)
+
+
+if __name__ == "__main__":
+    main()
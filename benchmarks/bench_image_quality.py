@@ -0,0 +1,114 @@
+"""
+画像品質ゲートのベンチマーク
+
+サンプル画像と、そこから作ったブレ・暗い・白っぽい・商品が小さい写真、
+白背景の商品写真（背景が白とびしていても通ること）について、
+品質の計測値（シャープネス・平均輝度・黒つぶれ/白とびの割合・被写体の占有率）と
+計測時間、ゲートの判定を表示する。しきい値（IMAGE_QUALITY_*）の調整に使う。
+
+入力は査定時と同じく正規化済み（長辺1024px）の画像。
+
+使い方:
+    uv run python benchmarks/bench_image_quality.py
+    uv run python benchmarks/bench_image_quality.py --images photo1.jpg --analysis-edge 512
+"""
+
+import argparse
+import io
+import os
+import statistics
+import time
+
+# 設定の必須項目をダミー値で埋める（.envがなくても実行できるように）
+os.environ.setdefault("GCP_PROJECT_ID", "bench-project")
+os.environ.setdefault("GCP_LOCATION", "us-central1")
+os.environ.setdefault("MODEL_VISION_NODE", "gemini-2.5-flash")
+os.environ.setdefault("MODEL_SEARCH_NODE", "gemini-2.5-flash")
+os.environ.setdefault("SERPAPI_API_KEY", "bench")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from backend.core.image import ImagePayload, InvalidImageError, normalize_image  # noqa: E402
+from backend.core.image_quality import ImageQualityGate, measure_quality  # noqa: E402
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(__file__), "..", "test_images", "sample_shoe.jpg")
+
+
+def encode(img: Image.Image) -> bytes:
+    output = io.BytesIO()
+    img.convert("RGB").save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+def variants(data: bytes) -> list[tuple[str, bytes]]:
+    """元画像と、品質を落とした写真の組"""
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("RGB", (1500, 1500))
+        base = img.convert("RGB")
+
+    small = Image.new("RGB", (1024, 768), (230, 230, 230))
+    subject = base.copy()
+    subject.thumbnail((120, 120))
+    small.paste(subject, (450, 300))
+
+    # 白背景（255で白とび）に置いた、テクスチャのある商品
+    on_white = Image.new("RGB", (1024, 768), (255, 255, 255))
+    product_mask = Image.new("L", on_white.size, 0)
+    ImageDraw.Draw(product_mask).ellipse((200, 150, 824, 618), fill=255)
+    on_white.paste(Image.effect_noise(on_white.size, 48).convert("RGB"), mask=product_mask)
+
+    return [
+        ("original", data),
+        ("blur r=5", encode(base.filter(ImageFilter.GaussianBlur(5)))),
+        ("blur r=10", encode(base.filter(ImageFilter.GaussianBlur(10)))),
+        ("dark", encode(Image.eval(base, lambda v: v // 10))),
+        ("washed out", encode(Image.eval(base, lambda v: min(255, v + 200)))),
+        ("small subject", encode(small)),
+        ("product on white", encode(on_white)),
+    ]
+
+
+def bench(label: str, data: bytes, args: argparse.Namespace, gate: ImageQualityGate) -> None:
+    image = normalize_image(ImagePayload.from_bytes(data), 1024, 85)
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        report = measure_quality(image, args.analysis_edge)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    try:
+        gate.evaluate(report)
+        verdict = "pass"
+    except InvalidImageError as e:
+        verdict = f"reject: {e.retry_advice}"
+
+    coverage = "-" if report.coverage is None else f"{report.coverage:.3f}"
+    print(
+        f"{label:>16} {report.sharpness:>9.1f} {report.brightness:>7.1f} "
+        f"{report.clipped_ratio:>7.3f} {coverage:>8} "
+        f"{statistics.median(timings):>7.1f}  {verdict}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", nargs="*", default=[DEFAULT_IMAGE], help="計測する画像ファイル")
+    parser.add_argument("--analysis-edge", type=int, default=384, help="計測に使う縮小画像の長辺（px）")
+    parser.add_argument("--repeat", type=int, default=10, help="繰り返し回数")
+    args = parser.parse_args()
+
+    gate = ImageQualityGate()
+    print(f"analysis_edge={args.analysis_edge} repeat={args.repeat}")
+    for path in args.images:
+        with open(path, "rb") as image_file:
+            data = image_file.read()
+        print(f"\n== {os.path.basename(path)}")
+        print(f"{'':>16} {'sharpness':>9} {'bright':>7} {'clipped':>7} {'coverage':>8} {'ms':>7}  verdict")
+        for label, variant in variants(data):
+            bench(label, variant, args, gate)
+    print(f"\nrejected: {gate.stats()['rejected']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+ストレージ同時実行ベンチマーク
+
+バケットを使わずに、査定1件分のストレージ操作（SerpApi用の一時画像アップロード +
+ユーザー画像の保存）を同時に実行したときのスループット・レイテンシと、
+イベントループの遅延を計測する。
+
+- blocking: 旧実装の再現（async def 内で同期のアップロードを呼び、イベントループをブロック）
+- memory: MemoryStorageBackend（固定レイテンシの非同期操作）
+- filesystem: FilesystemStorageBackend（一時ディレクトリへの実書き込み）
+
+使い方:
+    uv run python benchmarks/bench_storage_concurrency.py
+    uv run python benchmarks/bench_storage_concurrency.py --levels 1 16 64 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+# 設定の必須項目をダミー値で埋める（.envがなくても実行できるように）
+os.environ.setdefault("GCP_PROJECT_ID", "bench-project")
+os.environ.setdefault("GCP_LOCATION", "us-central1")
+os.environ.setdefault("MODEL_VISION_NODE", "gemini-2.5-flash")
+os.environ.setdefault("MODEL_SEARCH_NODE", "gemini-2.5-flash")
+os.environ.setdefault("SERPAPI_API_KEY", "bench")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import hashlib  # noqa: E402
+
+from backend.core.image import ImagePayload  # noqa: E402
+from backend.core.storage import StorageClient  # noqa: E402
+from backend.core.storage_backends import (  # noqa: E402
+    FilesystemStorageBackend,
+    MemoryStorageBackend,
+    StorageBackend,
+)
+
+
+class BlockingStorageBackend(MemoryStorageBackend):
+    """旧実装の再現（同期のHTTP呼び出しがイベントループをブロックする）"""
+
+    name = "blocking"
+
+    async def _wait(self) -> None:
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+
+def bench_image(size: int, index: int) -> ImagePayload:
+    """リクエストごとに内容の異なる画像（ヘッダの解析を省くため直接生成）"""
+    data = index.to_bytes(8, "big") * (size // 8)
+    return ImagePayload(
+        data=data,
+        mime_type="image/jpeg",
+        width=1024,
+        height=768,
+        sha256=hashlib.sha256(data).hexdigest(),
+    )
+
+
+async def appraisal_storage(client: StorageClient, image: ImagePayload, index: int) -> float:
+    """査定1件分のストレージ操作（一時画像 + 保存）にかかった時間"""
+    started = time.perf_counter()
+    await client.upload_temp_image_for_serpapi(image)
+    await client.upload_image("bench-user", f"appraisal-{index}", image)
+    return time.perf_counter() - started
+
+
+async def measure_lag(stop: asyncio.Event, lags: list[float]) -> None:
+    """イベントループの遅延（sleepの超過時間）を計測"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append(time.perf_counter() - started - 0.005)
+
+
+async def run_level(backend: StorageBackend, concurrency: int, image_size: int) -> dict:
+    client = StorageClient(backend=backend)
+    stop = asyncio.Event()
+    lags: list[float] = []
+    probe = asyncio.create_task(measure_lag(stop, lags))
+
+    started = time.perf_counter()
+    durations = await asyncio.gather(
+        *(appraisal_storage(client, bench_image(image_size, i), i) for i in range(concurrency))
+    )
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    await client.close()
+    durations = sorted(durations)
+    return {
+        "rps": concurrency / elapsed,
+        "p50": statistics.median(durations),
+        "p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        "max_lag": max(lags, default=0.0),
+        "stats": client.stats(),
+    }
+
+
+def patch_signing(backend: StorageBackend) -> StorageBackend:
+    """署名付きURL生成を固定値にする（鍵なしで実行できるように）"""
+    backend.generate_signed_url = lambda path, expiration: f"https://bench/{path}"  # type: ignore[method-assign]
+    return backend
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="*", default=[1, 8, 32, 64], help="同時実行数")
+    parser.add_argument("--latency", type=float, default=0.05, help="ストレージ操作1回のレイテンシ（秒）")
+    parser.add_argument("--image-kb", type=int, default=80, help="画像サイズ（KB）")
+    args = parser.parse_args()
+
+    print(f"latency={args.latency}s image={args.image_kb}KB")
+    print(f"{'backend':>10} {'conc':>5} {'req/s':>8} {'p50_ms':>8} {'p95_ms':>8} {'max_lag_ms':>10}")
+
+    with tempfile.TemporaryDirectory() as root:
+        factories = {
+            "blocking": lambda: BlockingStorageBackend(latency=args.latency),
+            "memory": lambda: MemoryStorageBackend(latency=args.latency),
+            "filesystem": lambda: FilesystemStorageBackend(root),
+        }
+        for name, factory in factories.items():
+            for level in args.levels:
+                result = await run_level(patch_signing(factory()), level, args.image_kb * 1024)
+                print(
+                    f"{name:>10} {level:>5} {result['rps']:>8.1f} {result['p50'] * 1000:>8.1f} "
+                    f"{result['p95'] * 1000:>8.1f} {result['max_lag'] * 1000:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 
+from backend.core.image import ImagePayload, normalize_for_analysis
 from backend.core.logging import get_logger
 from backend.features.agent.graph import (
     run_agent,
@@ -50,10 +51,27 @@ async def test_agent(request: AgentTestRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-import base64
-import mimetypes
 import os
 
+
+async def _load_image(request: AgentVisionRequest) -> ImagePayload:
+    """
+    リクエストの画像を読み込み、外部API用に正規化する
+
+    file_path が指定された場合はファイルのバイナリをそのまま使い、Base64を経由しない。
+    """
+    if request.file_path:
+        if not os.path.exists(request.file_path):
+            raise HTTPException(status_code=400, detail=f"File not found: {request.file_path}")
+        with open(request.file_path, "rb") as image_file:
+            image = ImagePayload.from_bytes(image_file.read())
+    elif request.image_data:
+        image = ImagePayload.from_base64(request.image_data)
+    else:
+        raise HTTPException(status_code=400, detail="Either image_data or file_path must be provided")
+    return await normalize_for_analysis(image)
+
+
 @router.post("/agent/vision_test")
 async def test_vision_agent(request: AgentVisionRequest):
     """
@@ -62,26 +80,10 @@ async def test_vision_agent(request: AgentVisionRequest):
     - image_data (Base64) か file_path (サーバー上のパス) のどちらかを指定してください。
     """
     try:
-        image_content = request.image_data
-
-        if request.file_path:
-            # ファイルパスが指定された場合、ファイルを読み込んでBase64に変換
-            if not os.path.exists(request.file_path):
-                raise HTTPException(status_code=400, detail=f"File not found: {request.file_path}")
-            
-            mime_type, _ = mimetypes.guess_type(request.file_path)
-            if not mime_type:
-                mime_type = "image/jpeg" # Default
-
-            with open(request.file_path, "rb") as image_file:
-                encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-                image_content = f"data:{mime_type};base64,{encoded_string}"
-        
-        if not image_content:
-             raise HTTPException(status_code=400, detail="Either image_data or file_path must be provided")
+        image = await _load_image(request)
 
         # 画像データを渡してエージェント実行
-        result = await run_vision_agent(image_content)
+        result = await run_vision_agent(image)
         return result
     except Exception as e:
         logger.error(f"Vision agent error: {e}", exc_info=True)
@@ -98,28 +100,9 @@ async def test_search_agent(request: AgentVisionRequest):
     - それ以外の場合: vision分析のみ実行（search_outputはNone）
     """
     try:
-        image_content = request.image_data
-
-        if request.file_path:
-            if not os.path.exists(request.file_path):
-                raise HTTPException(
-                    status_code=400, detail=f"File not found: {request.file_path}"
-                )
+        image = await _load_image(request)
 
-            mime_type, _ = mimetypes.guess_type(request.file_path)
-            if not mime_type:
-                mime_type = "image/jpeg"
-
-            with open(request.file_path, "rb") as image_file:
-                encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
-                image_content = f"data:{mime_type};base64,{encoded_string}"
-
-        if not image_content:
-            raise HTTPException(
-                status_code=400, detail="Either image_data or file_path must be provided"
-            )
-
-        result = await run_search_agent(image_content)
+        result = await run_search_agent(image)
         return result
     except Exception as e:
         logger.error(f"Search agent error: {e}", exc_info=True)
@@ -136,28 +119,9 @@ async def test_price_agent(request: AgentVisionRequest):
     - それ以外の場合: price_outputはNone
     """
     try:
-        image_content = request.image_data
-
-        if request.file_path:
-            if not os.path.exists(request.file_path):
-                raise HTTPException(
-                    status_code=400, detail=f"File not found: {request.file_path}"
-                )
-
-            mime_type, _ = mimetypes.guess_type(request.file_path)
-            if not mime_type:
-                mime_type = "image/jpeg"
-
-            with open(request.file_path, "rb") as image_file:
-                encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
-                image_content = f"data:{mime_type};base64,{encoded_string}"
-
-        if not image_content:
-            raise HTTPException(
-                status_code=400, detail="Either image_data or file_path must be provided"
-            )
+        image = await _load_image(request)
 
-        result = await run_price_agent(image_content)
+        result = await run_price_agent(image)
         return result
     except Exception as e:
         logger.error(f"Price agent error: {e}", exc_info=True)
@@ -2,14 +2,24 @@ import asyncio
 import json
 import time
 import uuid
-from typing import Literal, Optional
+from typing import AsyncGenerator, Literal, Optional, get_args
 
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
 
+from backend.core.config import settings
 from backend.core.firebase import AuthError, get_current_user_id
 from backend.core.firestore import firestore_client
+from backend.core.image import (
+    ImagePayload,
+    InvalidImageError,
+    normalize_for_analysis,
+    validate_image,
+)
+from backend.core.image_quality import image_quality_gate
 from backend.core.logging import get_logger
 from backend.core.storage import storage_client
 from backend.features.agent.graph import (
@@ -22,6 +32,24 @@ logger = get_logger(__name__)
 
 router = APIRouter()
 
+# クライアント切断を確認する間隔（秒）
+DISCONNECT_POLL_SECONDS = 0.5
+
+# multipart/form-data のヘッダ・境界文字列・フォームフィールド分の余裕（バイト）
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Base64文字列のdata URIプレフィックス・パディング分の余裕（文字数）
+BASE64_OVERHEAD_CHARS = 256
+
+# SSEレスポンスのヘッダ
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # nginx でバッファリングを無効化
+}
+
+Platform = Literal["web", "ios", "android"]
+
 
 # --- Request/Response Models ---
 class AnalyzeRequest(BaseModel):
@@ -29,7 +57,7 @@ class AnalyzeRequest(BaseModel):
 
     image_base64: str = Field(..., description="Base64 encoded image string")
     user_comment: str = Field(default="", description="Optional user comment")
-    platform: Literal["web", "ios", "android"] = Field(
+    platform: Platform = Field(
         default="web", description="Client platform"
     )
 
@@ -41,6 +69,9 @@ class PriceInfo(BaseModel):
     max_price: int = Field(..., description="Maximum price in JPY")
     currency: str = Field(default="JPY")
     display_message: str = Field(..., description="Message to display to user")
+    from_cache: bool = Field(
+        default=False, description="Whether the price was served from the price cache or shared from a concurrent request"
+    )
 
 
 class ConfidenceInfo(BaseModel):
@@ -89,6 +120,7 @@ class AnalyzeResponse(BaseModel):
 @router.post("/analyze", response_model=AnalyzeResponse)
 async def analyze_image(
     request: AnalyzeRequest,
+    http_request: Request,
     authorization: Optional[str] = Header(None, description="Bearer token"),
 ):
     """
@@ -96,23 +128,60 @@ async def analyze_image(
 
     - 認証済みユーザーの場合: 査定結果をFirestoreに保存
     - 未認証の場合: 査定のみ実行（保存なし）
+    - 査定できない画像の場合: 外部APIを呼ばずに unknown を返す
     """
-    user_id: Optional[str] = None
+    user_id = await _authenticate(authorization, request.platform)
 
-    # 認証処理（オプション）
-    if authorization:
-        try:
-            user_id = await get_current_user_id(authorization)
-            # ユーザードキュメントを取得または作成
-            await firestore_client.get_or_create_user(user_id, request.platform)
-            logger.info(f"Authenticated user: {user_id}")
-        except AuthError as e:
-            logger.warning(f"Auth failed: {e.code} - {e.message}")
-            raise HTTPException(status_code=401, detail=e.message)
+    # 画像はここで一度だけデコードし、以降は参照を渡す
+    try:
+        image = _decode_image(request.image_base64)
+    except InvalidImageError as e:
+        return _rejected_response(e)
+
+    return await _run_analysis(http_request, image, user_id, request.user_comment)
+
+
+async def _authenticate(authorization: Optional[str], platform: str) -> Optional[str]:
+    """
+    認証処理（オプション）
+
+    Returns:
+        認証済みの場合はユーザーID、未認証の場合はNone
+    """
+    if not authorization:
+        return None
 
     try:
+        user_id = await get_current_user_id(authorization)
+        # ユーザードキュメントを取得または作成
+        await firestore_client.get_or_create_user(user_id, platform)
+        logger.info(f"Authenticated user: {user_id}")
+        return user_id
+    except AuthError as e:
+        logger.warning(f"Auth failed: {e.code} - {e.message}")
+        raise HTTPException(status_code=401, detail=e.message)
+
+
+async def _run_analysis(
+    http_request: Request,
+    image: ImagePayload,
+    user_id: Optional[str],
+    user_comment: str,
+) -> AnalyzeResponse:
+    """査定を実行し、認証済みユーザーの場合は結果を保存する"""
+    try:
+        # 外部APIへの送信・保存には正規化済み（縮小・メタデータ除去）の画像を使う
+        analysis_image = await normalize_for_analysis(image)
+
+        # ブレ・暗さ・構図が基準を下回る写真は外部APIを呼ばずに再撮影を促す
+        await image_quality_gate.check(analysis_image)
+
         # エージェント実行（vision → search → price）
-        result = await run_price_agent(image_data=request.image_base64)
+        # クライアントが切断した場合は実行中のノードごとキャンセルする
+        result = await _cancel_on_disconnect(
+            http_request,
+            run_price_agent(analysis_image),
+        )
 
         analysis_result = result.get("analysis_result")
         search_output = result.get("search_output")
@@ -126,18 +195,10 @@ async def analyze_image(
             # 査定IDを先に生成
             appraisal_id = str(uuid.uuid4())
 
-            # 画像をCloud Storageにアップロード
-            image_path = None
-            try:
-                image_path = await storage_client.upload_image(
-                    user_id=user_id,
-                    appraisal_id=appraisal_id,
-                    image_base64=request.image_base64,
-                )
-                logger.info(f"Uploaded image: {image_path}")
-            except Exception as e:
-                logger.warning(f"Failed to upload image: {e}")
-                # 画像アップロード失敗でも査定は続行
+            # 画像とサムネイルをCloud Storageにアップロード
+            image_path, image_renditions = await _upload_appraisal_image(
+                user_id, appraisal_id, analysis_image
+            )
 
             await firestore_client.save_appraisal(
                 user_id=user_id,
@@ -146,18 +207,222 @@ async def analyze_image(
                 search_result=search_output.model_dump() if search_output else None,
                 price_result=price_output.model_dump() if price_output else None,
                 image_path=image_path,
-                user_comment=request.user_comment or None,
+                image_renditions=image_renditions,
+                user_comment=user_comment or None,
             )
             response.appraisal_id = appraisal_id
             logger.info(f"Saved appraisal: {appraisal_id}")
 
         return response
 
+    except InvalidImageError as e:
+        return _rejected_response(e)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Analyze endpoint error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+async def _upload_appraisal_image(
+    user_id: str,
+    appraisal_id: str,
+    image: ImagePayload,
+) -> tuple[Optional[str], dict[str, str]]:
+    """
+    査定画像と縮小版（サムネイル）を並行してアップロード
+
+    アップロードに失敗しても査定の保存は続行する。
+
+    Returns:
+        (画像のパス, 長辺サイズ → 縮小版のパス)
+    """
+    upload, renditions = await asyncio.gather(
+        storage_client.upload_image(
+            user_id=user_id,
+            appraisal_id=appraisal_id,
+            image=image,
+        ),
+        storage_client.upload_renditions(
+            user_id=user_id,
+            appraisal_id=appraisal_id,
+            image=image,
+        ),
+        return_exceptions=True,
+    )
+
+    image_path = None
+    if isinstance(upload, BaseException):
+        logger.warning(f"Failed to upload image: {upload}")
+    else:
+        image_path = upload
+        logger.info(f"Uploaded image: {image_path}")
+
+    if isinstance(renditions, BaseException):
+        logger.warning(f"Failed to upload image renditions: {renditions}")
+        renditions = {}
+    return image_path, renditions
+
+
+async def _read_body_stream(
+    http_request: Request,
+    max_bytes: int,
+) -> AsyncGenerator[bytes, None]:
+    """リクエストボディを逐次読み込み、上限を超えた時点で413を返す"""
+    content_length = http_request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail="Image too large")
+
+    received = 0
+    async for chunk in http_request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(status_code=413, detail="Image too large")
+        yield chunk
+
+
+async def _read_upload(http_request: Request) -> tuple[bytes, dict[str, str]]:
+    """
+    バイナリアップロードから画像とフォームフィールドを読み込む
+
+    - multipart/form-data: image フィールドの画像と、その他の文字列フィールド
+    - image/*: リクエストボディ全体が画像
+
+    Returns:
+        (画像バイナリ, フォームフィールド)
+    """
+    content_type = http_request.headers.get("content-type", "").lower()
+
+    if content_type.startswith("image/"):
+        buffer = bytearray()
+        async for chunk in _read_body_stream(http_request, settings.MAX_UPLOAD_BYTES):
+            buffer += chunk
+        return bytes(buffer), {}
+
+    if content_type.startswith("multipart/form-data"):
+        parser = MultiPartParser(
+            http_request.headers,
+            _read_body_stream(http_request, settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES),
+            max_files=1,
+            max_fields=8,
+        )
+        try:
+            form = await parser.parse()
+        except MultiPartException as e:
+            raise HTTPException(status_code=400, detail=e.message)
+
+        try:
+            upload = form.get("image")
+            if not isinstance(upload, UploadFile):
+                raise HTTPException(status_code=400, detail="Missing 'image' file field")
+            data = await upload.read()
+            if len(data) > settings.MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="Image too large")
+            fields = {key: value for key, value in form.items() if isinstance(value, str)}
+        finally:
+            await form.close()
+        return data, fields
+
+    raise HTTPException(
+        status_code=415,
+        detail="Content-Type must be multipart/form-data or image/*",
+    )
+
+
+def _image_from_bytes(data: bytes) -> ImagePayload:
+    """
+    アップロードされた画像バイナリを読み込んで検証
+
+    Raises:
+        InvalidImageError: 画像として読めない、または査定できない場合
+    """
+    return validate_image(ImagePayload.from_bytes(data))
+
+
+def _upload_options(
+    fields: dict[str, str],
+    user_comment: str,
+    platform: str,
+) -> tuple[str, str]:
+    """フォームフィールド（multipart）があればクエリパラメータより優先する"""
+    user_comment = fields.get("user_comment", user_comment)
+    platform = fields.get("platform", platform)
+    if platform not in get_args(Platform):
+        raise HTTPException(status_code=400, detail=f"Invalid platform: {platform}")
+    return user_comment, platform
+
+
+def _decode_image(image_base64: str) -> ImagePayload:
+    """
+    リクエストの画像をデコードして検証
+
+    Raises:
+        InvalidImageError: 画像として読めない、または査定できない場合
+    """
+    # Base64はデコード後の約4/3倍。上限を超える場合はデコードせずに拒否する
+    if len(image_base64) > settings.MAX_UPLOAD_BYTES * 4 // 3 + BASE64_OVERHEAD_CHARS:
+        raise InvalidImageError(
+            f"ファイルサイズが大きすぎます: base64 {len(image_base64)} chars",
+            "画像のファイルサイズが大きすぎます。画像を縮小してから、もう一度お試しください",
+        )
+    return validate_image(ImagePayload.from_base64(image_base64))
+
+
+def _rejected_response(error: InvalidImageError) -> AnalyzeResponse:
+    """査定できない画像へのレスポンス（外部APIは呼び出さない）"""
+    logger.warning(f"Rejected image: {error}")
+    return AnalyzeResponse(
+        classification="unknown",
+        message="この画像は査定できません",
+        retry_advice=error.retry_advice,
+    )
+
+
+def _complete_event(response: AnalyzeResponse) -> str:
+    """査定結果の complete イベント（SSE形式）"""
+    complete_event = {
+        "type": "complete",
+        "result": response.model_dump(),
+        "timestamp": int(time.time() * 1000),
+    }
+    return f"data: {json.dumps(complete_event, ensure_ascii=False)}\n\n"
+
+
+def _stream_rejection(error: InvalidImageError) -> StreamingResponse:
+    """査定できない画像へのSSEレスポンス（complete イベントのみを即座に返す）"""
+
+    async def event_generator():
+        yield _complete_event(_rejected_response(error))
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+async def _cancel_on_disconnect(http_request: Request, coro):
+    """
+    クライアント切断時にエージェント実行をキャンセルする
+
+    ノードはすべてサーバーのイベントループ上で動作するため、
+    タスクをキャンセルすればSerpApi・LLM呼び出しまで即座に中断される。
+    """
+    task = asyncio.create_task(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info("Client disconnected, cancelling agent run")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client Closed Request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 def _build_response(
     analysis_result,
     search_output,
@@ -259,6 +524,7 @@ def _build_response(
             max_price=valuation.max_price,
             currency=valuation.currency,
             display_message=price_output.display_message,
+            from_cache=price_output.from_cache,
         ),
         confidence=ConfidenceInfo(
             level=valuation.confidence,
@@ -268,6 +534,33 @@ def _build_response(
     )
 
 
+@router.post("/analyze/binary", response_model=AnalyzeResponse)
+async def analyze_image_binary(
+    http_request: Request,
+    authorization: Optional[str] = Header(None, description="Bearer token"),
+    user_comment: str = Query(default="", description="Optional user comment"),
+    platform: Platform = Query(default="web", description="Client platform"),
+):
+    """
+    画像をバイナリのままアップロードしてAI鑑定を実行するエンドポイント
+
+    /analyze と同じ処理を、Base64を経由せずに実行する。
+
+    - multipart/form-data: image フィールドに画像（user_comment / platform はフォームでも指定可）
+    - image/*: リクエストボディが画像そのもの（user_comment / platform はクエリパラメータ）
+    """
+    data, fields = await _read_upload(http_request)
+    user_comment, platform = _upload_options(fields, user_comment, platform)
+
+    user_id = await _authenticate(authorization, platform)
+    try:
+        image = _image_from_bytes(data)
+    except InvalidImageError as e:
+        return _rejected_response(e)
+
+    return await _run_analysis(http_request, image, user_id, user_comment)
+
+
 # --- Streaming Endpoint ---
 
 
@@ -283,25 +576,41 @@ async def analyze_image_stream(
     各ノード（vision, search, price）の思考過程を行単位でストリーミングし、
     最後に complete イベントで査定結果を返します。
     """
-    user_id: Optional[str] = None
+    user_id = await _authenticate(authorization, request.platform)
 
-    # 認証処理（オプション）
-    if authorization:
-        try:
-            user_id = await get_current_user_id(authorization)
-            await firestore_client.get_or_create_user(user_id, request.platform)
-            logger.info(f"Authenticated user: {user_id}")
-        except AuthError as e:
-            logger.warning(f"Auth failed: {e.code} - {e.message}")
-            raise HTTPException(status_code=401, detail=e.message)
+    # 画像はここで一度だけデコードし、以降は参照を渡す
+    try:
+        image = _decode_image(request.image_base64)
+    except InvalidImageError as e:
+        return _stream_rejection(e)
+
+    return _stream_analysis(image, user_id, request.user_comment)
+
+
+def _stream_analysis(
+    image: ImagePayload,
+    user_id: Optional[str],
+    user_comment: str,
+) -> StreamingResponse:
+    """査定をSSEでストリーミングし、認証済みユーザーの場合は結果を保存する"""
 
     async def event_generator():
         """SSE イベントジェネレーター"""
         thinking_queue: asyncio.Queue = asyncio.Queue()
 
+        # 外部APIへの送信・保存には正規化済み（縮小・メタデータ除去）の画像を使う
+        analysis_image = await normalize_for_analysis(image)
+
+        # ブレ・暗さ・構図が基準を下回る写真は外部APIを呼ばずに再撮影を促す
+        try:
+            await image_quality_gate.check(analysis_image)
+        except InvalidImageError as e:
+            yield _complete_event(_rejected_response(e))
+            return
+
         # エージェント実行タスクを開始
         agent_task = asyncio.create_task(
-            stream_price_agent_with_thinking(request.image_base64, thinking_queue)
+            stream_price_agent_with_thinking(analysis_image, thinking_queue)
         )
 
         try:
@@ -373,16 +682,9 @@ async def analyze_image_stream(
             if user_id:
                 appraisal_id = str(uuid.uuid4())
 
-                image_path = None
-                try:
-                    image_path = await storage_client.upload_image(
-                        user_id=user_id,
-                        appraisal_id=appraisal_id,
-                        image_base64=request.image_base64,
-                    )
-                    logger.info(f"Uploaded image: {image_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to upload image: {e}")
+                image_path, image_renditions = await _upload_appraisal_image(
+                    user_id, appraisal_id, analysis_image
+                )
 
                 await firestore_client.save_appraisal(
                     user_id=user_id,
@@ -391,18 +693,14 @@ async def analyze_image_stream(
                     search_result=search_output.model_dump() if search_output else None,
                     price_result=price_output.model_dump() if price_output else None,
                     image_path=image_path,
-                    user_comment=request.user_comment or None,
+                    image_renditions=image_renditions,
+                    user_comment=user_comment or None,
                 )
                 response.appraisal_id = appraisal_id
                 logger.info(f"Saved appraisal: {appraisal_id}")
 
             # 完了イベントを送信
-            complete_event = {
-                "type": "complete",
-                "result": response.model_dump(),
-                "timestamp": int(time.time() * 1000),
-            }
-            yield f"data: {json.dumps(complete_event, ensure_ascii=False)}\n\n"
+            yield _complete_event(response)
 
         except Exception as e:
             logger.error(f"Streaming endpoint error: {e}", exc_info=True)
@@ -424,9 +722,30 @@ async def analyze_image_stream(
     return StreamingResponse(
         event_generator(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",  # nginx でバッファリングを無効化
-        },
+        headers=SSE_HEADERS,
     )
+
+
+@router.post("/analyze/stream/binary")
+async def analyze_image_stream_binary(
+    http_request: Request,
+    authorization: Optional[str] = Header(None, description="Bearer token"),
+    user_comment: str = Query(default="", description="Optional user comment"),
+    platform: Platform = Query(default="web", description="Client platform"),
+):
+    """
+    画像をバイナリのままアップロードしてAI鑑定を実行するストリーミングエンドポイント
+
+    /analyze/stream と同じSSEを、Base64を経由せずに配信する。
+    リクエスト形式は /analyze/binary と同じ。
+    """
+    data, fields = await _read_upload(http_request)
+    user_comment, platform = _upload_options(fields, user_comment, platform)
+
+    user_id = await _authenticate(authorization, platform)
+    try:
+        image = _image_from_bytes(data)
+    except InvalidImageError as e:
+        return _stream_rejection(e)
+
+    return _stream_analysis(image, user_id, user_comment)
@@ -1,18 +1,68 @@
-from typing import Optional
+import time
+from typing import Any, Optional
+from urllib.parse import urlencode
 
-from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import RedirectResponse
 
+from backend.core.config import settings
 from backend.core.firebase import AuthError, get_current_user_id
 from backend.core.firestore import firestore_client
+from backend.core.image_url import image_url_signer
 from backend.core.logging import get_logger
+from backend.core.storage import signed_url_min_remaining_seconds, storage_client
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
 
+def _image_endpoint(
+    base_url: str,
+    user_id: str,
+    appraisal_id: str,
+    size: Optional[int] = None,
+) -> str:
+    """
+    査定画像のリダイレクトエンドポイントの絶対URL
+
+    署名付きのクエリを付けるため、<img src> からBearerヘッダーなしで読み込める。
+    """
+    query = urlencode(image_url_signer.sign(user_id, appraisal_id, size))
+    return f"{base_url}{settings.API_V1_STR}/appraisals/{appraisal_id}/image?{query}"
+
+
+def _with_image_endpoint(
+    appraisal: dict[str, Any],
+    base_url: str,
+    user_id: str,
+) -> dict[str, Any]:
+    """
+    画像がある査定に image_url としてリダイレクトエンドポイントのURLを設定
+
+    履歴一覧用の縮小画像があればそのサイズを指定する。
+    Cloud Storageの署名は画像が実際に表示されるときに行う。
+    """
+    if appraisal.get("image_path") and appraisal.get("id"):
+        size = settings.IMAGE_HISTORY_RENDITION_SIZE
+        renditions = appraisal.get("image_renditions") or {}
+        appraisal["image_url"] = _image_endpoint(
+            base_url,
+            user_id,
+            appraisal["id"],
+            size if str(size) in renditions else None,
+        )
+    return appraisal
+
+
+def _public_base_url(request: Request) -> str:
+    """レスポンスに含める絶対URLのベース（末尾の / なし）"""
+    return (settings.API_PUBLIC_URL or str(request.base_url)).rstrip("/")
+
+
 @router.get("/appraisals")
 async def get_appraisal_history(
+    request: Request,
     limit: int = Query(default=20, ge=1, le=100, description="取得件数"),
     offset: int = Query(default=0, ge=0, description="スキップ件数"),
     authorization: Optional[str] = Header(None, description="Bearer token"),
@@ -35,7 +85,8 @@ async def get_appraisal_history(
             limit=limit,
             offset=offset,
         )
-        return appraisals
+        base_url = _public_base_url(request)
+        return [_with_image_endpoint(a, base_url, user_id) for a in appraisals]
     except Exception as e:
         logger.error(f"Failed to get appraisal history: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -75,6 +126,68 @@ async def get_appraisal(
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+@router.get("/appraisals/{appraisal_id}/image")
+async def get_appraisal_image(
+    appraisal_id: str,
+    size: Optional[int] = Query(default=None, ge=1, description="縮小画像の長辺サイズ（省略時は元画像）"),
+    uid: Optional[str] = Query(default=None, description="署名したユーザー（履歴の image_url）"),
+    expires: Optional[int] = Query(default=None, description="署名の有効期限（UNIX時刻）"),
+    signature: Optional[str] = Query(default=None, description="署名"),
+    authorization: Optional[str] = Header(None, description="Bearer token"),
+):
+    """
+    査定画像の署名付きURLへリダイレクトするエンドポイント
+
+    履歴の image_url に付いた署名（uid・expires・signature）か、Bearerトークンで認証する。
+    署名付きURLは画像が表示されるときに生成する（パスごとにキャッシュ）。
+    リダイレクトは、URLの残りの有効期間内でブラウザにキャッシュさせる。
+    """
+    if signature is not None:
+        if (
+            uid is None
+            or expires is None
+            or not image_url_signer.verify(uid, appraisal_id, size, expires, signature)
+        ):
+            raise HTTPException(status_code=403, detail="画像URLが無効か、有効期限が切れています")
+        user_id = uid
+    else:
+        if not authorization:
+            raise HTTPException(status_code=401, detail="認証が必要です")
+
+        try:
+            user_id = await get_current_user_id(authorization)
+        except AuthError as e:
+            logger.warning(f"Auth failed: {e.code} - {e.message}")
+            raise HTTPException(status_code=401, detail=e.message)
+
+    try:
+        image_path = await firestore_client.get_appraisal_image_path(
+            user_id=user_id,
+            appraisal_id=appraisal_id,
+            size=size,
+        )
+
+        if image_path is None:
+            raise HTTPException(status_code=404, detail="画像が見つかりません")
+
+        url = await storage_client.get_signed_url(image_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get appraisal image: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    max_age = int(signed_url_min_remaining_seconds(settings.GCS_IMAGE_EXPIRATION_MINUTES))
+    if expires is not None:
+        # 期限切れの画像URLがキャッシュから使われないようにする
+        max_age = max(0, min(max_age, int(expires - time.time())))
+    return RedirectResponse(
+        url,
+        status_code=302,
+        headers={"Cache-Control": f"private, max-age={max_age}"},
+    )
+
+
 @router.get("/users/me")
 async def get_current_user(
     authorization: Optional[str] = Header(None, description="Bearer token"),
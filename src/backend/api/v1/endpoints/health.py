@@ -6,7 +6,20 @@ from pydantic import BaseModel
 
 from backend.core.config import settings
 from backend.core.firestore import firestore_client
+from backend.core.image_pool import image_pool
+from backend.core.image_quality import image_quality_gate
+from backend.core.llm_pool import llm_pool
 from backend.core.logging import get_logger
+from backend.core.serpapi import serpapi_client
+from backend.core.serpapi_cache import lens_cache
+from backend.core.storage import storage_client
+from backend.features.agent.appraisal_cache import appraisal_cache
+from backend.features.agent.graph import appraisal_flight
+from backend.features.agent.price.cache import price_cache
+from backend.features.agent.price.concurrent import concurrent_price
+from backend.features.agent.search.cache import classification_cache
+from backend.features.agent.search.fast_path import search_fast_path
+from backend.features.agent.speculation import speculation_stats
 
 logger = get_logger(__name__)
 
@@ -18,6 +31,22 @@ class HealthResponse(BaseModel):
     version: str = "0.1.0"
 
 
+class MetricsResponse(BaseModel):
+    llm_pool: dict
+    image_pool: dict
+    image_quality: dict
+    appraisal_cache: dict
+    lens_cache: dict
+    serpapi: dict
+    classification_cache: dict
+    search_fast_path: dict
+    price_cache: dict
+    storage: dict
+    singleflight: dict
+    speculation: dict
+    concurrent_price: dict
+
+
 class FirestoreCheckResponse(BaseModel):
     status: str
     project_id: str | None = None
@@ -46,3 +75,28 @@ async def firestore_health_check():
         document_exists=result.get("document_exists"),
         error=result.get("error"),
     )
+
+
+@router.get("/health/metrics", response_model=MetricsResponse)
+async def metrics():
+    """
+    インスタンス内の共有リソースの統計
+    """
+    return MetricsResponse(
+        llm_pool=llm_pool.stats(),
+        image_pool=image_pool.stats(),
+        image_quality=image_quality_gate.stats(),
+        appraisal_cache=appraisal_cache.stats(),
+        lens_cache=lens_cache.stats(),
+        serpapi=serpapi_client.stats(),
+        classification_cache=classification_cache.stats(),
+        search_fast_path=search_fast_path.stats(),
+        price_cache=price_cache.stats(),
+        storage=storage_client.stats(),
+        singleflight={
+            "appraisal": appraisal_flight.stats(),
+            "price": price_cache.flight.stats(),
+        },
+        speculation=speculation_stats.stats(),
+        concurrent_price=concurrent_price.stats(),
+    )
@@ -0,0 +1,115 @@
+"""
+インメモリキャッシュモジュール
+
+TTL付きのLRUキャッシュ。各種結果キャッシュの共通基盤として使用する。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    TTL付きLRUキャッシュ
+
+    - 最大件数を超えると最も長く参照されていないエントリから削除
+    - エントリごとにTTLを上書き可能
+    - ヒット・ミス・削除数を統計として保持
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        on_evict: Optional[Callable[[Hashable, V], None]] = None,
+    ):
+        """
+        Args:
+            max_entries: 最大保持件数
+            ttl_seconds: デフォルトの有効期間（秒）
+            on_evict: エントリが削除（期限切れ・LRU追い出し）されたときのコールバック
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._on_evict = on_evict
+        self._entries: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """キーに対応する値を取得（期限切れ・存在しない場合はNone）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable) -> Optional[tuple[float, V]]:
+        """統計・LRU順序を変えずに (有効期限, 値) を取得（期限切れも含む）"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key: Hashable, value: V, ttl_seconds: Optional[float] = None) -> None:
+        """
+        値を保存
+
+        Args:
+            key: キー
+            value: 値
+            ttl_seconds: このエントリの有効期間（Noneの場合はデフォルト値）
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def delete(self, key: Hashable) -> None:
+        """エントリを削除"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """全エントリを削除"""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        _, value = self._entries.pop(key)
+        self.evictions += 1
+        if self._on_evict:
+            self._on_evict(key, value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, Any]:
+        """キャッシュの統計"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
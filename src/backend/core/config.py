@@ -7,6 +7,7 @@ class Settings(BaseSettings):
     # プロジェクト名
     PROJECT_NAME: str = "Ojoya API"
     API_V1_STR: str = "/api/v1"
+    API_PUBLIC_URL: Optional[str] = None  # レスポンスに含める絶対URLのベース（未設定時はリクエストのURL）
 
     # 環境設定
     ENVIRONMENT: str = "development"  # development, production
@@ -24,16 +25,124 @@ class Settings(BaseSettings):
 
     # SerpApi設定
     SERPAPI_API_KEY: str = ""  # .envで設定必須
-    SERPAPI_TIMEOUT_SECONDS: int = 30
+    SERPAPI_TIMEOUT_SECONDS: int = 30  # 読み取り・書き込みのタイムアウト
+    SERPAPI_CONNECT_TIMEOUT_SECONDS: float = 5.0  # 接続（TCP・TLS）のタイムアウト
+    SERPAPI_MAX_CONNECTIONS: int = 20  # 共有クライアントのコネクションプールの最大接続数
+    SERPAPI_KEEPALIVE_EXPIRY_SECONDS: float = 60.0  # アイドル接続を保持する時間
+    SERPAPI_HTTP2: bool = True  # HTTP/2を使う（h2パッケージがない場合はHTTP/1.1）
+
+    # SerpApiのリトライ・ヘッジ（全体でレイテンシ予算を超えない）
+    SERPAPI_LATENCY_BUDGET_SECONDS: float = 40.0  # リトライ・ヘッジを含めた全体の上限
+    SERPAPI_MAX_ATTEMPTS: int = 3  # 試行回数の上限（1でリトライなし）
+    SERPAPI_RETRY_BACKOFF_SECONDS: float = 0.5  # バックオフの初期値（試行ごとに倍、ジッター付き）
+    SERPAPI_RETRY_BACKOFF_MAX_SECONDS: float = 4.0  # バックオフの上限
+    SERPAPI_HEDGE_ENABLED: bool = False  # p95を過ぎたら2本目を送る（SerpApiの利用回数が増える）
+    SERPAPI_HEDGE_MIN_DELAY_SECONDS: float = 3.0  # ヘッジを送るまでの最短の待ち時間
+    SERPAPI_HEDGE_MIN_SAMPLES: int = 20  # p95の算出に必要なサンプル数（不足時は最短の待ち時間）
     SERPAPI_IMAGE_EXPIRATION_MINUTES: int = 5  # SerpApi用一時URL有効期限
 
+    # SerpApiレスポンスキャッシュ設定（画像のSHA-256 + 言語・国コードがキー）
+    SERPAPI_CACHE_ENABLED: bool = True
+    SERPAPI_CACHE_MAX_ENTRIES: int = 500
+    SERPAPI_CACHE_TTL_SECONDS: int = 86400
+    SERPAPI_CACHE_SQLITE_PATH: Optional[str] = None  # 設定時はディスクにも保存（再起動後も有効）
+
     # ガードレール設定
     MODEL_GUARDRAIL: str = "gemini-2.0-flash"  # 軽量モデル
     ENABLE_GUARDRAIL_CHECK: bool = True
 
+    # ストリーミング設定
+    # Trueの場合、思考過程と構造化出力を1回のGrounding呼び出しで取得する
+    STREAM_SINGLE_CALL_STRUCTURED: bool = True
+
+    # 査定結果キャッシュ設定（知覚ハッシュによる近似画像の再利用）
+    APPRAISAL_CACHE_ENABLED: bool = True
+    APPRAISAL_CACHE_MAX_ENTRIES: int = 1000
+    APPRAISAL_CACHE_TTL_SECONDS: int = 3600
+    APPRAISAL_CACHE_MAX_DISTANCE: int = 6  # 64bitハッシュのハミング距離の上限
+
+    # 投機実行: ガードレールチェック待ちの間に search（と price）を先行開始する
+    # prohibited判定時は破棄されるため、その分のLLM呼び出しは無駄になる
+    SPECULATIVE_SEARCH_ENABLED: bool = False
+    SPECULATIVE_PRICE_ENABLED: bool = False  # SPECULATIVE_SEARCH_ENABLED=true の場合のみ有効
+
+    # search と並行して vision の商品名候補で price を開始する
+    # 一点物なら破棄、特定された商品名との類似度が下限未満なら price を再実行
+    CONCURRENT_PRICE_ENABLED: bool = False
+    CONCURRENT_PRICE_MIN_SIMILARITY: float = 0.6
+
+    # 同一画像・同一商品への同時リクエストを1回の処理にまとめる
+    SINGLEFLIGHT_ENABLED: bool = True
+
+    # 分類の高速パス: Lens結果の根拠が十分なら search のLLM呼び出しを省略して既製品と判定
+    SEARCH_FAST_PATH_ENABLED: bool = True
+    SEARCH_FAST_PATH_MIN_MATCHES: int = 5  # visual_matches の件数
+    SEARCH_FAST_PATH_MIN_MARKETPLACE_MATCHES: int = 3  # 主要EC・フリマのマッチ件数
+    SEARCH_FAST_PATH_MIN_PRICED_MATCHES: int = 2  # 価格付きマッチの件数
+
+    # 分類結果キャッシュ設定（商品名 + 上位の視覚的特徴がキー、確信度ごとにTTLを変える）
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_MAX_ENTRIES: int = 5000
+    SEARCH_CACHE_TTL_HIGH_SECONDS: int = 604800  # 7日
+    SEARCH_CACHE_TTL_MEDIUM_SECONDS: int = 86400  # 1日
+    SEARCH_CACHE_TTL_LOW_SECONDS: int = 3600  # 1時間
+
+    # 価格キャッシュ設定（正規化した商品名がキー、stale-while-revalidate）
+    PRICE_CACHE_ENABLED: bool = True
+    PRICE_CACHE_MAX_ENTRIES: int = 2000
+    PRICE_CACHE_FRESH_SECONDS: int = 3600  # この期間内はそのまま返す
+    PRICE_CACHE_STALE_SECONDS: int = 86400  # この期間内は古い値を返しつつ裏で再計算
+
     # Cloud Storage設定
     GCS_BUCKET_NAME: str = "ojoya-images-dev"  # 本番: ojoya-images-prod
     GCS_IMAGE_EXPIRATION_MINUTES: int = 60  # 署名付きURLの有効期限
+    SIGNED_URL_CACHE_MAX_ENTRIES: int = 10000  # 署名付きURLのキャッシュ件数（有効期限の手前まで再利用）
+    # 履歴の画像URL（リダイレクトエンドポイント）に付けるHMAC署名の鍵
+    # 開発環境（ENVIRONMENT=development）以外では必須（未設定の場合は起動時にエラー）
+    # 開発環境で未設定の場合はプロセスごとの鍵（再起動・別インスタンスでURLが無効になる）
+    IMAGE_URL_SIGNING_KEY: str = ""
+
+    # ストレージバックエンド（gcs / memory / filesystem）
+    STORAGE_BACKEND: str = "gcs"
+    STORAGE_FILESYSTEM_ROOT: str = "./.storage"  # filesystem の保存先
+    STORAGE_TIMEOUT_SECONDS: float = 10.0  # コピー・削除のタイムアウト
+    STORAGE_UPLOAD_TIMEOUT_SECONDS: float = 30.0  # アップロードのタイムアウト
+    STORAGE_MAX_CONNECTIONS: int = 32  # Cloud Storage APIへの最大同時接続数
+
+    # 受け付ける画像サイズの上限（デコード後のバイト数）
+    # バイナリアップロード（/analyze/binary, /analyze/stream/binary）と
+    # Base64で送る /analyze, /analyze/stream の両方に適用する
+    MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024  # 10MB
+
+    # 査定前の画像検証（満たさない場合は外部APIを呼ばずに unknown を返す）
+    IMAGE_ALLOWED_MIME_TYPES: list[str] = ["image/jpeg", "image/png", "image/webp", "image/mpo"]
+    IMAGE_MAX_PIXELS: int = 50_000_000  # 画素数の上限
+    IMAGE_MIN_EDGE: int = 100  # 短辺の下限（px）
+
+    # 外部API（Gemini・SerpApi）に渡す画像の正規化（向き補正・メタデータ除去・縮小）
+    # 査定画像として保存するのもこの画像（元の解像度の画像・EXIFは保存しない）
+    IMAGE_NORMALIZE_ENABLED: bool = True
+    IMAGE_NORMALIZE_MAX_EDGE: int = 1024  # 長辺の上限（px）
+    IMAGE_NORMALIZE_QUALITY: int = 85  # 再エンコード時のJPEG画質
+
+    # 画像品質ゲート（ブレ・暗さ・構図が基準を下回る写真は外部APIを呼ばずに再撮影を促す）
+    IMAGE_QUALITY_GATE_ENABLED: bool = True
+    IMAGE_QUALITY_ANALYSIS_EDGE: int = 384  # 計測に使う縮小画像の長辺（px）
+    IMAGE_QUALITY_MIN_SHARPNESS: float = 15.0  # ラプラシアン分散の下限（ブレ・ピンボケ）
+    IMAGE_QUALITY_MIN_BRIGHTNESS: float = 25.0  # 平均輝度の下限（0-255）
+    IMAGE_QUALITY_MAX_BRIGHTNESS: float = 240.0  # 平均輝度の上限（0-255）
+    IMAGE_QUALITY_MAX_CLIPPED_RATIO: float = 0.5  # 黒つぶれ・白とびした画素の割合の上限
+    IMAGE_QUALITY_MIN_COVERAGE: float = 0.05  # 被写体の矩形が画像に占める割合の下限
+
+    # 査定履歴用の縮小画像（長辺のサイズ、元画像と合わせて保存）
+    IMAGE_RENDITION_SIZES: list[int] = [128, 512]
+    IMAGE_RENDITION_QUALITY: int = 80  # 縮小画像のJPEG画質
+    IMAGE_HISTORY_RENDITION_SIZE: int = 128  # 履歴一覧で使うサイズ（詳細ではこれより大きいもの）
+
+    # 画像処理（正規化・縮小画像・品質計測）用のプロセスプール
+    IMAGE_POOL_ENABLED: bool = True
+    IMAGE_POOL_WORKERS: Optional[int] = None  # ワーカー数（None: CPU数）
+    IMAGE_POOL_MAX_PENDING: Optional[int] = None  # 投入上限、超過分はスレッドで実行（None: ワーカー数×4）
 
     # CORS設定
     CORS_ORIGINS: str = "http://localhost:3000,http://127.0.0.1:3000"
@@ -11,6 +11,7 @@ from firebase_admin import firestore
 from google.cloud.firestore import Client
 from google.cloud.firestore_v1.collection import CollectionReference
 
+from backend.core.config import settings
 from backend.core.firebase import initialize_firebase
 from backend.core.logging import get_logger
 from backend.core.storage import storage_client
@@ -238,6 +239,7 @@ class FirestoreClient:
         image_path: Optional[str] = None,
         user_comment: Optional[str] = None,
         appraisal_id: Optional[str] = None,
+        image_renditions: Optional[dict[str, str]] = None,
     ) -> str:
         """
         査定結果をFirestoreに保存
@@ -250,6 +252,7 @@ class FirestoreClient:
             image_path: Cloud Storage上の画像パス（オプション）
             user_comment: ユーザーからの補足コメント（オプション）
             appraisal_id: 査定ID（指定しない場合は自動生成）
+            image_renditions: 長辺サイズ → 縮小画像のパス（オプション）
 
         Returns:
             作成された査定ドキュメントのID
@@ -277,6 +280,8 @@ class FirestoreClient:
         # 入力情報
         if image_path:
             appraisal_doc["image_path"] = image_path
+        if image_renditions:
+            appraisal_doc["image_renditions"] = image_renditions
         if user_comment:
             appraisal_doc["user_comment"] = user_comment
 
@@ -341,18 +346,42 @@ class FirestoreClient:
         self._logger.info(f"Saved appraisal: users/{user_id}/appraisals/{appraisal_id}")
         return appraisal_id
 
-    def _add_image_url(self, appraisal: dict[str, Any]) -> dict[str, Any]:
+    @staticmethod
+    def _large_renditions(appraisal: dict[str, Any]) -> dict[str, str]:
+        """履歴一覧用のサイズより大きい縮小画像（サイズ → パス）"""
+        renditions = appraisal.get("image_renditions") or {}
+        return {
+            size: path
+            for size, path in renditions.items()
+            if int(size) > settings.IMAGE_HISTORY_RENDITION_SIZE
+        }
+
+    async def _add_image_urls(self, appraisals: list[dict[str, Any]]) -> list[dict[str, Any]]:
         """
-        査定データにimage_pathがあれば署名付きURLを追加
+        査定データにimage_pathがあれば署名付きURLを追加（署名は並行して実行）
+
+        image_url に元画像、image_urls に履歴一覧用より大きい縮小画像と元画像（"original"）を設定する。
         """
-        if appraisal.get("image_path"):
-            try:
-                appraisal["image_url"] = storage_client.get_signed_url(
-                    appraisal["image_path"]
-                )
-            except Exception as e:
-                self._logger.warning(f"Failed to generate signed URL: {e}")
-        return appraisal
+        paths = [a["image_path"] for a in appraisals if a.get("image_path")]
+        for appraisal in appraisals:
+            paths.extend(self._large_renditions(appraisal).values())
+        if not paths:
+            return appraisals
+
+        urls = await storage_client.get_signed_urls(paths)
+        for appraisal in appraisals:
+            image_urls = {
+                size: urls[path]
+                for size, path in self._large_renditions(appraisal).items()
+                if path in urls
+            }
+            url = urls.get(appraisal.get("image_path"))
+            if url:
+                appraisal["image_url"] = url
+                image_urls["original"] = url
+            if image_urls:
+                appraisal["image_urls"] = image_urls
+        return appraisals
 
     async def get_appraisal_history(
         self,
@@ -369,7 +398,7 @@ class FirestoreClient:
             offset: スキップ件数（デフォルト0）
 
         Returns:
-            査定履歴のリスト（新しい順、image_url付き）
+            査定履歴のリスト（新しい順、署名付きURLは含まない）
         """
         self._logger.info(f"GET appraisal history: users/{user_id}/appraisals")
 
@@ -383,10 +412,7 @@ class FirestoreClient:
         )
 
         docs = query.stream()
-        appraisals = [doc.to_dict() for doc in docs]
-
-        # 署名付きURLを追加
-        return [self._add_image_url(a) for a in appraisals]
+        return [doc.to_dict() for doc in docs]
 
     async def get_appraisal(
         self,
@@ -415,9 +441,45 @@ class FirestoreClient:
 
         if doc.exists:
             appraisal = doc.to_dict()
-            return self._add_image_url(appraisal)
+            [appraisal] = await self._add_image_urls([appraisal])
+            return appraisal
         return None
 
+    async def get_appraisal_image_path(
+        self,
+        user_id: str,
+        appraisal_id: str,
+        size: Optional[int] = None,
+    ) -> Optional[str]:
+        """
+        査定画像のCloud Storage上のパスを取得
+
+        Args:
+            user_id: Firebase Auth uid
+            appraisal_id: 査定ドキュメントID
+            size: 縮小画像の長辺サイズ（Noneまたは該当する縮小画像がない場合は元画像）
+
+        Returns:
+            画像のパス、査定または画像が存在しない場合はNone
+        """
+        self._logger.info(f"GET users/{user_id}/appraisals/{appraisal_id} (image_path)")
+
+        doc = (
+            self.db.collection("users")
+            .document(user_id)
+            .collection("appraisals")
+            .document(appraisal_id)
+            .get(field_paths=["image_path", "image_renditions"])
+        )
+
+        if not doc.exists:
+            return None
+        data = doc.to_dict() or {}
+        renditions = data.get("image_renditions") or {}
+        if size is not None and str(size) in renditions:
+            return renditions[str(size)]
+        return data.get("image_path")
+
 
 # シングルトンインスタンス
 firestore_client = FirestoreClient()
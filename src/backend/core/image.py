@@ -0,0 +1,283 @@
+"""
+画像ペイロードモジュール
+
+リクエストの画像をAPI境界で一度だけデコードし、バイナリ・MIMEタイプ・
+サイズ・SHA-256をまとめて保持する。パイプライン（vision / storage / 保存処理）は
+この参照を受け取り、Base64の再パース・再デコードを行わない。
+
+外部API（Gemini・SerpApi用のGCS一時画像）には、向きの補正・メタデータ除去・
+縮小を行った正規化済みの画像を渡す（normalize_image）。
+査定できない入力（形式・サイズ・破損）は、有料APIを呼び出す前に
+ヘッダとファイル末尾だけで判定して拒否する（validate_image）。
+"""
+import base64
+import binascii
+import hashlib
+import io
+import math
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from backend.core.config import settings
+from backend.core.image_pool import image_pool
+from backend.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# data:image/jpeg;base64,... 形式のプレフィックス
+DATA_URI_PATTERN = re.compile(r"data:[^;,]*(?:;[^;,]*)*;base64,", re.IGNORECASE)
+
+# 正規化で除去するメタデータ（位置情報を含むEXIFなど）
+METADATA_KEYS = ("exif", "icc_profile", "xmp", "XML:com.adobe.xmp", "comment")
+
+
+# 画像として読めない場合の再撮影アドバイス
+DEFAULT_RETRY_ADVICE = "JPEG・PNG・WebP形式の写真を選び直してください"
+
+
+class InvalidImageError(ValueError):
+    """画像として読めない、または査定できない画像"""
+
+    def __init__(self, message: str, retry_advice: str = DEFAULT_RETRY_ADVICE):
+        """
+        Args:
+            message: ログ用の理由
+            retry_advice: ユーザーに返す再撮影・再選択のアドバイス
+        """
+        super().__init__(message)
+        self.retry_advice = retry_advice
+
+
+@dataclass(frozen=True, eq=False)
+class ImagePayload:
+    """デコード済みのリクエスト画像"""
+
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    sha256: str
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ImagePayload":
+        """
+        画像バイナリから作成
+
+        画像ヘッダのみを読み、形式とサイズを判定する（ピクセルはデコードしない）。
+
+        Raises:
+            InvalidImageError: 画像として認識できない場合
+        """
+        if not data:
+            raise InvalidImageError("画像データが空です")
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                image_format = img.format
+                width, height = img.size
+        except Image.DecompressionBombError as e:
+            raise InvalidImageError(
+                f"画素数が大きすぎます: {e}",
+                "画像の解像度が大きすぎます。画像を縮小してから、もう一度お試しください",
+            ) from e
+        except (UnidentifiedImageError, OSError) as e:
+            raise InvalidImageError(f"画像として認識できません: {e}") from e
+
+        return cls(
+            data=data,
+            mime_type=Image.MIME.get(image_format, "application/octet-stream"),
+            width=width,
+            height=height,
+            sha256=hashlib.sha256(data).hexdigest(),
+        )
+
+    @classmethod
+    def from_base64(cls, image_base64: str) -> "ImagePayload":
+        """
+        Base64文字列（data URI形式も可）から作成
+
+        Raises:
+            InvalidImageError: Base64として不正、または画像として認識できない場合
+        """
+        match = DATA_URI_PATTERN.match(image_base64)
+        encoded = image_base64[match.end():] if match else image_base64
+        try:
+            data = base64.b64decode(encoded, validate=False)
+        except (binascii.Error, ValueError) as e:
+            raise InvalidImageError(f"Base64のデコードに失敗しました: {e}") from e
+        return cls.from_bytes(data)
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.data)
+
+    def media_block(self) -> dict[str, Any]:
+        """LLMメッセージ用のコンテンツブロック（バイナリをそのまま渡す）"""
+        return {"type": "media", "data": self.data, "mime_type": self.mime_type}
+
+    def __repr__(self) -> str:
+        # バイナリをログ・デバッグ出力に含めない
+        return (
+            f"ImagePayload(mime_type={self.mime_type!r}, size={self.width}x{self.height}, "
+            f"bytes={self.size_bytes}, sha256={self.sha256[:12]})"
+        )
+
+
+def open_for_normalize(image: ImagePayload, max_edge: int) -> Image.Image:
+    """
+    正規化用に画像を開く
+
+    JPEGは縮小後のサイズに近い解像度でデコードする（draft）ため、
+    大きな写真でもフル解像度のピクセルを展開しない。
+    """
+    img = Image.open(io.BytesIO(image.data))
+    long_edge = max(img.size)
+    if long_edge > max_edge:
+        scale = max_edge / long_edge
+        img.draft("RGB", (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+    return img
+
+
+def apply_orientation(img: Image.Image) -> Image.Image:
+    """EXIFのOrientationに従って回転・反転する"""
+    return ImageOps.exif_transpose(img)
+
+
+def downscale(img: Image.Image, max_edge: int) -> Image.Image:
+    """長辺が max_edge を超える場合は縮小する（アスペクト比は維持）"""
+    if max(img.size) <= max_edge:
+        return img
+    img = img.copy()
+    img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    return img
+
+
+def is_truncated(image: ImagePayload) -> bool:
+    """
+    ファイル末尾が欠けているか（ピクセルはデコードせず、終端マーカーのみ確認）
+
+    - JPEG: 最後のスキャン開始（SOS）より後に終了マーカー（EOI）がない
+    - PNG: IENDチャンクがない
+    - WebP: RIFFヘッダのサイズよりデータが短い
+    """
+    data = image.data
+    if image.mime_type in ("image/jpeg", "image/mpo"):
+        return data.rfind(b"\xff\xd9") < data.rfind(b"\xff\xda")
+    if image.mime_type == "image/png":
+        return data.rfind(b"IEND") == -1
+    if image.mime_type == "image/webp":
+        return len(data) < int.from_bytes(data[4:8], "little") + 8
+    return False
+
+
+def validate_image(image: ImagePayload) -> ImagePayload:
+    """
+    査定できる画像か検証（ヘッダとファイル末尾のみ確認）
+
+    Returns:
+        検証済みの画像（引数をそのまま返す）
+
+    Raises:
+        InvalidImageError: 形式・サイズ・画素数の制限を満たさない、または破損している場合
+    """
+    if image.mime_type not in settings.IMAGE_ALLOWED_MIME_TYPES:
+        raise InvalidImageError(f"対応していない形式です: {image.mime_type}")
+    if image.size_bytes > settings.MAX_UPLOAD_BYTES:
+        raise InvalidImageError(
+            f"ファイルサイズが大きすぎます: {image.size_bytes} bytes",
+            "画像のファイルサイズが大きすぎます。画像を縮小してから、もう一度お試しください",
+        )
+    if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        raise InvalidImageError(
+            f"画素数が大きすぎます: {image.width}x{image.height}",
+            "画像の解像度が大きすぎます。画像を縮小してから、もう一度お試しください",
+        )
+    if min(image.width, image.height) < settings.IMAGE_MIN_EDGE:
+        raise InvalidImageError(
+            f"画像が小さすぎます: {image.width}x{image.height}",
+            "画像が小さすぎます。商品が大きく写るように撮影してください",
+        )
+    if is_truncated(image):
+        raise InvalidImageError(
+            f"画像データが途中で切れています: {image!r}",
+            "画像の読み込みが完了していない可能性があります。もう一度アップロードしてください",
+        )
+    return image
+
+
+def encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    """メタデータを含めずにJPEGで再エンコードする"""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    output = io.BytesIO()
+    img.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+def is_normalized(img: Image.Image, mime_type: str, max_edge: int) -> bool:
+    """再エンコード不要（JPEG・max_edge以内・メタデータなし）か"""
+    return (
+        mime_type == "image/jpeg"
+        and max(img.size) <= max_edge
+        and not any(key in img.info for key in METADATA_KEYS)
+    )
+
+
+def normalize_image(image: ImagePayload, max_edge: int, quality: int) -> ImagePayload:
+    """
+    外部API用に画像を正規化
+
+    EXIFの向きを適用し、メタデータを除去し、長辺を max_edge 以下に縮小して
+    JPEG（quality）で再エンコードする。既に正規化済みの画像はそのまま返す。
+
+    Args:
+        image: デコード済みの画像
+        max_edge: 長辺の上限（px）
+        quality: JPEGの画質（1-100）
+
+    Returns:
+        正規化済みの画像
+    """
+    with open_for_normalize(image, max_edge) as img:
+        if is_normalized(img, image.mime_type, max_edge):
+            return image
+        normalized = downscale(apply_orientation(img), max_edge)
+        data = encode_jpeg(normalized, quality)
+        width, height = normalized.size
+
+    return ImagePayload(
+        data=data,
+        mime_type="image/jpeg",
+        width=width,
+        height=height,
+        sha256=hashlib.sha256(data).hexdigest(),
+    )
+
+
+async def normalize_for_analysis(image: ImagePayload) -> ImagePayload:
+    """
+    設定値で画像を正規化（ピクセル処理はプロセスプールで実行）
+
+    正規化に失敗した場合は元の画像をそのまま返す。
+    """
+    if not settings.IMAGE_NORMALIZE_ENABLED:
+        return image
+    try:
+        normalized = await image_pool.run(
+            normalize_image,
+            image,
+            settings.IMAGE_NORMALIZE_MAX_EDGE,
+            settings.IMAGE_NORMALIZE_QUALITY,
+        )
+    except Exception as e:
+        logger.warning(f"Image normalization failed, using original: {e}")
+        return image
+
+    if normalized is not image:
+        logger.info(
+            f"Normalized image: {image.width}x{image.height} {image.size_bytes}B -> "
+            f"{normalized.width}x{normalized.height} {normalized.size_bytes}B"
+        )
+    return normalized
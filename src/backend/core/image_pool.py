@@ -0,0 +1,129 @@
+"""
+画像処理用プロセスプール
+
+Pillowによるデコード・変換・エンコードはCPUを長時間占有し、イベントループ上で
+実行すると同じインスタンスの全リクエスト（SSEストリームを含む）が止まる。
+CPU数に合わせた ProcessPoolExecutor で実行し、プールが飽和している場合・
+起動していない場合はスレッドで実行する（イベントループはブロックしない）。
+
+プールは lifespan で start() / shutdown() する。
+
+使用例:
+    from backend.core.image_pool import image_pool
+
+    normalized = await image_pool.run(normalize_image, image, max_edge, quality)
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, TypeVar
+
+from backend.core.config import settings
+from backend.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class ImageProcessPool:
+    """上限付きの画像処理プロセスプール"""
+
+    def __init__(
+        self,
+        enabled: bool,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ):
+        """
+        Args:
+            enabled: Falseの場合はプロセスを起動せず、常にスレッドで実行
+            max_workers: ワーカープロセス数（Noneの場合はCPU数）
+            max_pending: プールに投入できる処理数の上限（Noneの場合はワーカー数の4倍）。
+                超えた分はスレッドで実行する
+        """
+        self.enabled = enabled
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.submitted = 0
+        self.fallbacks = 0
+        self.failures = 0
+
+    def start(self) -> None:
+        """ワーカープロセスのプールを生成"""
+        if not self.enabled or self._executor is not None:
+            return
+        # スレッドを持つプロセスからのforkはデッドロックの恐れがあるためspawnを使う
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(
+            f"Image process pool started: workers={self.max_workers}, max_pending={self.max_pending}"
+        )
+
+    def shutdown(self) -> None:
+        """プールを停止（実行中の処理は完了を待つ）"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+            logger.info("Image process pool shut down")
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        画像処理を実行
+
+        Args:
+            fn: モジュールトップレベルの関数（プロセス間でpickleできること）
+            *args: 関数の引数（pickleできること）
+
+        Returns:
+            関数の戻り値
+        """
+        executor = self._executor
+        if executor is None or self._pending >= self.max_pending:
+            if executor is not None:
+                self.fallbacks += 1
+                logger.debug(f"Image process pool saturated ({self._pending}), running in thread")
+            return await asyncio.to_thread(fn, *args)
+
+        self._pending += 1
+        self.submitted += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # ワーカーが異常終了した場合はプールを作り直し、今回はスレッドで実行する
+            self.failures += 1
+            logger.warning("Image process pool broken, restarting")
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.start()
+            return await asyncio.to_thread(fn, *args)
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> dict[str, Any]:
+        """プールの統計（queue_depth はワーカー待ちの処理数）"""
+        return {
+            "running": self._executor is not None,
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "queue_depth": max(0, self._pending - self.max_workers),
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+        }
+
+
+# シングルトンインスタンス
+image_pool = ImageProcessPool(
+    enabled=settings.IMAGE_POOL_ENABLED,
+    max_workers=settings.IMAGE_POOL_WORKERS,
+    max_pending=settings.IMAGE_POOL_MAX_PENDING,
+)
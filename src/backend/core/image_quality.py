@@ -0,0 +1,216 @@
+"""
+画像品質ゲート
+
+ブレ・暗さ・構図（商品が小さく写っている）が原因で商品を特定できない写真は、
+SerpApi検索・Geminiのガードレールを呼び出しても unknown になる。
+縮小したコピーで以下を数ミリ秒で計測し、しきい値を下回る写真は
+外部APIを呼び出す前に再撮影のアドバイス（retry_advice）を返す。
+
+- シャープネス: 輝度のラプラシアン分散（ブレ・ピンボケで小さくなる）
+- 露出: 被写体（外周の色と異なる画素）の輝度ヒストグラムの平均と、黒つぶれ・白とびした
+  画素の割合。白背景の商品写真で背景の白とびを露出不良と判定しないよう、背景は除く
+- 被写体の占有率: 外周の色（背景）と異なる画素を囲む矩形の面積比。被写体が画面いっぱいに
+  写っていると外周の色が被写体の色になり前景がほぼ見つからないため、その場合は判定しない
+
+計測はCPUのみで行い、プロセスプールで実行する。しきい値は設定値で調整できる。
+
+使用例:
+    from backend.core.image_quality import image_quality_gate
+
+    await image_quality_gate.check(image)  # InvalidImageError を送出
+"""
+import io
+import math
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+from PIL import Image
+
+from backend.core.config import settings
+from backend.core.image import ImagePayload, InvalidImageError
+from backend.core.image_pool import image_pool
+from backend.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 黒つぶれ・白とびとみなす輝度
+SHADOW_CLIP_LEVEL = 4
+HIGHLIGHT_CLIP_LEVEL = 251
+
+# 背景とみなす外周色からの距離（RGBのユークリッド距離）
+FOREGROUND_COLOR_DISTANCE = 40.0
+
+# 被写体の矩形に含める行・列（前景画素がこの割合以上）
+FOREGROUND_LINE_RATIO = 0.02
+
+# 露出を被写体のみで計測し、占有率を判定するのに必要な前景画素の割合
+# （未満の場合は被写体が画面いっぱいとみなし、露出は画像全体で計測、占有率は不明とする）
+FOREGROUND_MIN_PIXEL_RATIO = 0.01
+
+
+@dataclass(frozen=True)
+class QualityReport:
+    """画像品質の計測結果"""
+
+    sharpness: float  # ラプラシアン分散
+    brightness: float  # 被写体の平均輝度（0-255）
+    clipped_ratio: float  # 被写体のうち黒つぶれ・白とびした画素の割合
+    coverage: Optional[float]  # 被写体の矩形が画像に占める割合（前景が見つからない場合はNone）
+
+
+def _laplacian_variance(gray: np.ndarray) -> float:
+    """4近傍ラプラシアンの分散"""
+    laplacian = (
+        gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1]
+        - 4 * gray[1:-1, 1:-1]
+    )
+    return float(laplacian.var())
+
+
+def _foreground_mask(rgb: np.ndarray) -> np.ndarray:
+    """外周の中央値の色を背景とし、それ以外の画素を前景とするマスク"""
+    border = np.concatenate([rgb[0], rgb[-1], rgb[:, 0], rgb[:, -1]])
+    background = np.median(border, axis=0)
+    return np.sqrt(((rgb - background) ** 2).sum(axis=2)) > FOREGROUND_COLOR_DISTANCE
+
+
+def _foreground_coverage(mask: np.ndarray) -> float:
+    """前景画素を囲む矩形の面積比"""
+    rows = np.flatnonzero(mask.mean(axis=1) > FOREGROUND_LINE_RATIO)
+    cols = np.flatnonzero(mask.mean(axis=0) > FOREGROUND_LINE_RATIO)
+    if rows.size == 0 or cols.size == 0:
+        return 0.0
+    return float((rows[-1] - rows[0] + 1) * (cols[-1] - cols[0] + 1) / mask.size)
+
+
+def measure_quality(image: ImagePayload, analysis_edge: int) -> QualityReport:
+    """
+    画像品質を計測（プロセスプールから呼び出すためモジュールトップレベルに置く）
+
+    長辺を analysis_edge に縮小したコピーで計測する（JPEGはdraftで縮小デコード）。
+    露出は被写体の画素で計測し、被写体が見つからない場合は画像全体で計測する
+    （占有率はNone）。
+
+    Args:
+        image: デコード済みの画像
+        analysis_edge: 計測に使う画像の長辺（px）
+    """
+    with Image.open(io.BytesIO(image.data)) as img:
+        scale = analysis_edge / max(img.size)
+        if scale < 1:
+            img.draft("RGB", (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+        rgb_image = img.convert("RGB")
+    rgb_image.thumbnail((analysis_edge, analysis_edge), Image.Resampling.BILINEAR)
+
+    luminance = np.asarray(rgb_image.convert("L"))
+    mask = _foreground_mask(np.asarray(rgb_image, dtype=np.float32))
+    has_foreground = mask.mean() >= FOREGROUND_MIN_PIXEL_RATIO
+    subject = luminance[mask] if has_foreground else luminance.ravel()
+    histogram = np.bincount(subject, minlength=256)
+    pixels = histogram.sum()
+
+    return QualityReport(
+        sharpness=_laplacian_variance(luminance.astype(np.float32)),
+        brightness=float(np.dot(histogram, np.arange(256)) / pixels),
+        clipped_ratio=float(
+            (histogram[: SHADOW_CLIP_LEVEL + 1].sum() + histogram[HIGHLIGHT_CLIP_LEVEL:].sum())
+            / pixels
+        ),
+        coverage=_foreground_coverage(mask) if has_foreground else None,
+    )
+
+
+class ImageQualityGate:
+    """しきい値を下回る写真を外部API呼び出し前に拒否するゲート"""
+
+    def __init__(self):
+        self.checked = 0
+        self.rejected: dict[str, int] = {
+            "dark": 0,
+            "bright": 0,
+            "blurry": 0,
+            "small_subject": 0,
+        }
+        self.coverage_unknown = 0
+        self.errors = 0
+
+    def evaluate(self, report: QualityReport) -> None:
+        """
+        計測結果をしきい値と比較
+
+        露出が極端な写真はシャープネス・占有率も正しく測れないため、露出から判定する。
+        占有率が不明（被写体が画面いっぱい）の場合は占有率を判定しない。
+
+        Raises:
+            InvalidImageError: しきい値を下回る場合（retry_advice に再撮影のアドバイス）
+        """
+        if report.brightness < settings.IMAGE_QUALITY_MIN_BRIGHTNESS:
+            self._reject(
+                "dark", report, "画像が暗すぎます。明るい場所で撮影してください"
+            )
+        if (
+            report.brightness > settings.IMAGE_QUALITY_MAX_BRIGHTNESS
+            or report.clipped_ratio > settings.IMAGE_QUALITY_MAX_CLIPPED_RATIO
+        ):
+            self._reject(
+                "bright",
+                report,
+                "明るさが適切ではありません。照明の反射や逆光を避けて撮影してください",
+            )
+        if report.sharpness < settings.IMAGE_QUALITY_MIN_SHARPNESS:
+            self._reject(
+                "blurry",
+                report,
+                "画像がぼやけています。ピントを合わせ、手ブレしないように撮影してください",
+            )
+        if report.coverage is None:
+            self.coverage_unknown += 1
+        elif report.coverage < settings.IMAGE_QUALITY_MIN_COVERAGE:
+            self._reject(
+                "small_subject",
+                report,
+                "商品が小さく写っています。商品に近づき、画面いっぱいに写るように撮影してください",
+            )
+
+    def _reject(self, reason: str, report: QualityReport, retry_advice: str) -> None:
+        self.rejected[reason] += 1
+        raise InvalidImageError(f"品質ゲートで拒否しました（{reason}）: {report}", retry_advice)
+
+    async def check(self, image: ImagePayload) -> None:
+        """
+        画像品質を検証（計測はプロセスプールで実行）
+
+        計測に失敗した場合は検証せずに通す。
+
+        Raises:
+            InvalidImageError: しきい値を下回る場合
+        """
+        if not settings.IMAGE_QUALITY_GATE_ENABLED:
+            return
+        try:
+            report = await image_pool.run(
+                measure_quality, image, settings.IMAGE_QUALITY_ANALYSIS_EDGE
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Image quality measurement failed, skipping gate: {e}")
+            return
+
+        self.checked += 1
+        logger.debug(f"Image quality: {report}")
+        self.evaluate(report)
+
+    def stats(self) -> dict[str, Any]:
+        """ゲートの統計（理由ごとの拒否件数）"""
+        return {
+            "enabled": settings.IMAGE_QUALITY_GATE_ENABLED,
+            "checked": self.checked,
+            "rejected": dict(self.rejected),
+            "coverage_unknown": self.coverage_unknown,
+            "errors": self.errors,
+        }
+
+
+# シングルトンインスタンス
+image_quality_gate = ImageQualityGate()
@@ -0,0 +1,112 @@
+"""
+査定画像URLの署名
+
+履歴一覧の image_url は、画像リダイレクトエンドポイント（GET /appraisals/{id}/image）の
+絶対URLに、ユーザー・査定・サイズ・有効期限へのHMAC署名をクエリで付けたもの。
+<img src> からBearerヘッダーなしで読み込め、Cloud Storageの署名（IAM signBlob）は
+画像が実際に表示されるときだけ行われる。
+
+署名鍵（IMAGE_URL_SIGNING_KEY）はすべてのインスタンスで共有する。開発環境以外で
+未設定の場合は起動時にエラーにする（インスタンスごとの鍵では別インスタンス・再起動後に
+URLが無効になるため）。
+
+有効期限は署名付きURLのキャッシュと同じ間隔で丸めるため、その間は同じURLになり
+ブラウザのキャッシュが効く。
+
+使用例:
+    from backend.core.image_url import image_url_signer
+
+    query = image_url_signer.sign(user_id, appraisal_id, size=128)
+    image_url_signer.verify(uid, appraisal_id, size, expires, signature)  # True / False
+"""
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from typing import Optional
+
+from backend.core.config import settings
+from backend.core.logging import get_logger
+from backend.core.storage import signed_url_reuse_seconds
+
+logger = get_logger(__name__)
+
+
+def image_url_expires(now: Optional[float] = None) -> int:
+    """
+    新しく発行するURLの有効期限（UNIX時刻）
+
+    署名付きURLを再利用する間隔で丸めるため、残りの有効期間は
+    signed_url_min_remaining_seconds 以上になる。
+    """
+    now = time.time() if now is None else now
+    step = signed_url_reuse_seconds(settings.GCS_IMAGE_EXPIRATION_MINUTES)
+    return int(now // step * step + settings.GCS_IMAGE_EXPIRATION_MINUTES * 60)
+
+
+class ImageUrlSigner:
+    """画像リダイレクトエンドポイントのクエリの署名・検証"""
+
+    def __init__(self, key: Optional[str] = None):
+        """
+        Args:
+            key: 署名鍵（Noneの場合は IMAGE_URL_SIGNING_KEY）
+
+        Raises:
+            RuntimeError: 開発環境以外で署名鍵が設定されていない場合
+        """
+        key = settings.IMAGE_URL_SIGNING_KEY if key is None else key
+        if key:
+            self._key = key.encode()
+        elif settings.ENVIRONMENT == "development":
+            logger.warning(
+                "IMAGE_URL_SIGNING_KEY is not set, using a per-process key "
+                "(image URLs are not valid across restarts or instances)"
+            )
+            self._key = secrets.token_bytes(32)
+        else:
+            raise RuntimeError(
+                f"IMAGE_URL_SIGNING_KEY is required when ENVIRONMENT={settings.ENVIRONMENT}"
+            )
+
+    def _signature(self, user_id: str, appraisal_id: str, size: Optional[int], expires: int) -> str:
+        message = f"{user_id}\n{appraisal_id}\n{size or ''}\n{expires}".encode()
+        digest = hmac.new(self._key, message, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+    def sign(self, user_id: str, appraisal_id: str, size: Optional[int] = None) -> dict[str, str]:
+        """
+        画像リダイレクトエンドポイントに付けるクエリパラメータ
+
+        Args:
+            user_id: Firebase Auth uid
+            appraisal_id: 査定ドキュメントID
+            size: 縮小画像の長辺サイズ（Noneの場合は元画像）
+        """
+        expires = image_url_expires()
+        query = {"uid": user_id}
+        if size is not None:
+            query["size"] = str(size)
+        query["expires"] = str(expires)
+        query["signature"] = self._signature(user_id, appraisal_id, size, expires)
+        return query
+
+    def verify(
+        self,
+        user_id: str,
+        appraisal_id: str,
+        size: Optional[int],
+        expires: int,
+        signature: str,
+    ) -> bool:
+        """クエリの署名が正しく、有効期限内であればTrue"""
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(
+            signature, self._signature(user_id, appraisal_id, size, expires)
+        )
+
+
+# シングルトンインスタンス
+image_url_signer = ImageUrlSigner()
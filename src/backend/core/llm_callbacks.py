@@ -8,6 +8,8 @@ from typing import Any, Optional
 
 from langchain_core.callbacks import AsyncCallbackHandler, BaseCallbackHandler
 from langchain_core.outputs import LLMResult
+from langchain_core.utils.json import parse_json_markdown, parse_partial_json
+from pydantic import BaseModel
 
 from backend.core.logging import get_logger
 
@@ -135,3 +137,90 @@ class StreamingCallbackHandler(AsyncCallbackHandler):
             "node": self.node_name,
             "message": str(error),
         })
+
+
+class StructuredStreamingCallbackHandler(StreamingCallbackHandler):
+    """
+    1回のLLM呼び出しから思考過程と構造化出力の両方を取り出すハンドラー
+
+    区切り行（RESULT_MARKER）より前は行単位で思考過程としてキューに送信し、
+    区切り行以降はJSONとして蓄積しながら逐次パースする。
+
+    使用例:
+        handler = StructuredStreamingCallbackHandler(queue, "search")
+        await llm.ainvoke(messages, config={"callbacks": [handler]})
+        analysis = handler.parse_result(SearchAnalysis)
+    """
+
+    RESULT_MARKER = "[[RESULT]]"
+
+    def __init__(self, queue: asyncio.Queue, node_name: str):
+        super().__init__(queue, node_name)
+        self._in_result = False
+        self._result_buffer = ""
+        # 途中までのJSONをパースした結果（ストリーミング中も随時更新）
+        self.partial: dict[str, Any] = {}
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        """新しいトークンが生成されたとき"""
+        if self._in_result:
+            self._append_result(token)
+            return
+
+        self._buffer += token
+
+        # 区切り行が現れたら、それ以降は構造化出力として扱う
+        if self.RESULT_MARKER in self._buffer:
+            thinking, result = self._buffer.split(self.RESULT_MARKER, 1)
+            self._buffer = ""
+            for line in thinking.split("\n"):
+                await self._put_line(line)
+            self._in_result = True
+            self._append_result(result)
+            return
+
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            await self._put_line(line)
+
+    async def _put_line(self, line: str) -> None:
+        """思考過程の1行をキューに送信"""
+        line = line.strip()
+        if line:
+            await self.queue.put({
+                "type": "thinking",
+                "node": self.node_name,
+                "content": line,
+            })
+
+    def _append_result(self, token: str) -> None:
+        """構造化出力のトークンを蓄積し、途中までのJSONをパース"""
+        self._result_buffer += token
+        start = self._result_buffer.find("{")
+        if start < 0:
+            return
+        text = self._result_buffer[start:].split("```", 1)[0]
+        parsed = parse_partial_json(text)
+        if isinstance(parsed, dict):
+            self.partial = parsed
+
+    @property
+    def has_result(self) -> bool:
+        """構造化出力の区切り行を受信したかどうか"""
+        return self._in_result
+
+    def parse_result(self, schema: type[BaseModel]) -> BaseModel:
+        """
+        蓄積したJSONをスキーマに変換
+
+        Raises:
+            ValueError: 区切り行が出力されなかった場合
+            pydantic.ValidationError: JSONがスキーマに合致しない場合
+        """
+        if not self._in_result:
+            raise ValueError("Structured result marker was not found in the stream")
+        try:
+            data = parse_json_markdown(self._result_buffer)
+        except Exception:
+            data = self.partial
+        return schema.model_validate(data)
@@ -0,0 +1,136 @@
+"""
+Geminiチャットクライアントのプロセス共有プール
+
+ChatGoogleGenerativeAI の生成は認証情報の解決とトランスポートの初期化を伴うため、
+リクエストごとに生成せず、モデル・温度・ツール・構造化スキーマをキーに再利用する。
+コールバックはクライアントに持たせず、呼び出し時に config で渡す。
+
+使用例:
+    from backend.core.llm_pool import GOOGLE_SEARCH_TOOLS, llm_pool
+
+    llm = llm_pool.get(
+        settings.MODEL_SEARCH_NODE,
+        tools=GOOGLE_SEARCH_TOOLS,
+        schema=SearchAnalysis,
+    )
+    result = await llm.ainvoke(messages, config={"callbacks": get_llm_callbacks("search")})
+"""
+import json
+import threading
+from typing import Any, Optional
+
+from langchain_core.runnables import Runnable
+from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import BaseModel
+
+from backend.core.config import settings
+from backend.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Grounding with Google Search
+GOOGLE_SEARCH_TOOLS: list[dict[str, Any]] = [{"google_search": {}}]
+
+
+class LLMClientPool:
+    """ChatGoogleGenerativeAIクライアントのレジストリ"""
+
+    def __init__(self):
+        self._clients: dict[tuple, Runnable] = {}
+        self._lock = threading.Lock()
+        self._created = 0
+        self._reused = 0
+
+    def get(
+        self,
+        model: str,
+        temperature: float = 0,
+        *,
+        max_tokens: Optional[int] = None,
+        max_retries: int = 2,
+        streaming: bool = False,
+        tools: Optional[list[dict[str, Any]]] = None,
+        schema: Optional[type[BaseModel]] = None,
+    ) -> Runnable:
+        """
+        条件に合うクライアントを取得（なければ生成して登録）
+
+        Args:
+            model: モデル名
+            temperature: 温度
+            max_tokens: 最大出力トークン数
+            max_retries: リトライ回数
+            streaming: トークン単位のコールバックを有効にするか
+            tools: 呼び出し時に付与するツール（Grounding等）
+            schema: 構造化出力のスキーマ
+
+        Returns:
+            ainvoke可能なRunnable
+        """
+        tools_key = json.dumps(tools, sort_keys=True) if tools else None
+        key = (model, temperature, max_tokens, max_retries, streaming, tools_key, schema)
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._reused += 1
+                return client
+
+            base_key = (model, temperature, max_tokens, max_retries, streaming, None, None)
+            base = self._clients.get(base_key)
+            if base is None:
+                base = ChatGoogleGenerativeAI(
+                    model=model,
+                    project=settings.GCP_PROJECT_ID,
+                    location=settings.GCP_LOCATION,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    max_retries=max_retries,
+                    vertexai=True,
+                    streaming=streaming,
+                )
+                self._clients[base_key] = base
+                self._created += 1
+                logger.info(
+                    f"LLM client created: model={model}, temperature={temperature}, "
+                    f"streaming={streaming}"
+                )
+            else:
+                # ツール・スキーマ違いでも基本クライアントは共有する
+                self._reused += 1
+
+            client = base
+            if schema is not None:
+                client = client.with_structured_output(schema)
+            if tools:
+                client = client.bind(tools=tools)
+
+            if client is not base:
+                self._clients[key] = client
+            return client
+
+    def warm_up(self) -> None:
+        """各ノードが使用する基本クライアントを事前に生成"""
+        self.get(settings.MODEL_GUARDRAIL, max_tokens=50)
+        self.get(settings.MODEL_SEARCH_NODE)
+        self.get(settings.MODEL_SEARCH_NODE, temperature=0.3, streaming=True)
+        logger.info(f"LLM client pool warmed up: {len(self._clients)} clients")
+
+    def clear(self) -> None:
+        """登録済みクライアントを破棄"""
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """再利用・生成の統計"""
+        total = self._created + self._reused
+        return {
+            "clients": len(self._clients),
+            "created": self._created,
+            "reused": self._reused,
+            "reuse_rate": round(self._reused / total, 3) if total else 0.0,
+        }
+
+
+# シングルトンインスタンス
+llm_pool = LLMClientPool()
@@ -0,0 +1,129 @@
+"""
+知覚ハッシュモジュール
+
+画像の見た目に基づく64bitハッシュ（dHash）と、
+ハミング距離による近傍検索のためのBK-treeを提供する。
+"""
+import io
+from typing import Optional
+
+from PIL import Image
+
+# dHashの一辺のサイズ（hash_size^2 ビットのハッシュになる）
+HASH_SIZE = 8
+
+
+def dhash(image_bytes: bytes, hash_size: int = HASH_SIZE) -> int:
+    """
+    差分ハッシュ（dHash）を計算
+
+    グレースケール化・縮小した画像の隣接ピクセルの明暗差をビット列にする。
+    再圧縮・リサイズ・軽微な色調変化に対して値がほぼ変わらない。
+
+    Args:
+        image_bytes: 画像のバイナリデータ
+        hash_size: ハッシュの一辺のサイズ
+
+    Returns:
+        hash_size^2 ビットの整数
+    """
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        # JPEGは縮小デコードで高速化
+        img.draft("L", (hash_size * 8, hash_size * 8))
+        small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """2つのハッシュのハミング距離"""
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """
+    ハミング距離によるBK-tree
+
+    指定距離以内のハッシュを全件走査せずに検索できる。
+    削除は論理削除とし、削除済みが過半数になったら再構築する。
+    """
+
+    def __init__(self):
+        # ノード: [hash, {距離: 子ノード}]
+        self._root: Optional[list] = None
+        self._alive: set[int] = set()
+        self._dead = 0
+
+    def add(self, value: int) -> None:
+        """ハッシュを追加"""
+        if value in self._alive:
+            return
+        self._alive.add(value)
+
+        if self._root is None:
+            self._root = [value, {}]
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                # 論理削除済みのノードを再利用
+                self._dead -= 1
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [value, {}]
+                return
+            node = child
+
+    def remove(self, value: int) -> None:
+        """ハッシュを削除（論理削除）"""
+        if value not in self._alive:
+            return
+        self._alive.discard(value)
+        self._dead += 1
+        if self._dead > len(self._alive):
+            self._rebuild()
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, int]]:
+        """
+        指定距離以内のハッシュを検索
+
+        Returns:
+            (距離, ハッシュ) のリスト（距離の昇順）
+        """
+        results: list[tuple[int, int]] = []
+        if self._root is None:
+            return results
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance and node[0] in self._alive:
+                results.append((distance, node[0]))
+            # 三角不等式により探索範囲を絞り込む
+            for child_distance, child in node[1].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+
+        results.sort()
+        return results
+
+    def _rebuild(self) -> None:
+        alive = list(self._alive)
+        self._root = None
+        self._alive = set()
+        self._dead = 0
+        for value in alive:
+            self.add(value)
+
+    def __len__(self) -> int:
+        return len(self._alive)
@@ -1,6 +1,25 @@
-"""SerpApi Google Lens クライアント"""
+"""
+SerpApi Google Lens クライアント
 
-from typing import Optional
+リクエストごとにHTTPクライアントを作るとTCP・TLSのハンドシェイクを毎回行うため、
+lifespan で start() した長寿命のクライアント（keep-alive のコネクションプール、
+対応していればHTTP/2）を共有し、終了時に close() する。
+新規接続の数とハンドシェイク時間を stats() で確認できる。
+
+Lensのレイテンシはテールが長く、1回の失敗がそのまま unknown の査定になるため、
+- リトライ: 一時的なエラー（429・5xx・タイムアウト・接続エラー）はジッター付きの
+  指数バックオフで再試行する
+- ヘッジ（任意）: 直近のp95を過ぎても応答がない場合に2本目を送り、先に成功した方を使う
+いずれも全体のレイテンシ予算（SERPAPI_LATENCY_BUDGET_SECONDS）を超えない。
+"""
+
+import asyncio
+import importlib.util
+import random
+import statistics
+import time
+from collections import Counter, deque
+from typing import Any, Optional
 
 import httpx
 
@@ -16,6 +35,12 @@ logger = get_logger(__name__)
 
 SERPAPI_BASE_URL = "https://serpapi.com/search"
 
+# レイテンシ統計に保持するサンプル数
+LATENCY_SAMPLES = 256
+
+# リトライ対象のHTTPステータス
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
 
 class SerpApiError(Exception):
     """SerpApi関連のエラー"""
@@ -28,7 +53,76 @@ class SerpApiClient:
 
     def __init__(self):
         self.api_key = settings.SERPAPI_API_KEY
-        self.timeout = settings.SERPAPI_TIMEOUT_SECONDS
+        self.timeout = httpx.Timeout(
+            settings.SERPAPI_TIMEOUT_SECONDS,
+            connect=settings.SERPAPI_CONNECT_TIMEOUT_SECONDS,
+        )
+        # HTTP/2 は h2 パッケージ（httpx[http2]）がある場合のみ有効
+        self.http2 = settings.SERPAPI_HTTP2 and importlib.util.find_spec("h2") is not None
+        self._http: Optional[httpx.AsyncClient] = None
+
+        self.requests = 0
+        self.attempts: Counter[str] = Counter()  # primary / retry / hedge
+        self.attempt_outcomes: Counter[str] = Counter()  # HTTPステータス / timeout / error / cancelled
+        self.hedges_won = 0
+        self.budget_exceeded = 0
+        self.new_connections = 0
+        self.http_versions: Counter[str] = Counter()
+        self._handshakes: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """遅延初期化で共有HTTPクライアントを取得"""
+        return self._ensure_client()
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        """共有HTTPクライアントがなければ生成する"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.SERPAPI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.SERPAPI_MAX_CONNECTIONS,
+                    keepalive_expiry=settings.SERPAPI_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+            )
+            logger.info(
+                f"SerpApi HTTP client initialized: http2={self.http2}, "
+                f"max_connections={settings.SERPAPI_MAX_CONNECTIONS}"
+            )
+        return self._http
+
+    def start(self) -> None:
+        """共有HTTPクライアントを生成（lifespan の起動時に呼ぶ）"""
+        self._ensure_client()
+
+    async def close(self) -> None:
+        """共有HTTPクライアントを閉じる（keep-alive の接続を切断）"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def _trace(self):
+        """
+        新規接続のハンドシェイク時間を記録する httpcore の trace コールバック
+
+        TCP接続の開始から、接続後の最初のHTTPイベント（TLS完了後）までを計測する。
+        プールの接続を再利用した場合は接続イベントが発生しない。
+        """
+        connect_started: Optional[float] = None
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            nonlocal connect_started
+            if event == "connection.connect_tcp.started":
+                connect_started = time.perf_counter()
+            elif connect_started is not None and not event.startswith("connection."):
+                self.new_connections += 1
+                self._handshakes.append(time.perf_counter() - connect_started)
+                connect_started = None
+
+        return trace
 
     async def search_by_image_url(
         self,
@@ -67,19 +161,30 @@ class SerpApiClient:
         logger.info(f"SerpApi Google Lens search: type={search_type}")
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(SERPAPI_BASE_URL, params=params)
+            self.requests += 1
+            # リトライ・ヘッジを含めた全体の上限
+            async with asyncio.timeout(settings.SERPAPI_LATENCY_BUDGET_SECONDS):
+                response = await self._get_with_retry(params)
 
-                if response.status_code != 200:
-                    logger.error(f"SerpApi HTTP error: {response.status_code}")
-                    return GoogleLensResponse(
-                        status="Error",
-                        error_message=f"HTTP error: {response.status_code}",
-                    )
+            if response.status_code != 200:
+                logger.error(f"SerpApi HTTP error: {response.status_code}")
+                return GoogleLensResponse(
+                    status="Error",
+                    error_message=f"HTTP error: {response.status_code}",
+                )
 
-                data = response.json()
-                return self._parse_response(data)
+            data = response.json()
+            return self._parse_response(data)
 
+        except TimeoutError:
+            self.budget_exceeded += 1
+            logger.error(
+                f"SerpApi latency budget exceeded ({settings.SERPAPI_LATENCY_BUDGET_SECONDS}s)"
+            )
+            return GoogleLensResponse(
+                status="Error",
+                error_message="Request timed out",
+            )
         except httpx.TimeoutException:
             logger.error("SerpApi request timed out")
             return GoogleLensResponse(
@@ -99,6 +204,132 @@ class SerpApiClient:
                 error_message=f"Unexpected error: {str(e)}",
             )
 
+    async def _attempt(self, params: dict[str, str], kind: str) -> httpx.Response:
+        """
+        1回のリクエスト（試行ごとの統計を記録）
+
+        Args:
+            params: クエリパラメータ
+            kind: 試行の種類（primary / retry / hedge）
+        """
+        self.attempts[kind] += 1
+        started = time.perf_counter()
+        try:
+            response = await self.http.get(
+                SERPAPI_BASE_URL,
+                params=params,
+                extensions={"trace": self._trace()},
+            )
+        except httpx.TimeoutException:
+            self.attempt_outcomes["timeout"] += 1
+            raise
+        except httpx.RequestError:
+            self.attempt_outcomes["error"] += 1
+            raise
+        except asyncio.CancelledError:
+            self.attempt_outcomes["cancelled"] += 1
+            raise
+
+        self._latencies.append(time.perf_counter() - started)
+        self.http_versions[response.http_version] += 1
+        self.attempt_outcomes[str(response.status_code)] += 1
+        return response
+
+    async def _get_with_retry(self, params: dict[str, str]) -> httpx.Response:
+        """
+        一時的なエラーをジッター付きの指数バックオフで再試行
+
+        待ち時間がレイテンシ予算の残りを超える場合は再試行しない。
+
+        Returns:
+            最後の試行のレスポンス（リトライ対象のステータスを含む）
+
+        Raises:
+            httpx.RequestError: 最後の試行がタイムアウト・接続エラーの場合
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.SERPAPI_LATENCY_BUDGET_SECONDS
+        attempt = 1
+        while True:
+            kind = "primary" if attempt == 1 else "retry"
+            response: Optional[httpx.Response] = None
+            try:
+                if settings.SERPAPI_HEDGE_ENABLED:
+                    response = await self._hedged_attempt(params, kind)
+                else:
+                    response = await self._attempt(params, kind)
+            except httpx.RequestError as e:
+                error = e
+                reason = type(e).__name__
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                reason = f"HTTP {response.status_code}"
+
+            retry_after = response.headers.get("retry-after") if response is not None else None
+            delay = self._backoff(attempt, retry_after)
+            if attempt >= settings.SERPAPI_MAX_ATTEMPTS or loop.time() + delay >= deadline:
+                logger.warning(f"SerpApi {reason}, giving up after {attempt} attempt(s)")
+                if response is not None:
+                    return response
+                raise error
+
+            logger.warning(f"SerpApi {reason}, retrying in {delay:.2f}s (attempt {attempt + 1})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        再試行までの待ち時間（Full Jitter の指数バックオフ）
+
+        Retry-After（秒）が指定されている場合は、上限の範囲でそれ以上待つ。
+        """
+        ceiling = min(
+            settings.SERPAPI_RETRY_BACKOFF_MAX_SECONDS,
+            settings.SERPAPI_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1),
+        )
+        delay = random.uniform(0, ceiling)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), settings.SERPAPI_RETRY_BACKOFF_MAX_SECONDS))
+        return delay
+
+    def _hedge_delay(self) -> float:
+        """ヘッジを送るまでの待ち時間（直近のレイテンシのp95、サンプル不足時は下限値）"""
+        latencies = sorted(self._latencies)
+        if len(latencies) < settings.SERPAPI_HEDGE_MIN_SAMPLES:
+            return settings.SERPAPI_HEDGE_MIN_DELAY_SECONDS
+        p95 = latencies[int(len(latencies) * 0.95)]
+        return max(p95, settings.SERPAPI_HEDGE_MIN_DELAY_SECONDS)
+
+    async def _hedged_attempt(self, params: dict[str, str], kind: str) -> httpx.Response:
+        """
+        p95を過ぎても応答がなければ2本目を送り、先に成功した方を使う
+
+        成功しなかった場合は、最後に完了した試行の結果を返す（または例外を送出する）。
+        残った試行はキャンセルする。
+        """
+        primary = asyncio.create_task(self._attempt(params, kind))
+        pending: set[asyncio.Task] = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self._hedge_delay())
+            if not done:
+                logger.info("SerpApi response slower than p95, sending hedged request")
+                pending.add(asyncio.create_task(self._attempt(params, "hedge")))
+
+            last: Optional[asyncio.Task] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    last = task
+                    if task.exception() is None and task.result().status_code not in RETRYABLE_STATUS_CODES:
+                        if task is not primary:
+                            self.hedges_won += 1
+                        return task.result()
+            return last.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
     def _parse_response(self, data: dict) -> GoogleLensResponse:
         """SerpApiレスポンスをパース"""
 
@@ -155,5 +386,35 @@ class SerpApiClient:
         )
 
 
+    def stats(self) -> dict[str, Any]:
+        """
+        リクエスト・接続の統計
+
+        attempts はリトライ・ヘッジを含む試行数、
+        reused_connections は接続を再利用した試行数、
+        handshake_saved_ms はそれらで省いたハンドシェイク時間の推定。
+        """
+        handshakes_ms = sorted(handshake * 1000 for handshake in self._handshakes)
+        latencies_ms = sorted(latency * 1000 for latency in self._latencies)
+        handshake_mean_ms = statistics.fmean(handshakes_ms) if handshakes_ms else 0.0
+        reused = max(0, sum(self.attempts.values()) - self.new_connections)
+        return {
+            "http2": self.http2,
+            "requests": self.requests,
+            "attempts": dict(self.attempts),
+            "attempt_outcomes": dict(self.attempt_outcomes),
+            "hedges_won": self.hedges_won,
+            "budget_exceeded": self.budget_exceeded,
+            "new_connections": self.new_connections,
+            "reused_connections": reused,
+            "http_versions": dict(self.http_versions),
+            "handshake_p50_ms": round(statistics.median(handshakes_ms), 1) if handshakes_ms else 0.0,
+            "handshake_max_ms": round(handshakes_ms[-1], 1) if handshakes_ms else 0.0,
+            "handshake_saved_ms": round(reused * handshake_mean_ms, 1),
+            "latency_p50_ms": round(statistics.median(latencies_ms), 1) if latencies_ms else 0.0,
+            "latency_p95_ms": round(latencies_ms[int(len(latencies_ms) * 0.95)], 1) if latencies_ms else 0.0,
+        }
+
+
 # シングルトンインスタンス
 serpapi_client = SerpApiClient()
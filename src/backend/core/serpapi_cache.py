@@ -0,0 +1,188 @@
+"""
+SerpApi Google Lens レスポンスキャッシュ
+
+画像バイナリのSHA-256と言語・国コードをキーに、パース済みの
+GoogleLensResponse を保持する。
+
+- メモリ層: TTL付きLRU（プロセス内）
+- ディスク層: SQLite（任意、再起動後も有効）
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from backend.core.cache import TTLCache
+from backend.core.config import settings
+from backend.core.logging import get_logger
+from backend.features.agent.vision.serpapi_schema import GoogleLensResponse
+
+logger = get_logger(__name__)
+
+
+class _SQLiteStore:
+    """Lensレスポンスを保存するSQLiteストア（同期API、スレッドから呼び出す）"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS lens_cache ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM lens_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[tuple[str, float]]:
+        """(JSON, 有効期限のUNIX時刻) を取得"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM lens_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM lens_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0], row[1]
+
+    def set(self, key: str, response: str, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lens_cache (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, expires_at),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LensResponseCache:
+    """Google Lensレスポンスの2層キャッシュ"""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        sqlite_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            max_entries: メモリ層の最大保持件数
+            ttl_seconds: 有効期間（秒）
+            sqlite_path: ディスク層のSQLiteファイルパス（Noneの場合はメモリ層のみ）
+        """
+        self.ttl_seconds = ttl_seconds
+        self._memory: TTLCache[GoogleLensResponse] = TTLCache(
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+        )
+        self._sqlite_path = sqlite_path
+        self._disk: Optional[_SQLiteStore] = None
+        self.disk_hits = 0
+        self.disk_errors = 0
+
+    @staticmethod
+    def make_key(content_hash: str, language: str, country: str) -> str:
+        return f"{content_hash}:{language}:{country}"
+
+    def _get_disk(self) -> Optional[_SQLiteStore]:
+        """ディスク層を遅延初期化で取得"""
+        if self._disk is None and self._sqlite_path:
+            self._disk = _SQLiteStore(self._sqlite_path)
+            logger.info(f"Lens cache SQLite store opened: {self._sqlite_path}")
+        return self._disk
+
+    async def get(
+        self,
+        content_hash: str,
+        language: str = "ja",
+        country: str = "jp",
+    ) -> Optional[GoogleLensResponse]:
+        """
+        キャッシュ済みのレスポンスを取得
+
+        メモリ層 → ディスク層の順に参照し、ディスク層でヒットした場合はメモリ層に昇格する。
+        """
+        key = self.make_key(content_hash, language, country)
+
+        cached = self._memory.get(key)
+        if cached is not None:
+            return cached
+
+        if not self._sqlite_path:
+            return None
+
+        try:
+            row = await asyncio.to_thread(lambda: self._get_disk().get(key))
+        except Exception as e:
+            self.disk_errors += 1
+            logger.warning(f"Lens cache SQLite read failed: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        response_json, expires_at = row
+        response = GoogleLensResponse.model_validate_json(response_json)
+        self._memory.set(key, response, ttl_seconds=max(0.0, expires_at - time.time()))
+        self.disk_hits += 1
+        return response
+
+    async def set(
+        self,
+        content_hash: str,
+        response: GoogleLensResponse,
+        language: str = "ja",
+        country: str = "jp",
+    ) -> None:
+        """成功したレスポンスのみ保存"""
+        if response.status != "Success":
+            return
+
+        key = self.make_key(content_hash, language, country)
+        self._memory.set(key, response)
+
+        if not self._sqlite_path:
+            return
+
+        expires_at = time.time() + self.ttl_seconds
+        try:
+            await asyncio.to_thread(
+                lambda: self._get_disk().set(key, response.model_dump_json(), expires_at)
+            )
+        except Exception as e:
+            self.disk_errors += 1
+            logger.warning(f"Lens cache SQLite write failed: {e}")
+
+    def close(self) -> None:
+        """ディスク層を閉じる"""
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+    def stats(self) -> dict[str, Any]:
+        """キャッシュの統計"""
+        return {
+            **self._memory.stats(),
+            "disk_enabled": bool(self._sqlite_path),
+            "disk_hits": self.disk_hits,
+            "disk_errors": self.disk_errors,
+        }
+
+
+# シングルトンインスタンス
+lens_cache = LensResponseCache(
+    max_entries=settings.SERPAPI_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SERPAPI_CACHE_TTL_SECONDS,
+    sqlite_path=settings.SERPAPI_CACHE_SQLITE_PATH,
+)
@@ -0,0 +1,104 @@
+"""
+リクエスト合流（single-flight）モジュール
+
+同じキーの処理が実行中であれば新たに実行せず、実行中の処理の完了を待って
+結果を共有する。同一画像・同一商品への同時リクエストで外部API呼び出しが
+重複するのを防ぐ。
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+from backend.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    """実行中の処理と、その結果を待っている呼び出し元の数"""
+
+    def __init__(self, task: "asyncio.Task[T]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    キーごとに実行中の処理を1つにまとめる
+
+    - 処理は呼び出し元から独立したタスクとして実行し、先頭の呼び出し元が
+      キャンセルされても他の待機者には結果を返す
+    - 待機者が全員キャンセルされた場合のみ処理をキャンセルする
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        """
+        Args:
+            name: ログ・統計用の名前
+            enabled: Falseの場合は合流せず毎回実行する
+        """
+        self.name = name
+        self.enabled = enabled
+        self._calls: dict[Hashable, _Call[T]] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def in_flight(self, key: Optional[Hashable]) -> bool:
+        """キーの処理が実行中か"""
+        return self.enabled and key is not None and key in self._calls
+
+    async def do(
+        self,
+        key: Optional[Hashable],
+        fn: Callable[[], Awaitable[T]],
+    ) -> T:
+        """
+        キーの処理を実行、または実行中の処理の結果を待つ
+
+        Args:
+            key: 合流に使うキー（Noneの場合は合流せず実行）
+            fn: 実行する処理
+
+        Returns:
+            処理の結果（例外も待機者全員に伝播する）
+        """
+        if not self.enabled or key is None:
+            return await fn()
+
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"Single-flight [{self.name}] joined in-flight call: {key}")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _Call[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # 待機者がいない状態で失敗した場合に "never retrieved" 警告を出さない
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self) -> dict[str, Any]:
+        """合流の統計"""
+        total = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesce_rate": round(self.coalesced / total, 3) if total else 0.0,
+        }
@@ -2,125 +2,218 @@
 Cloud Storageクライアントモジュール
 
 商品画像のアップロード・取得を担当。
+保存先の操作はストレージバックエンド（storage_backends）に委譲し、
+アップロード・コピー・削除はイベントループをブロックしない。
+
+査定画像のアップロードは1回のみ行う。SerpApi用の一時画像は内容のハッシュを
+パスとし（temp/serpapi/{sha256}.jpg）、同じ画像は再アップロードせず、
+有効期間内の署名付きURLも再利用する（URLが同一になりSerpApi側のキャッシュが効く）。
+一時画像と同じ画像を保存する場合は、ユーザーのパスへサーバー側でコピーし、
+プロセスから再アップロードしない。一時画像はバケットのライフサイクルルールで
+削除する（docs/googlecloud.md 参照）。
+保存する査定画像は外部APIに渡した正規化済みの画像（長辺 IMAGE_NORMALIZE_MAX_EDGE 以下・
+EXIFなどのメタデータ除去済み）で、元の解像度の画像は保存しない。
+
+署名付きURLはパスごとにキャッシュし、有効期限の手前まで再利用する
+（Cloud RunのADCではV4署名がIAM signBlob APIの呼び出しになるため）。
 """
-import base64
-import io
-import re
+import asyncio
+import mimetypes
+import statistics
+import time
+from collections import deque
 from datetime import timedelta
-from typing import Optional
-
-from google.cloud import storage
-from PIL import Image
+from typing import Any, Optional
 
+from backend.core.cache import TTLCache
 from backend.core.config import settings
+from backend.core.image import ImagePayload, normalize_image
+from backend.core.image_pool import image_pool
 from backend.core.logging import get_logger
+from backend.core.storage_backends import (
+    StorageBackend,
+    StorageObjectNotFoundError,
+    create_storage_backend,
+)
 
 
 logger = get_logger(__name__)
 
+# 一時画像をコピー元として使う期間（ライフサイクルルールによる削除より十分短くする）
+TEMP_IMAGE_REUSE_SECONDS = 60 * 60
+TEMP_IMAGE_MAX_ENTRIES = 1000
 
-class StorageClient:
-    """Cloud Storageクライアントのラッパー"""
+# 署名付きURLを再利用する場合に必要な残りの有効期間
+# （クライアント・SerpApiが画像を取得するまでの猶予。有効期間の一定割合と秒数の大きい方）
+SIGNED_URL_MIN_REMAINING_SECONDS = 60
+SIGNED_URL_MIN_REMAINING_RATIO = 0.2
 
-    def __init__(self):
-        self._client: Optional[storage.Client] = None
-        self._bucket: Optional[storage.Bucket] = None
+# 署名にかかった時間の統計に使う直近のサンプル数
+SIGNING_LATENCY_SAMPLES = 256
 
-    @property
-    def client(self) -> storage.Client:
-        """遅延初期化でStorageクライアント取得"""
-        if self._client is None:
-            self._client = storage.Client()
-            logger.info("Cloud Storage client initialized")
-        return self._client
 
-    @property
-    def bucket(self) -> storage.Bucket:
-        """バケット参照を取得"""
-        if self._bucket is None:
-            self._bucket = self.client.bucket(settings.GCS_BUCKET_NAME)
-            logger.info(f"Using bucket: {settings.GCS_BUCKET_NAME}")
-        return self._bucket
-
-    def _decode_base64_image(self, image_base64: str) -> bytes:
-        """
-        Base64画像をデコード
+def image_extension(image: ImagePayload) -> str:
+    """MIMEタイプに対応する拡張子"""
+    return mimetypes.guess_extension(image.mime_type) or ".img"
 
-        data:image/png;base64,... 形式とプレーンBase64の両方に対応
-        """
-        # Data URI形式の場合はプレフィックスを除去
-        if image_base64.startswith("data:"):
-            match = re.match(r"data:image/[^;]+;base64,(.+)", image_base64)
-            if match:
-                image_base64 = match.group(1)
 
-        return base64.b64decode(image_base64)
+def temp_image_path(image: ImagePayload) -> str:
+    """SerpApi用一時画像のパス（内容のハッシュから決まる）"""
+    return f"temp/serpapi/{image.sha256}{image_extension(image)}"
 
-    def _convert_to_webp(self, image_bytes: bytes, quality: int = 85) -> bytes:
-        """
-        画像をWebP形式に変換
 
-        Args:
-            image_bytes: 元画像のバイナリデータ
-            quality: 画質（1-100）
+def signed_url_min_remaining_seconds(expiration_minutes: int) -> float:
+    """キャッシュから返す署名付きURLに保証される残りの有効期間（秒）"""
+    return max(SIGNED_URL_MIN_REMAINING_SECONDS, expiration_minutes * 60 * SIGNED_URL_MIN_REMAINING_RATIO)
 
-        Returns:
-            WebP形式のバイナリデータ
+
+def signed_url_reuse_seconds(expiration_minutes: int) -> float:
+    """署名付きURLを再利用できる期間（秒）"""
+    return expiration_minutes * 60 - signed_url_min_remaining_seconds(expiration_minutes)
+
+
+class StorageClient:
+    """Cloud Storageクライアントのラッパー"""
+
+    def __init__(self, backend: Optional[StorageBackend] = None):
         """
-        with Image.open(io.BytesIO(image_bytes)) as img:
-            # RGBAの場合はRGBに変換（WebPは透過もサポートするが、写真なので不要）
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
+        Args:
+            backend: ストレージバックエンド（Noneの場合は設定値から生成）
+        """
+        self._backend = backend
+        # 画像のSHA-256 → 存在を確認済みの一時画像のパス
+        self._temp_images: TTLCache[str] = TTLCache(
+            max_entries=TEMP_IMAGE_MAX_ENTRIES,
+            ttl_seconds=TEMP_IMAGE_REUSE_SECONDS,
+        )
+        # (パス, 有効期限) → 署名付きURL（有効期限の手前で失効）
+        self._signed_urls: TTLCache[str] = TTLCache(
+            max_entries=settings.SIGNED_URL_CACHE_MAX_ENTRIES,
+            ttl_seconds=signed_url_reuse_seconds(settings.GCS_IMAGE_EXPIRATION_MINUTES),
+        )
+        self._signing_latencies: deque[float] = deque(maxlen=SIGNING_LATENCY_SAMPLES)
+        self.signings = 0
+        self.uploads = 0
+        self.copies = 0
+        self.temp_reused = 0
 
-            output = io.BytesIO()
-            img.save(output, format="WEBP", quality=quality)
-            return output.getvalue()
+    @property
+    def backend(self) -> StorageBackend:
+        """遅延初期化でストレージバックエンド取得"""
+        if self._backend is None:
+            self._backend = create_storage_backend()
+            logger.info(f"Storage backend initialized: {self._backend.name}")
+        return self._backend
+
+    async def close(self) -> None:
+        """バックエンドの接続を解放"""
+        if self._backend is not None:
+            await self._backend.close()
 
     async def upload_image(
         self,
         user_id: str,
         appraisal_id: str,
-        image_base64: str,
+        image: ImagePayload,
     ) -> str:
         """
-        Base64画像をWebP形式でCloud Storageにアップロード
+        査定画像をCloud Storageに保存
+
+        SerpApi用に同じ画像をアップロード済みの場合はサーバー側でコピーする。
 
         Args:
             user_id: ユーザーID
             appraisal_id: 査定ID
-            image_base64: Base64エンコードされた画像
+            image: 査定に使用した画像（正規化済み）
 
         Returns:
             保存先のパス（gs://bucket/path 形式ではなく、相対パス）
         """
         try:
-            # Base64デコード
-            image_bytes = self._decode_base64_image(image_base64)
-
-            # WebP変換
-            webp_bytes = self._convert_to_webp(image_bytes)
-
-            # アップロード先パス
-            image_path = f"users/{user_id}/{appraisal_id}.webp"
+            # 保存先パス
+            image_path = f"users/{user_id}/{appraisal_id}{image_extension(image)}"
+
+            # SerpApi用の一時画像があればコピー（画像データを再送信しない）
+            temp_path = self._temp_images.get(image.sha256)
+            if temp_path is not None:
+                try:
+                    await self.backend.copy(temp_path, image_path)
+                    self.copies += 1
+                    logger.info(f"Copied image: {temp_path} -> {image_path}")
+                    return image_path
+                except StorageObjectNotFoundError:
+                    logger.info(f"Temp image already deleted, uploading: {temp_path}")
+                    self._temp_images.delete(image.sha256)
 
             # アップロード
-            blob = self.bucket.blob(image_path)
-            blob.upload_from_string(webp_bytes, content_type="image/webp")
+            await self.backend.upload(image_path, image.data, image.mime_type)
+            self.uploads += 1
 
-            logger.info(f"Uploaded image: {image_path} ({len(webp_bytes)} bytes)")
+            logger.info(f"Uploaded image: {image_path} ({image.size_bytes} bytes)")
             return image_path
 
         except Exception as e:
             logger.error(f"Failed to upload image: {e}", exc_info=True)
             raise
 
-    def get_signed_url(
+    async def upload_renditions(
+        self,
+        user_id: str,
+        appraisal_id: str,
+        image: ImagePayload,
+        sizes: Optional[list[int]] = None,
+    ) -> dict[str, str]:
+        """
+        査定画像の縮小版（サムネイル）を生成して保存
+
+        元画像より小さいサイズのみ生成し、元画像と同じ場所に保存する
+        （users/{user_id}/{appraisal_id}_{size}.jpg）。
+
+        Args:
+            user_id: ユーザーID
+            appraisal_id: 査定ID
+            image: 査定に使用した画像
+            sizes: 長辺のサイズ（px）のリスト、Noneの場合は設定値を使用
+
+        Returns:
+            長辺のサイズ（文字列） → 保存先のパス（失敗したサイズは含まない）
+        """
+        if sizes is None:
+            sizes = settings.IMAGE_RENDITION_SIZES
+        sizes = sorted({size for size in sizes if size < max(image.width, image.height)})
+
+        async def upload_rendition(size: int) -> str:
+            # 縮小・再エンコードはCPU負荷が高いためプロセスプールで実行
+            rendition = await image_pool.run(
+                normalize_image, image, size, settings.IMAGE_RENDITION_QUALITY
+            )
+            path = f"users/{user_id}/{appraisal_id}_{size}{image_extension(rendition)}"
+            await self.backend.upload(path, rendition.data, rendition.mime_type)
+            self.uploads += 1
+            return path
+
+        results = await asyncio.gather(
+            *(upload_rendition(size) for size in sizes),
+            return_exceptions=True,
+        )
+
+        renditions: dict[str, str] = {}
+        for size, result in zip(sizes, results, strict=True):
+            if isinstance(result, BaseException):
+                logger.warning(f"Failed to upload {size}px rendition: {result}")
+            else:
+                renditions[str(size)] = result
+        if renditions:
+            logger.info(f"Uploaded image renditions: {renditions}")
+        return renditions
+
+    async def get_signed_url(
         self,
         image_path: str,
         expiration_minutes: Optional[int] = None,
     ) -> str:
         """
-        署名付きURLを生成
+        署名付きURLを取得（有効期限の手前まではキャッシュを返す）
 
         Args:
             image_path: 画像のパス
@@ -132,12 +225,57 @@ class StorageClient:
         if expiration_minutes is None:
             expiration_minutes = settings.GCS_IMAGE_EXPIRATION_MINUTES
 
-        blob = self.bucket.blob(image_path)
-        url = blob.generate_signed_url(
-            expiration=timedelta(minutes=expiration_minutes),
-            method="GET",
+        key = (image_path, expiration_minutes)
+        url = self._signed_urls.get(key)
+        if url is not None:
+            return url
+
+        # 署名はIAM APIの呼び出しになる場合があるためスレッドで実行
+        url = await asyncio.to_thread(self._sign, image_path, expiration_minutes)
+        reuse_seconds = signed_url_reuse_seconds(expiration_minutes)
+        if reuse_seconds > 0:
+            self._signed_urls.set(key, url, ttl_seconds=reuse_seconds)
+        return url
+
+    async def get_signed_urls(
+        self,
+        image_paths: list[str],
+        expiration_minutes: Optional[int] = None,
+    ) -> dict[str, str]:
+        """
+        複数の画像の署名付きURLを並行して取得
+
+        Args:
+            image_paths: 画像のパスのリスト
+            expiration_minutes: 有効期限（分）、Noneの場合は設定値を使用
+
+        Returns:
+            パス → 署名付きURL（署名に失敗したパスは含まない）
+        """
+        unique_paths = list(dict.fromkeys(image_paths))
+        results = await asyncio.gather(
+            *(self.get_signed_url(path, expiration_minutes) for path in unique_paths),
+            return_exceptions=True,
         )
 
+        urls: dict[str, str] = {}
+        for path, result in zip(unique_paths, results, strict=True):
+            if isinstance(result, BaseException):
+                logger.warning(f"Failed to generate signed URL for {path}: {result}")
+            else:
+                urls[path] = result
+        return urls
+
+    def _sign(self, image_path: str, expiration_minutes: int) -> str:
+        """署名付きURLを生成し、かかった時間を記録"""
+        started = time.perf_counter()
+        url = self.backend.generate_signed_url(
+            image_path,
+            timedelta(minutes=expiration_minutes),
+        )
+        self._signing_latencies.append(time.perf_counter() - started)
+        self.signings += 1
+
         logger.debug(f"Generated signed URL for: {image_path}")
         return url
 
@@ -152,8 +290,7 @@ class StorageClient:
             削除成功時はTrue
         """
         try:
-            blob = self.bucket.blob(image_path)
-            blob.delete()
+            await self.backend.delete(image_path)
             logger.info(f"Deleted image: {image_path}")
             return True
         except Exception as e:
@@ -162,44 +299,66 @@ class StorageClient:
 
     async def upload_temp_image_for_serpapi(
         self,
-        image_base64: str,
+        image: ImagePayload,
     ) -> str:
         """
         SerpApi用に一時画像をアップロードし、署名付きURLを返す
 
+        同じ画像が既にあればアップロードせず、有効期間内の署名付きURLは再利用する。
+
         Args:
-            image_base64: Base64エンコードされた画像
+            image: デコード済みの画像
 
         Returns:
             署名付きURL（短い有効期限）
         """
-        import uuid
-
         try:
-            # Base64デコード（WebP変換はしない - SerpApiへそのまま送信）
-            image_bytes = self._decode_base64_image(image_base64)
+            temp_path = temp_image_path(image)
 
-            # 一時パス
-            temp_id = str(uuid.uuid4())
-            temp_path = f"temp/serpapi/{temp_id}.jpg"
-
-            # アップロード
-            blob = self.bucket.blob(temp_path)
-            blob.upload_from_string(image_bytes, content_type="image/jpeg")
-
-            # 短い有効期限の署名付きURL生成
-            url = blob.generate_signed_url(
-                expiration=timedelta(minutes=settings.SERPAPI_IMAGE_EXPIRATION_MINUTES),
-                method="GET",
+            # オブジェクトの確保と署名付きURLの生成を並行して行う
+            # （署名はオブジェクトの存在を必要としない）
+            _, url = await asyncio.gather(
+                self._ensure_temp_image(image, temp_path),
+                self.get_signed_url(temp_path, settings.SERPAPI_IMAGE_EXPIRATION_MINUTES),
             )
-
-            logger.info(f"Uploaded temp image for SerpApi: {temp_path}")
             return url
 
         except Exception as e:
             logger.error(f"Failed to upload temp image for SerpApi: {e}", exc_info=True)
             raise
 
+    async def _ensure_temp_image(self, image: ImagePayload, temp_path: str) -> None:
+        """一時画像が存在しなければアップロード"""
+        if self._temp_images.get(image.sha256) is not None:
+            self.temp_reused += 1
+            return
+
+        if await self.backend.exists(temp_path):
+            self.temp_reused += 1
+            logger.info(f"Reusing temp image for SerpApi: {temp_path}")
+        else:
+            await self.backend.upload(temp_path, image.data, image.mime_type)
+            self.uploads += 1
+            logger.info(f"Uploaded temp image for SerpApi: {temp_path}")
+        self._temp_images.set(image.sha256, temp_path)
+
+    def stats(self) -> dict[str, Any]:
+        """アップロード・サーバー側コピー・一時画像再利用・署名の統計"""
+        latencies_ms = sorted(latency * 1000 for latency in self._signing_latencies)
+        return {
+            "uploads": self.uploads,
+            "copies": self.copies,
+            "temp_reused": self.temp_reused,
+            "temp_images": len(self._temp_images),
+            "signed_urls": {
+                **self._signed_urls.stats(),
+                "signings": self.signings,
+                "sign_p50_ms": round(statistics.median(latencies_ms), 1) if latencies_ms else 0.0,
+                "sign_p95_ms": round(latencies_ms[int(len(latencies_ms) * 0.95)], 1) if latencies_ms else 0.0,
+                "sign_max_ms": round(latencies_ms[-1], 1) if latencies_ms else 0.0,
+            },
+        }
+
 
 # シングルトンインスタンス
 storage_client = StorageClient()
@@ -0,0 +1,333 @@
+"""
+ストレージバックエンド
+
+StorageClient が使用するオブジェクトストレージの実装。
+
+- GCSStorageBackend: Cloud Storage JSON API を共有の httpx.AsyncClient（コネクションプール）で
+  呼び出す。イベントループをブロックせず、操作ごとにタイムアウトを設定する
+- MemoryStorageBackend: プロセス内のdictに保存（ベンチマーク・テスト用、レイテンシを模擬可能）
+- FilesystemStorageBackend: ローカルディレクトリに保存（バケットなしでの開発用）
+
+STORAGE_BACKEND 設定（gcs / memory / filesystem）で切り替える。
+"""
+import asyncio
+import shutil
+from abc import ABC, abstractmethod
+import threading
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+import google.auth
+import google.auth.credentials
+import google.auth.transport.requests
+import httpx
+from google.cloud import storage
+
+from backend.core.config import settings
+from backend.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+GCS_API_URL = "https://storage.googleapis.com/storage/v1"
+GCS_UPLOAD_URL = "https://storage.googleapis.com/upload/storage/v1"
+# Cloud Run・GCEのメタデータサーバーは要求したスコープのトークンを返すため、
+# 署名付きURLの生成に使う IAM signBlob API も呼べる cloud-platform を要求する
+# （devstorage.read_write のみだと signBlob が403になる）
+GCS_SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+
+class StorageError(Exception):
+    """ストレージ操作のエラー"""
+
+
+class StorageObjectNotFoundError(StorageError):
+    """対象のオブジェクトが存在しない"""
+
+
+class StorageBackend(ABC):
+    """
+    ストレージバックエンドの共通インターフェース
+
+    抽象メソッドを実装していないバックエンドはインスタンス化の時点でエラーになる。
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def upload(self, path: str, data: bytes, content_type: str) -> None:
+        """オブジェクトを保存（既存の場合は上書き）"""
+
+    @abstractmethod
+    async def exists(self, path: str) -> bool:
+        """オブジェクトが存在するか"""
+
+    @abstractmethod
+    async def copy(self, source_path: str, dest_path: str) -> None:
+        """
+        オブジェクトをコピー
+
+        Raises:
+            StorageObjectNotFoundError: コピー元が存在しない場合
+        """
+
+    @abstractmethod
+    async def delete(self, path: str) -> None:
+        """
+        オブジェクトを削除
+
+        Raises:
+            StorageObjectNotFoundError: 対象が存在しない場合
+        """
+
+    @abstractmethod
+    def generate_signed_url(self, path: str, expiration: timedelta) -> str:
+        """読み取り用の署名付きURLを生成"""
+
+    async def close(self) -> None:
+        """接続などのリソースを解放"""
+
+
+class GCSStorageBackend(StorageBackend):
+    """Cloud Storage JSON API による非同期バックエンド"""
+
+    name = "gcs"
+
+    def __init__(
+        self,
+        bucket_name: str,
+        timeout: float,
+        upload_timeout: float,
+        max_connections: int,
+    ):
+        """
+        Args:
+            bucket_name: バケット名
+            timeout: コピー・削除のタイムアウト（秒）
+            upload_timeout: アップロードのタイムアウト（秒）
+            max_connections: コネクションプールの最大接続数
+        """
+        self.bucket_name = bucket_name
+        self.timeout = timeout
+        self.upload_timeout = upload_timeout
+        self.max_connections = max_connections
+        self._http: Optional[httpx.AsyncClient] = None
+        self._credentials: Optional[google.auth.credentials.Credentials] = None
+        self._credentials_lock = threading.Lock()
+        self._signing_bucket: Optional[storage.Bucket] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """遅延初期化で共有HTTPクライアントを取得"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=self.timeout,
+            )
+            logger.info(f"GCS HTTP client initialized: max_connections={self.max_connections}")
+        return self._http
+
+    def _valid_credentials(self) -> google.auth.credentials.Credentials:
+        """
+        有効な認証情報を取得（ブロッキング）
+
+        ADCの解決は初回のみ行い、以降はトークンの期限切れ時だけ更新する。
+        """
+        with self._credentials_lock:
+            if self._credentials is None:
+                self._credentials, _ = google.auth.default(scopes=GCS_SCOPES)
+            if not self._credentials.valid:
+                self._credentials.refresh(google.auth.transport.requests.Request())
+            return self._credentials
+
+    async def _auth_headers(self) -> dict[str, str]:
+        """アクセストークンを取得（期限切れの場合はスレッドで更新）"""
+        credentials = self._credentials
+        if credentials is None or not credentials.valid:
+            credentials = await asyncio.to_thread(self._valid_credentials)
+        return {"Authorization": f"Bearer {credentials.token}"}
+
+    def _object_url(self, path: str) -> str:
+        return f"{GCS_API_URL}/b/{self.bucket_name}/o/{quote(path, safe='')}"
+
+    async def _request(self, method: str, url: str, timeout: float, **kwargs) -> httpx.Response:
+        headers = {**kwargs.pop("headers", {}), **await self._auth_headers()}
+        # httpxのタイムアウトは接続・読み書きの各段階ごとのため、操作全体にも上限を設ける
+        async with asyncio.timeout(timeout):
+            response = await self.http.request(method, url, headers=headers, timeout=timeout, **kwargs)
+        if response.status_code == 404:
+            raise StorageObjectNotFoundError(url)
+        if response.is_error:
+            raise StorageError(f"GCS {method} failed: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+    async def upload(self, path: str, data: bytes, content_type: str) -> None:
+        await self._request(
+            "POST",
+            f"{GCS_UPLOAD_URL}/b/{self.bucket_name}/o",
+            self.upload_timeout,
+            params={"uploadType": "media", "name": path},
+            headers={"Content-Type": content_type},
+            content=data,
+        )
+
+    async def exists(self, path: str) -> bool:
+        try:
+            await self._request("GET", self._object_url(path), self.timeout, params={"fields": "name"})
+            return True
+        except StorageObjectNotFoundError:
+            return False
+
+    async def copy(self, source_path: str, dest_path: str) -> None:
+        # サーバー側でコピー（データはプロセスを経由しない）
+        await self._request(
+            "POST",
+            f"{self._object_url(source_path)}/copyTo/b/{self.bucket_name}/o/{quote(dest_path, safe='')}",
+            self.timeout,
+        )
+
+    async def delete(self, path: str) -> None:
+        await self._request("DELETE", self._object_url(path), self.timeout)
+
+    def generate_signed_url(self, path: str, expiration: timedelta) -> str:
+        # 署名はgoogle-cloud-storageの実装を使い、認証情報はAPI呼び出しと共有する
+        credentials = self._valid_credentials()
+        if self._signing_bucket is None:
+            self._signing_bucket = storage.Client(
+                project=settings.GCP_PROJECT_ID,
+                credentials=credentials,
+            ).bucket(self.bucket_name)
+
+        kwargs: dict[str, str] = {}
+        if not isinstance(credentials, google.auth.credentials.Signing):
+            # 秘密鍵を持たない認証情報（Cloud RunのADCなど）はIAM signBlob APIで署名する
+            kwargs = {
+                "service_account_email": credentials.service_account_email,
+                "access_token": credentials.token,
+            }
+        return self._signing_bucket.blob(path).generate_signed_url(
+            version="v4",
+            expiration=expiration,
+            method="GET",
+            credentials=credentials,
+            **kwargs,
+        )
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+class MemoryStorageBackend(StorageBackend):
+    """プロセス内メモリに保存するバックエンド（ベンチマーク・テスト用）"""
+
+    name = "memory"
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Args:
+            latency: 各操作に加える待ち時間（秒）。ネットワーク越しの操作を模擬する
+        """
+        self.latency = latency
+        self.objects: dict[str, tuple[bytes, str]] = {}
+
+    async def _wait(self) -> None:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    async def upload(self, path: str, data: bytes, content_type: str) -> None:
+        await self._wait()
+        self.objects[path] = (data, content_type)
+
+    async def exists(self, path: str) -> bool:
+        await self._wait()
+        return path in self.objects
+
+    async def copy(self, source_path: str, dest_path: str) -> None:
+        await self._wait()
+        if source_path not in self.objects:
+            raise StorageObjectNotFoundError(source_path)
+        self.objects[dest_path] = self.objects[source_path]
+
+    async def delete(self, path: str) -> None:
+        await self._wait()
+        if self.objects.pop(path, None) is None:
+            raise StorageObjectNotFoundError(path)
+
+    def generate_signed_url(self, path: str, expiration: timedelta) -> str:
+        return f"memory://{path}"
+
+
+class FilesystemStorageBackend(StorageBackend):
+    """ローカルディレクトリに保存するバックエンド（開発用）"""
+
+    name = "filesystem"
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: 保存先のディレクトリ
+        """
+        self.root = Path(root).resolve()
+
+    def _file(self, path: str) -> Path:
+        file = (self.root / path).resolve()
+        if not file.is_relative_to(self.root):
+            raise StorageError(f"Invalid object path: {path}")
+        return file
+
+    def _write(self, path: str, data: bytes) -> None:
+        file = self._file(path)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_bytes(data)
+
+    def _copy(self, source_path: str, dest_path: str) -> None:
+        source = self._file(source_path)
+        if not source.exists():
+            raise StorageObjectNotFoundError(source_path)
+        dest = self._file(dest_path)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, dest)
+
+    def _delete(self, path: str) -> None:
+        try:
+            self._file(path).unlink()
+        except FileNotFoundError as e:
+            raise StorageObjectNotFoundError(path) from e
+
+    async def upload(self, path: str, data: bytes, content_type: str) -> None:
+        await asyncio.to_thread(self._write, path, data)
+
+    async def exists(self, path: str) -> bool:
+        return await asyncio.to_thread(self._file(path).exists)
+
+    async def copy(self, source_path: str, dest_path: str) -> None:
+        await asyncio.to_thread(self._copy, source_path, dest_path)
+
+    async def delete(self, path: str) -> None:
+        await asyncio.to_thread(self._delete, path)
+
+    def generate_signed_url(self, path: str, expiration: timedelta) -> str:
+        return self._file(path).as_uri()
+
+
+def create_storage_backend() -> StorageBackend:
+    """設定値に応じたバックエンドを生成"""
+    backend = settings.STORAGE_BACKEND
+    if backend == "gcs":
+        return GCSStorageBackend(
+            bucket_name=settings.GCS_BUCKET_NAME,
+            timeout=settings.STORAGE_TIMEOUT_SECONDS,
+            upload_timeout=settings.STORAGE_UPLOAD_TIMEOUT_SECONDS,
+            max_connections=settings.STORAGE_MAX_CONNECTIONS,
+        )
+    if backend == "memory":
+        return MemoryStorageBackend()
+    if backend == "filesystem":
+        return FilesystemStorageBackend(settings.STORAGE_FILESYSTEM_ROOT)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
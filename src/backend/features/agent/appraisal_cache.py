@@ -0,0 +1,154 @@
+"""
+査定結果キャッシュ
+
+画像の知覚ハッシュをキーに、vision → search → price の結果を保持する。
+同一画像だけでなく、再圧縮・リサイズ等による近似画像も
+ハミング距離の閾値以内であればキャッシュから返す。
+"""
+import threading
+from typing import Any, Optional
+
+from backend.core.cache import TTLCache
+from backend.core.config import settings
+from backend.core.image import ImagePayload
+from backend.core.logging import get_logger
+from backend.core.phash import BKTree, dhash
+
+logger = get_logger(__name__)
+
+# キャッシュ対象のキー
+RESULT_KEYS = ("analysis_result", "search_output", "price_output")
+
+
+def compute_image_hash(image: ImagePayload) -> Optional[int]:
+    """
+    画像の知覚ハッシュを計算
+
+    Returns:
+        ハッシュ値、画像として読めない場合はNone
+    """
+    try:
+        return dhash(image.data)
+    except Exception as e:
+        logger.warning(f"Failed to compute image hash: {e}")
+        return None
+
+
+def is_cacheable(result: dict[str, Any]) -> bool:
+    """
+    結果をキャッシュしてよいか判定
+
+    一時的なエラー（Lens検索失敗、LLMエラー等）を含む結果はキャッシュしない。
+    """
+    analysis = result.get("analysis_result")
+    if analysis is None or analysis.category_type == "unknown":
+        return False
+    if analysis.category_type == "prohibited":
+        return True
+
+    search_output = result.get("search_output")
+    if search_output is None or not search_output.search_performed:
+        return False
+    if search_output.analysis.classification == "unique_item":
+        return True
+
+    price_output = result.get("price_output")
+    return price_output is not None and price_output.status == "complete"
+
+
+class AppraisalCache:
+    """知覚ハッシュによる近似一致の査定結果キャッシュ"""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        max_distance: int,
+    ):
+        """
+        Args:
+            max_entries: 最大保持件数
+            ttl_seconds: 有効期間（秒）
+            max_distance: 近似一致とみなすハミング距離の上限
+        """
+        self.max_distance = max_distance
+        self._index = BKTree()
+        self._lock = threading.Lock()
+        self._entries: TTLCache[dict[str, Any]] = TTLCache(
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+            on_evict=lambda key, _: self._index.remove(key),
+        )
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def lookup(self, image_hash: Optional[int]) -> Optional[dict[str, Any]]:
+        """
+        近似画像の査定結果を取得
+
+        Args:
+            image_hash: 画像の知覚ハッシュ
+
+        Returns:
+            analysis_result / search_output / price_output を含む辞書、なければNone
+        """
+        if image_hash is None:
+            return None
+
+        with self._lock:
+            for distance, candidate in self._index.search(image_hash, self.max_distance):
+                result = self._entries.get(candidate)
+                if result is None:
+                    continue
+                if distance == 0:
+                    self.exact_hits += 1
+                else:
+                    self.near_hits += 1
+                logger.info(f"Appraisal cache hit: distance={distance}")
+                return result
+
+            self.misses += 1
+            return None
+
+    def store(self, image_hash: Optional[int], result: dict[str, Any]) -> None:
+        """
+        査定結果を保存（キャッシュ対象外の結果は無視）
+
+        Args:
+            image_hash: 画像の知覚ハッシュ
+            result: エージェントの実行結果
+        """
+        if image_hash is None or not is_cacheable(result):
+            return
+
+        with self._lock:
+            self._entries.set(image_hash, {key: result.get(key) for key in RESULT_KEYS})
+            self._index.add(image_hash)
+
+    def clear(self) -> None:
+        """全エントリを削除"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """キャッシュの統計"""
+        total = self.exact_hits + self.near_hits + self.misses
+        hits = self.exact_hits + self.near_hits
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._entries.max_entries,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "evictions": self._entries.evictions,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+        }
+
+
+# シングルトンインスタンス
+appraisal_cache = AppraisalCache(
+    max_entries=settings.APPRAISAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.APPRAISAL_CACHE_TTL_SECONDS,
+    max_distance=settings.APPRAISAL_CACHE_MAX_DISTANCE,
+)
@@ -1,9 +1,29 @@
+import asyncio
+from typing import TYPE_CHECKING, AsyncGenerator, Any, Optional
+
+from langchain_core.messages import HumanMessage
 from langgraph.graph import StateGraph, START, END
+from pydantic import BaseModel
+
+from backend.core.config import settings
+from backend.core.image import ImagePayload
+from backend.core.singleflight import SingleFlight
+from backend.features.agent.appraisal_cache import (
+    RESULT_KEYS,
+    appraisal_cache,
+    compute_image_hash,
+)
 from backend.features.agent.state import AgentState
 from backend.features.agent.vision.node import vision_node
 from backend.features.agent.search.node import search_node
 from backend.features.agent.price.node import price_node
 
+if TYPE_CHECKING:
+    from backend.features.agent.price.schema import PriceNodeOutput
+    from backend.features.agent.search.schema import SearchAnalysis
+    from backend.features.agent.vision.schema import InitialAnalysis
+    from backend.features.agent.vision.serpapi_schema import GoogleLensResponse
+
 
 # ---------------------------------------------------------
 # 条件分岐関数
@@ -70,8 +90,6 @@ app = workflow.compile()
 # =============================================
 # API呼び出し用関数
 # =============================================
-from langchain_core.messages import HumanMessage
-
 async def run_agent(message: str) -> dict:
     """
     エージェントを実行してレスポンスを返す（テキストのみ）
@@ -99,32 +117,29 @@ async def run_agent(message: str) -> dict:
         "response": str(result), # デバッグ用に全体を返す
     }
 
-async def run_vision_agent(image_data: str) -> dict:
+def build_initial_state(image: ImagePayload) -> dict:
+    """
+    デコード済みの画像からグラフの初期状態を作成
+
+    画像はLLMメッセージにもバイナリのまま参照で渡し、Base64への再エンコードはしない。
+    """
+    return {
+        "messages": [HumanMessage(content=[image.media_block()])],
+        "image": image,
+        "retry_count": 0,
+    }
+
+
+async def run_vision_agent(image: ImagePayload) -> dict:
     """
     画像データを受け取ってエージェントを実行する
     
     Args:
-        image_data: Base64エンコードされた画像文字列 (例: "data:image/jpeg;base64,...")
+        image: API境界でデコード済みの画像
     """
     
-    # LangChainのHumanMessageで画像を渡す形式
-    message = HumanMessage(
-        content=[
-            {
-                "type": "image_url",
-                "image_url": {"url": image_data},
-            }
-        ]
-    )
-    
     # グラフ実行
-    # 初期状態として messages と retry_count を渡す
-    initial_state = {
-        "messages": [message],
-        "retry_count": 0
-    }
-    
-    result = await app.ainvoke(initial_state)
+    result = await app.ainvoke(build_initial_state(image))
     
     # 結果の整形
     # vision_node は analysis_result を返すのでそれを取得
@@ -136,34 +151,22 @@ async def run_vision_agent(image_data: str) -> dict:
         "debug_state": str(result)
     }
 # 既存のrun_analyze_agent関数（後方互換性のため残すが、中身は新関数に置き換え推奨）
-async def run_analyze_agent(image_data: str) -> dict:
-    return await run_vision_agent(image_data)
+async def run_analyze_agent(image: ImagePayload) -> dict:
+    return await run_vision_agent(image)
 
-async def run_search_agent(image_data: str) -> dict:
+async def run_search_agent(image: ImagePayload) -> dict:
     """
     画像データを受け取ってvision_node + search_nodeを実行する
 
     Args:
-        image_data: Base64エンコードされた画像文字列 (例: "data:image/jpeg;base64,...")
+        image: API境界でデコード済みの画像
 
     Returns:
         analysis_result: vision_nodeの分析結果
         search_output: search_nodeの検索・分類結果（processableの場合のみ）
     """
 
-    message = HumanMessage(
-        content=[
-            {
-                "type": "image_url",
-                "image_url": {"url": image_data},
-            }
-        ]
-    )
-
-    initial_state = {
-        "messages": [message],
-        "retry_count": 0,
-    }
+    initial_state = build_initial_state(image)
 
     result = await app.ainvoke(initial_state)
 
@@ -174,12 +177,19 @@ async def run_search_agent(image_data: str) -> dict:
     }
 
 
-async def run_price_agent(image_data: str) -> dict:
+# 同一画像への同時リクエストを1回のパイプライン実行にまとめる（キー: 画像バイナリのSHA-256）
+appraisal_flight: SingleFlight[dict] = SingleFlight("appraisal", enabled=settings.SINGLEFLIGHT_ENABLED)
+
+
+async def run_price_agent(image: ImagePayload) -> dict:
     """
     画像データを受け取ってvision_node + search_node + price_nodeを実行する
 
+    同一・近似画像の査定結果がキャッシュにあれば、パイプラインを実行せずに返す。
+    同一画像の査定が実行中であれば、その結果を待って共有する。
+
     Args:
-        image_data: Base64エンコードされた画像文字列 (例: "data:image/jpeg;base64,...")
+        image: API境界でデコード済みの画像
 
     Returns:
         analysis_result: vision_nodeの分析結果
@@ -187,21 +197,20 @@ async def run_price_agent(image_data: str) -> dict:
         price_output: price_nodeの価格検索結果（mass_productの場合のみ）
     """
 
-    message = HumanMessage(
-        content=[
-            {
-                "type": "image_url",
-                "image_url": {"url": image_data},
-            }
-        ]
-    )
+    image_hash = compute_image_hash(image) if settings.APPRAISAL_CACHE_ENABLED else None
+    cached = appraisal_cache.lookup(image_hash)
+    if cached:
+        return {**cached, "debug_state": "appraisal_cache_hit"}
 
-    initial_state = {
-        "messages": [message],
-        "retry_count": 0,
-    }
+    initial_state = build_initial_state(image)
 
-    result = await app.ainvoke(initial_state)
+    async def run() -> dict:
+        result = await app.ainvoke(initial_state)
+        appraisal_cache.store(image_hash, result)
+        return result
+
+    content_key = image.sha256 if appraisal_flight.enabled else None
+    result = await appraisal_flight.do(content_key, run)
 
     return {
         "analysis_result": result.get("analysis_result"),
@@ -211,18 +220,14 @@ async def run_price_agent(image_data: str) -> dict:
     }
 
 
-from typing import AsyncGenerator, Any
-import asyncio
-
-
-async def stream_price_agent(image_data: str) -> AsyncGenerator[dict[str, Any], None]:
+async def stream_price_agent(image: ImagePayload) -> AsyncGenerator[dict[str, Any], None]:
     """
     画像データを受け取ってvision_node + search_node + price_nodeをストリーミング実行する
 
     LangGraphの astream_events を使用してノードの開始・終了イベントをリアルタイムで配信します。
 
     Args:
-        image_data: Base64エンコードされた画像文字列 (例: "data:image/jpeg;base64,...")
+        image: API境界でデコード済みの画像
 
     Yields:
         event: LangGraphのイベントオブジェクト
@@ -230,19 +235,7 @@ async def stream_price_agent(image_data: str) -> AsyncGenerator[dict[str, Any],
             - name: ノード名 ("node_vision", "node_search", "node_price")
             - data: イベントデータ（ノード終了時は output を含む）
     """
-    message = HumanMessage(
-        content=[
-            {
-                "type": "image_url",
-                "image_url": {"url": image_data},
-            }
-        ]
-    )
-
-    initial_state = {
-        "messages": [message],
-        "retry_count": 0,
-    }
+    initial_state = build_initial_state(image)
 
     # astream_events でノードの開始・終了イベントを取得
     async for event in app.astream_events(initial_state, version="v2"):
@@ -250,7 +243,7 @@ async def stream_price_agent(image_data: str) -> AsyncGenerator[dict[str, Any],
 
 
 async def stream_price_agent_with_thinking(
-    image_data: str,
+    image: ImagePayload,
     thinking_queue: asyncio.Queue,
 ) -> dict:
     """
@@ -261,48 +254,115 @@ async def stream_price_agent_with_thinking(
     1. 各ノードの処理前に思考過程をストリーミング出力
     2. 構造化出力で結果を抽出
 
+    同一・近似画像の査定結果がキャッシュにあれば、各ノードの完了イベントのみ送信して返す。
+    同一画像の査定が実行中であれば、その完了を待って同様に完了イベントのみ送信する。
+
     Args:
-        image_data: Base64エンコードされた画像文字列
+        image: API境界でデコード済みの画像
         thinking_queue: 思考過程を送信するキュー
 
     Returns:
         analysis_result, search_output, price_output を含む辞書
     """
-    from langchain_core.messages import SystemMessage
-    from langchain_google_genai import ChatGoogleGenerativeAI
-    from backend.core.config import settings
-    from backend.core.llm_callbacks import StreamingCallbackHandler
+    image_hash = compute_image_hash(image) if settings.APPRAISAL_CACHE_ENABLED else None
+    cached = appraisal_cache.lookup(image_hash)
+    if cached:
+        await _emit_cached_result(cached, thinking_queue)
+        return dict(cached)
+
+    async def run() -> dict:
+        result = await _stream_price_agent_uncached(image, thinking_queue)
+        appraisal_cache.store(image_hash, result)
+        return result
+
+    content_key = image.sha256 if appraisal_flight.enabled else None
+    if not appraisal_flight.in_flight(content_key):
+        return await appraisal_flight.do(content_key, run)
+
+    # 同じ画像を査定中の処理に合流（思考過程は先行リクエストにのみ配信される）
+    await thinking_queue.put({
+        "type": "thinking",
+        "node": "vision",
+        "content": "同じ画像を査定中のため、結果を待っています...",
+    })
+    shared = await appraisal_flight.do(content_key, run)
+    result = {key: shared.get(key) for key in RESULT_KEYS}
+    await _emit_cached_result(result, thinking_queue, message="同じ画像の査定結果を共有しました。")
+    return result
+
+
+async def _emit_cached_result(
+    result: dict,
+    thinking_queue: asyncio.Queue,
+    message: str = "過去の査定結果から同じ商品が見つかりました。",
+) -> None:
+    """キャッシュ済みの査定結果を、各ノードの完了イベントとしてキューに送信"""
+    analysis_result = result.get("analysis_result")
+    search_output = result.get("search_output")
+    price_output = result.get("price_output")
+
+    await thinking_queue.put({
+        "type": "thinking",
+        "node": "vision",
+        "content": message,
+    })
+    await thinking_queue.put({
+        "type": "node_complete",
+        "node": "vision",
+        "data": {
+            "category_type": analysis_result.category_type,
+            "item_name": analysis_result.item_name,
+        },
+    })
+
+    if search_output:
+        await thinking_queue.put({
+            "type": "node_complete",
+            "node": "search",
+            "data": {
+                "classification": search_output.analysis.classification,
+                "identified_product": search_output.analysis.identified_product,
+            },
+        })
+
+    if price_output:
+        await thinking_queue.put({
+            "type": "node_complete",
+            "node": "price",
+            "data": {
+                "min_price": price_output.valuation.min_price,
+                "max_price": price_output.valuation.max_price,
+            },
+        })
+
+
+async def _stream_price_agent_uncached(
+    image: ImagePayload,
+    thinking_queue: asyncio.Queue,
+) -> dict:
+    """stream_price_agent_with_thinking の本体（キャッシュなし）"""
     from backend.features.agent.vision.schema import InitialAnalysis
-    from backend.features.agent.search.schema import SearchAnalysis, SearchNodeOutput
-    from backend.features.agent.price.schema import PriceAnalysis, PriceNodeOutput, Valuation
     from backend.core.logging import get_logger
 
     logger = get_logger(__name__)
 
-    message = HumanMessage(
-        content=[
-            {
-                "type": "image_url",
-                "image_url": {"url": image_data},
-            }
-        ]
-    )
 
     result = {
         "analysis_result": None,
         "search_output": None,
         "price_output": None,
     }
+    speculation = None
 
     # ========================================
     # Vision Node (SerpApi Google Lens統合)
     # ========================================
-    from backend.core.serpapi import serpapi_client
-    from backend.core.storage import storage_client
+    from backend.features.agent.speculation import Speculation, speculation_stats
+    from backend.features.agent.price.concurrent import concurrent_price
     from backend.features.agent.vision.node import (
-        _extract_image_base64_from_messages,
         _map_lens_result_to_analysis,
         _check_guardrails,
+        _search_lens,
     )
 
     await thinking_queue.put({
@@ -312,34 +372,22 @@ async def stream_price_agent_with_thinking(
     })
 
     try:
-        # Step 1: 画像Base64を抽出
-        image_base64 = _extract_image_base64_from_messages([message])
-        if not image_base64:
-            raise ValueError("画像が見つかりませんでした")
-
-        await thinking_queue.put({
-            "type": "thinking",
-            "node": "vision",
-            "content": "画像をアップロード中...",
-        })
-
-        # Step 2: SerpApi用に画像をGCSにアップロード
-        image_url = await storage_client.upload_temp_image_for_serpapi(image_base64)
-
-        await thinking_queue.put({
-            "type": "thinking",
-            "node": "vision",
-            "content": "Google Lensで類似商品を検索中...",
-        })
+        async def notify_progress(content: str) -> None:
+            await thinking_queue.put({
+                "type": "thinking",
+                "node": "vision",
+                "content": content,
+            })
 
-        # Step 3: ガードレールチェックを並行で開始
-        guardrail_task = asyncio.create_task(_check_guardrails([message]))
+        # Step 2: ガードレールチェックを並行で開始
+        guardrail_task = asyncio.create_task(_check_guardrails(image))
 
-        # Step 4: SerpApi Google Lens検索
-        lens_result = await serpapi_client.search_by_image_url(
-            image_url=image_url,
-            search_type="products",
-        )
+        # Step 3-4: GCSにアップロードしてSerpApi Google Lens検索（キャッシュ対応）
+        try:
+            lens_result = await _search_lens(image, on_progress=notify_progress)
+        except BaseException:
+            guardrail_task.cancel()
+            raise
 
         # 検索結果を通知
         if lens_result.has_matches:
@@ -357,15 +405,38 @@ async def stream_price_agent_with_thinking(
                 "content": "類似商品が見つかりませんでした。",
             })
 
-        # Step 5: ガードレールチェック完了を待機
+        # Step 5: Google Lens結果をマッピング
+        analysis_result = _map_lens_result_to_analysis(lens_result)
+
+        # ガードレール待ちの間に後続ノードを投機実行
+        if (
+            settings.SPECULATIVE_SEARCH_ENABLED
+            and analysis_result.category_type == "processable"
+            and not guardrail_task.done()
+        ):
+            speculative_queue = asyncio.Queue()
+            speculation = Speculation(
+                _stream_downstream_speculatively(analysis_result, lens_result, speculative_queue),
+                speculation_stats,
+            )
+
+        # Step 6: ガードレールチェック完了を待機
         await thinking_queue.put({
             "type": "thinking",
             "node": "vision",
             "content": "安全性チェック中...",
         })
 
-        guardrail_result = await guardrail_task
+        try:
+            guardrail_result = await guardrail_task
+        except BaseException:
+            if speculation:
+                speculation.discard()
+            raise
+
         if guardrail_result:
+            if speculation:
+                speculation.discard()
             result["analysis_result"] = guardrail_result
             await thinking_queue.put({
                 "type": "node_complete",
@@ -377,9 +448,9 @@ async def stream_price_agent_with_thinking(
             })
             return result
 
-        # Step 6: Google Lens結果をマッピング
-        analysis_result = _map_lens_result_to_analysis(lens_result)
         result["analysis_result"] = analysis_result
+        if speculation:
+            speculative_task = speculation.commit()
 
         await thinking_queue.put({
             "type": "node_complete",
@@ -409,6 +480,71 @@ async def stream_price_agent_with_thinking(
     if analysis_result.category_type != "processable":
         return result
 
+    if speculation:
+        # 投機実行で先行していたsearch（/price）の思考過程を転送して結果を取り込む
+        try:
+            while (event := await speculative_queue.get()) is not None:
+                await thinking_queue.put(event)
+            result.update(await speculative_task)
+        except BaseException:
+            speculative_task.cancel()
+            raise
+    else:
+        # 並行価格調査が有効なら、商品名候補で price を search と同時に開始
+        price_task = concurrent_price.start(analysis_result.item_name, analysis_result.visual_features)
+        try:
+            await _stream_search_section(result, analysis_result, thinking_queue, lens_result)
+        except BaseException:
+            if price_task:
+                price_task.cancel()
+            raise
+
+        price_output = await concurrent_price.resolve(
+            price_task, analysis_result.item_name, result["search_output"]
+        )
+        if price_output is not None:
+            result["price_output"] = price_output
+            await thinking_queue.put({
+                "type": "node_start",
+                "node": "price",
+                "message": "価格帯を分析しています...",
+            })
+            await thinking_queue.put({
+                "type": "thinking",
+                "node": "price",
+                "content": "市場調査と並行して調べた相場を使用します。",
+            })
+            await thinking_queue.put({
+                "type": "node_complete",
+                "node": "price",
+                "data": {
+                    "min_price": price_output.valuation.min_price,
+                    "max_price": price_output.valuation.max_price,
+                    "from_cache": price_output.from_cache,
+                },
+            })
+
+    search_output = result["search_output"]
+    if search_output.analysis.classification == "mass_product" and result["price_output"] is None:
+        await _stream_price_section(result, analysis_result, thinking_queue)
+
+    return result
+
+
+async def _stream_search_section(
+    result: dict,
+    analysis_result: "InitialAnalysis",
+    thinking_queue: asyncio.Queue,
+    lens_result: Optional["GoogleLensResponse"] = None,
+) -> None:
+    """search_node相当の処理を思考ストリーム付きで実行し、result["search_output"] に設定"""
+    from backend.features.agent.search.cache import classification_cache
+    from backend.features.agent.search.fast_path import search_fast_path
+    from backend.features.agent.search.schema import SearchAnalysis, SearchNodeOutput
+    from backend.core.logging import get_logger
+
+    logger = get_logger(__name__)
+
     # ========================================
     # Search Node (2段階: 思考ストリーム → 構造化出力)
     # ========================================
@@ -421,6 +557,182 @@ async def stream_price_agent_with_thinking(
     item_name = analysis_result.item_name or "商品"
     visual_features = analysis_result.visual_features or []
 
+    # Lens結果だけで判定できる場合（高速パス）や、
+    # 同じ商品名・特徴の分類結果がキャッシュにあればLLMを呼ばずに返す
+    fast_search = search_fast_path.classify(lens_result)
+    cached_search = fast_search or classification_cache.lookup(analysis_result.item_name, visual_features)
+    if cached_search:
+        result["search_output"] = cached_search
+        search_analysis = cached_search.analysis
+        await thinking_queue.put({
+            "type": "thinking",
+            "node": "search",
+            "content": search_analysis.reasoning if fast_search else "以前の市場調査結果を使用します。",
+        })
+    else:
+        try:
+            search_analysis = await _stream_search_analysis(thinking_queue, item_name, visual_features)
+            result["search_output"] = SearchNodeOutput(
+                search_results=[],
+                analysis=search_analysis,
+                search_performed=True,
+            )
+            classification_cache.store(
+                analysis_result.item_name, visual_features, result["search_output"]
+            )
+
+        except Exception as e:
+            logger.error(f"Search Node Error: {e}", exc_info=True)
+            result["search_output"] = SearchNodeOutput(
+                search_results=[],
+                analysis=SearchAnalysis(
+                    classification="unique_item",
+                    confidence="low",
+                    reasoning=f"検索エラー: {str(e)}",
+                ),
+                search_performed=False,
+            )
+            await thinking_queue.put({
+                "type": "error",
+                "node": "search",
+                "message": str(e),
+            })
+            return
+
+    await thinking_queue.put({
+        "type": "node_complete",
+        "node": "search",
+        "data": {
+            "classification": search_analysis.classification,
+            "identified_product": search_analysis.identified_product,
+        },
+    })
+
+
+async def _stream_price_section(
+    result: dict,
+    analysis_result: "InitialAnalysis",
+    thinking_queue: asyncio.Queue,
+) -> None:
+    """price_node相当の処理を思考ストリーム付きで実行し、result["price_output"] に設定"""
+    from backend.features.agent.price.cache import price_cache
+    from backend.features.agent.price.node import estimate_price
+    from backend.features.agent.price.schema import PriceNodeOutput, Valuation
+    from backend.core.logging import get_logger
+
+    logger = get_logger(__name__)
+
+    # ========================================
+    # Price Node (2段階: 思考ストリーム → 構造化出力)
+    # ========================================
+    await thinking_queue.put({
+        "type": "node_start",
+        "node": "price",
+        "message": "価格帯を分析しています...",
+    })
+
+    item_name = analysis_result.item_name or "商品"
+    visual_features = analysis_result.visual_features or []
+    search_analysis = result["search_output"].analysis
+    identified_product = search_analysis.identified_product or item_name
+
+    # 同じ商品の相場がキャッシュにあればLLMを呼ばずに返す（古い場合は裏で再計算）
+    cached_price = price_cache.lookup(
+        identified_product,
+        refresh=lambda: estimate_price(identified_product, visual_features),
+    )
+    if cached_price:
+        result["price_output"] = cached_price
+        await thinking_queue.put({
+            "type": "thinking",
+            "node": "price",
+            "content": "最近の相場調査結果を使用します。",
+        })
+        await thinking_queue.put({
+            "type": "node_complete",
+            "node": "price",
+            "data": {
+                "min_price": cached_price.valuation.min_price,
+                "max_price": cached_price.valuation.max_price,
+                "from_cache": True,
+            },
+        })
+        return
+
+    # 同じ商品の相場調査が実行中であれば、その結果を待って共有する
+    # （保存は調査した側のみ、共有された結果は from_cache=True）
+    if price_cache.flight.in_flight(price_cache.flight_key(identified_product)):
+        await thinking_queue.put({
+            "type": "thinking",
+            "node": "price",
+            "content": "同じ商品の相場を調査中のため、結果を待っています...",
+        })
+
+    try:
+        result["price_output"] = await price_cache.compute_shared(
+            identified_product,
+            lambda: _stream_price_estimate(thinking_queue, identified_product, visual_features),
+        )
+
+        await thinking_queue.put({
+            "type": "node_complete",
+            "node": "price",
+            "data": {
+                "min_price": result["price_output"].valuation.min_price,
+                "max_price": result["price_output"].valuation.max_price,
+                "from_cache": result["price_output"].from_cache,
+            },
+        })
+
+    except Exception as e:
+        logger.error(f"Price Node Error: {e}", exc_info=True)
+        result["price_output"] = PriceNodeOutput(
+            status="error",
+            valuation=Valuation(
+                min_price=0,
+                max_price=0,
+                currency="JPY",
+                confidence="low",
+            ),
+            display_message=f"価格検索エラー: {str(e)}",
+        )
+        await thinking_queue.put({
+            "type": "error",
+            "node": "price",
+            "message": str(e),
+        })
+
+
+async def _stream_downstream_speculatively(
+    analysis_result: "InitialAnalysis",
+    lens_result: "GoogleLensResponse",
+    speculative_queue: asyncio.Queue,
+) -> dict:
+    """
+    ガードレール待ちの間に search（設定によりpriceも）を先行実行する
+
+    思考過程は speculative_queue にバッファし、終了時に None を送信する。
+    ガードレール通過後に呼び出し元が本来のキューへ転送する。
+    """
+    result = {"search_output": None, "price_output": None}
+    try:
+        await _stream_search_section(result, analysis_result, speculative_queue, lens_result)
+        search_output = result["search_output"]
+        if settings.SPECULATIVE_PRICE_ENABLED and search_output.analysis.classification == "mass_product":
+            await _stream_price_section(result, analysis_result, speculative_queue)
+        return result
+    finally:
+        speculative_queue.put_nowait(None)
+
+
+async def _stream_search_analysis(
+    thinking_queue: asyncio.Queue,
+    item_name: str,
+    visual_features: list[str],
+) -> "SearchAnalysis":
+    """search_node相当の市場調査を思考ストリーム付きで実行"""
+    from backend.features.agent.search.schema import SearchAnalysis
+
     search_thinking_prompt = f"""
 あなたは熟練の鑑定士AIエージェント『Ojoya』です。
 以下の商品情報を基に、Google検索で市場情報を調べてください。
@@ -441,40 +753,8 @@ async def stream_price_agent_with_thinking(
 考えを述べながら分析を進めてください。
 """
 
-    try:
-        # Step 1: 思考過程をストリーミング
-        streaming_handler = StreamingCallbackHandler(thinking_queue, "search")
-        thinking_llm = ChatGoogleGenerativeAI(
-            model=settings.MODEL_SEARCH_NODE,
-            project=settings.GCP_PROJECT_ID,
-            location=settings.GCP_LOCATION,
-            temperature=0.3,
-            max_retries=2,
-            vertexai=True,
-            streaming=True,
-            callbacks=[streaming_handler],
-        )
-
-        thinking_messages = [
-            SystemMessage(content=search_thinking_prompt),
-            HumanMessage(content=f"「{item_name}」について市場調査してください。"),
-        ]
-
-        # Grounding + ストリーミング
-        await thinking_llm.ainvoke(thinking_messages, tools=[{"google_search": {}}])
-
-        # Step 2: 構造化出力で結果を抽出
-        structured_llm = ChatGoogleGenerativeAI(
-            model=settings.MODEL_SEARCH_NODE,
-            project=settings.GCP_PROJECT_ID,
-            location=settings.GCP_LOCATION,
-            temperature=0,
-            max_retries=2,
-            vertexai=True,
-        ).with_structured_output(SearchAnalysis)
-
-        search_system_prompt = f"""
-先ほどの調査結果を基に、以下を判定してください。
+    search_extract_prompt = """
+以下の調査結果を基に、商品を判定してください。
 
 【分類】
 1. mass_product (既製品): 市場で流通している量産品
@@ -487,60 +767,28 @@ async def stream_price_agent_with_thinking(
 - identified_product: 既製品の場合、正式な商品名（一点物はnull）
 """
 
-        search_messages = [
-            SystemMessage(content=search_system_prompt),
-            HumanMessage(content="調査結果を基に分類してください。"),
-        ]
-
-        search_analysis = await structured_llm.ainvoke(search_messages)
-
-        result["search_output"] = SearchNodeOutput(
-            search_results=[],
-            analysis=search_analysis,
-            search_performed=True,
-        )
-
-        await thinking_queue.put({
-            "type": "node_complete",
-            "node": "search",
-            "data": {
-                "classification": search_analysis.classification,
-                "identified_product": search_analysis.identified_product,
-            },
-        })
-
-    except Exception as e:
-        logger.error(f"Search Node Error: {e}", exc_info=True)
-        result["search_output"] = SearchNodeOutput(
-            search_results=[],
-            analysis=SearchAnalysis(
-                classification="unique_item",
-                confidence="low",
-                reasoning=f"検索エラー: {str(e)}",
-            ),
-            search_performed=False,
-        )
-        await thinking_queue.put({
-            "type": "error",
-            "node": "search",
-            "message": str(e),
-        })
-        return result
+    search_result_format = """
+{"classification": "mass_product" または "unique_item", "confidence": "high" / "medium" / "low", "reasoning": "判定理由", "identified_product": "既製品の場合は正式な商品名（カンマ区切りで属性を追加、括弧は使用しない）。一点物は null"}
+"""
 
-    # unique_item なら終了
-    if search_analysis.classification != "mass_product":
-        return result
+    return await _stream_structured_analysis(
+        thinking_queue=thinking_queue,
+        node_name="search",
+        thinking_prompt=search_thinking_prompt,
+        request_message=f"「{item_name}」について市場調査してください。",
+        schema=SearchAnalysis,
+        result_format=search_result_format,
+        extract_prompt=search_extract_prompt,
+    )
 
-    # ========================================
-    # Price Node (2段階: 思考ストリーム → 構造化出力)
-    # ========================================
-    await thinking_queue.put({
-        "type": "node_start",
-        "node": "price",
-        "message": "価格帯を分析しています...",
-    })
 
-    identified_product = search_analysis.identified_product or item_name
+async def _stream_price_estimate(
+    thinking_queue: asyncio.Queue,
+    identified_product: str,
+    visual_features: list[str],
+) -> "PriceNodeOutput":
+    """price_node相当の相場調査を思考ストリーム付きで実行"""
+    from backend.features.agent.price.schema import PriceAnalysis, PriceNodeOutput, Valuation
 
     price_thinking_prompt = f"""
 あなたは熟練の鑑定士AIエージェント『Ojoya』です。
@@ -561,40 +809,8 @@ async def stream_price_agent_with_thinking(
 具体的な価格情報を含めて説明してください。
 """
 
-    try:
-        # Step 1: 思考過程をストリーミング
-        streaming_handler = StreamingCallbackHandler(thinking_queue, "price")
-        thinking_llm = ChatGoogleGenerativeAI(
-            model=settings.MODEL_SEARCH_NODE,
-            project=settings.GCP_PROJECT_ID,
-            location=settings.GCP_LOCATION,
-            temperature=0.3,
-            max_retries=2,
-            vertexai=True,
-            streaming=True,
-            callbacks=[streaming_handler],
-        )
-
-        thinking_messages = [
-            SystemMessage(content=price_thinking_prompt),
-            HumanMessage(content=f"「{identified_product} メルカリ 価格」で中古相場を調べてください。"),
-        ]
-
-        # Grounding + ストリーミング
-        await thinking_llm.ainvoke(thinking_messages, tools=[{"google_search": {}}])
-
-        # Step 2: 構造化出力で結果を抽出
-        structured_llm = ChatGoogleGenerativeAI(
-            model=settings.MODEL_SEARCH_NODE,
-            project=settings.GCP_PROJECT_ID,
-            location=settings.GCP_LOCATION,
-            temperature=0,
-            max_retries=2,
-            vertexai=True,
-        ).with_structured_output(PriceAnalysis)
-
-        price_system_prompt = """
-先ほどの調査結果から価格情報を抽出してください。
+    price_extract_prompt = """
+以下の調査結果から価格情報を抽出してください。
 
 【出力項目】
 - min_price: 最低価格（円）
@@ -605,54 +821,126 @@ async def stream_price_agent_with_thinking(
 - price_factors: 価格変動要因のリスト（例: "箱ありで+1000円"）
 """
 
-        price_messages = [
-            SystemMessage(content=price_system_prompt),
-            HumanMessage(content="調査結果から価格情報を抽出してください。"),
-        ]
+    price_result_format = """
+{"min_price": 最低価格（円、整数。情報がなければ0）, "max_price": 最高価格（円、整数。情報がなければ0）, "confidence": "high" / "medium" / "low", "reasoning": "価格算出の根拠", "display_message": "ユーザー向けメッセージ", "price_factors": ["価格変動要因（例: 箱ありで+1000円）"] または null}
+"""
 
-        price_analysis = await structured_llm.ainvoke(price_messages)
+    price_analysis = await _stream_structured_analysis(
+        thinking_queue=thinking_queue,
+        node_name="price",
+        thinking_prompt=price_thinking_prompt,
+        request_message=f"「{identified_product} メルカリ 価格」で中古相場を調べてください。",
+        schema=PriceAnalysis,
+        result_format=price_result_format,
+        extract_prompt=price_extract_prompt,
+    )
 
-        valuation = Valuation(
-            min_price=price_analysis.min_price,
-            max_price=price_analysis.max_price,
-            currency="JPY",
-            confidence=price_analysis.confidence,
-        )
+    valuation = Valuation(
+        min_price=price_analysis.min_price,
+        max_price=price_analysis.max_price,
+        currency="JPY",
+        confidence=price_analysis.confidence,
+    )
 
-        status = "complete" if price_analysis.min_price > 0 else "error"
+    status = "complete" if price_analysis.min_price > 0 else "error"
 
-        result["price_output"] = PriceNodeOutput(
-            status=status,
-            valuation=valuation,
-            display_message=price_analysis.display_message,
-            price_factors=price_analysis.price_factors,
-        )
+    return PriceNodeOutput(
+        status=status,
+        valuation=valuation,
+        display_message=price_analysis.display_message,
+        price_factors=price_analysis.price_factors,
+    )
 
-        await thinking_queue.put({
-            "type": "node_complete",
-            "node": "price",
-            "data": {
-                "min_price": price_analysis.min_price,
-                "max_price": price_analysis.max_price,
-            },
-        })
 
-    except Exception as e:
-        logger.error(f"Price Node Error: {e}", exc_info=True)
-        result["price_output"] = PriceNodeOutput(
-            status="error",
-            valuation=Valuation(
-                min_price=0,
-                max_price=0,
-                currency="JPY",
-                confidence="low",
-            ),
-            display_message=f"価格検索エラー: {str(e)}",
-        )
-        await thinking_queue.put({
-            "type": "error",
-            "node": "price",
-            "message": str(e),
-        })
+async def _stream_structured_analysis(
+    thinking_queue: asyncio.Queue,
+    node_name: str,
+    thinking_prompt: str,
+    request_message: str,
+    schema: type[BaseModel],
+    result_format: str,
+    extract_prompt: str,
+) -> BaseModel:
+    """
+    思考過程をストリーミングしつつ、構造化出力を取得する
+
+    STREAM_SINGLE_CALL_STRUCTURED が有効な場合は、1回のGrounding呼び出しで
+    思考過程の後にJSONを出力させ、同じストリームから結果をパースする。
+    パースに失敗した場合や無効な場合は、思考過程のテキストを入力として
+    構造化出力の呼び出しを追加で行う。
+
+    Args:
+        thinking_queue: 思考過程を送信するキュー
+        node_name: ノード名（"search" / "price"）
+        thinking_prompt: 調査・思考用のシステムプロンプト
+        request_message: ユーザーメッセージ
+        schema: 構造化出力のスキーマ
+        result_format: 1回呼び出し時に出力させるJSONの形式
+        extract_prompt: 構造化出力を追加で行う場合のシステムプロンプト
+
+    Returns:
+        schema のインスタンス
+    """
+    from langchain_core.messages import SystemMessage
+    from backend.core.llm_callbacks import (
+        StreamingCallbackHandler,
+        StructuredStreamingCallbackHandler,
+    )
+    from backend.core.llm_pool import GOOGLE_SEARCH_TOOLS, llm_pool
+    from backend.core.logging import get_logger
+
+    logger = get_logger(__name__)
+
+    single_call = settings.STREAM_SINGLE_CALL_STRUCTURED
+
+    if single_call:
+        streaming_handler = StructuredStreamingCallbackHandler(thinking_queue, node_name)
+        system_prompt = thinking_prompt + f"""
+【出力形式】
+分析を述べ終えたら、最後に「{StructuredStreamingCallbackHandler.RESULT_MARKER}」とだけ書いた行を出力し、
+続けて以下の形式のJSONを1つだけ出力してください。JSONの後には何も書かないでください。
+{result_format}"""
+    else:
+        streaming_handler = StreamingCallbackHandler(thinking_queue, node_name)
+        system_prompt = thinking_prompt
+
+    thinking_llm = llm_pool.get(
+        settings.MODEL_SEARCH_NODE,
+        temperature=0.3,
+        streaming=True,
+        tools=GOOGLE_SEARCH_TOOLS,
+    )
+
+    thinking_messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=request_message),
+    ]
+
+    # Grounding + ストリーミング
+    thinking_response = await thinking_llm.ainvoke(
+        thinking_messages,
+        config={"callbacks": [streaming_handler]},
+    )
+
+    if single_call:
+        try:
+            return streaming_handler.parse_result(schema)
+        except Exception as e:
+            logger.warning(f"Failed to parse streamed {node_name} result, extracting separately: {e}")
+
+    # 思考過程のテキストから構造化出力を抽出
+    structured_llm = llm_pool.get(
+        settings.MODEL_SEARCH_NODE,
+        temperature=0,
+        schema=schema,
+    )
+
+    extract_messages = [
+        SystemMessage(content=extract_prompt + f"""
+【調査結果】
+{thinking_response.text}
+"""),
+        HumanMessage(content="調査結果を基に出力してください。"),
+    ]
 
-    return result
\ No newline at end of file
+    return await structured_llm.ainvoke(extract_messages)
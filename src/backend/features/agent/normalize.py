@@ -0,0 +1,28 @@
+"""
+商品名の正規化
+
+キャッシュ・リクエスト集約のキーとして、表記揺れを吸収した商品名を作る。
+"""
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_product_name(name: str) -> str:
+    """
+    商品名を正規化
+
+    - NFKC正規化（全角英数・半角カナなどの幅の違いを統一）
+    - 小文字化
+    - 句読点・記号・カンマを除去
+    - 連続する空白を1つにまとめる
+
+    例: "ＮＩＫＥ Air Max 90, 白" → "nike air max 90 白"
+    """
+    text = unicodedata.normalize("NFKC", name).casefold()
+    text = "".join(
+        " " if unicodedata.category(ch).startswith("P") else ch
+        for ch in text
+    )
+    return _WHITESPACE.sub(" ", text).strip()
@@ -0,0 +1,203 @@
+"""
+市場価格キャッシュ（stale-while-revalidate）
+
+正規化した商品名をキーに PriceNodeOutput を保持する。
+
+- 新鮮なエントリ: そのまま返す
+- 古いエントリ: 即座に返しつつ、バックグラウンドで再計算して差し替える
+- 期限切れ・未登録: 計算して保存する（同じ商品の同時計算は1回にまとめ、保存は先頭の
+  呼び出し元のみ行う。合流した呼び出し元には from_cache=True で返す）
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from backend.core.cache import TTLCache
+from backend.core.config import settings
+from backend.core.logging import get_logger
+from backend.core.singleflight import SingleFlight
+from backend.features.agent.normalize import normalize_product_name
+from backend.features.agent.price.schema import PriceNodeOutput
+
+logger = get_logger(__name__)
+
+PriceCompute = Callable[[], Awaitable[PriceNodeOutput]]
+
+
+class PriceCache:
+    """商品名をキーにした価格キャッシュ"""
+
+    def __init__(
+        self,
+        max_entries: int,
+        fresh_seconds: float,
+        stale_seconds: float,
+        enabled: bool = True,
+        flight: Optional[SingleFlight[PriceNodeOutput]] = None,
+    ):
+        """
+        Args:
+            max_entries: 最大保持件数
+            fresh_seconds: 再計算せずに返す期間（秒）
+            stale_seconds: 古い値を返しつつ再計算する期間（fresh_secondsを含む総保持期間）
+            enabled: Falseの場合は常にキャッシュなしとして動作
+            flight: 同じ商品の同時計算をまとめるsingle-flight
+        """
+        self.enabled = enabled
+        self.flight = flight or SingleFlight("price", enabled=False)
+        self.fresh_seconds = fresh_seconds
+        # 値: (新鮮期限のmonotonic時刻, 出力)
+        self._entries: TTLCache[tuple[float, PriceNodeOutput]] = TTLCache(
+            max_entries=max_entries,
+            ttl_seconds=stale_seconds,
+        )
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def lookup(
+        self,
+        identified_product: Optional[str],
+        refresh: Optional[PriceCompute] = None,
+    ) -> Optional[PriceNodeOutput]:
+        """
+        キャッシュ済みの価格を取得
+
+        古いエントリの場合は値を返しつつ、refresh でバックグラウンド再計算を開始する。
+
+        Args:
+            identified_product: 商品名
+            refresh: 再計算用の関数
+
+        Returns:
+            from_cache=True の PriceNodeOutput、なければNone
+        """
+        if not self.enabled or not identified_product:
+            return None
+
+        key = normalize_product_name(identified_product)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        fresh_until, output = entry
+        if fresh_until > time.monotonic():
+            self.fresh_hits += 1
+        else:
+            self.stale_hits += 1
+            if refresh is not None:
+                self._schedule_refresh(key, refresh)
+
+        logger.info(f"Price cache hit: {key}")
+        return output.model_copy(update={"from_cache": True})
+
+    def store(self, identified_product: Optional[str], output: PriceNodeOutput) -> None:
+        """相場が取得できた出力のみ保存"""
+        if not self.enabled or not identified_product or output.status != "complete":
+            return
+        key = normalize_product_name(identified_product)
+        self._entries.set(key, (time.monotonic() + self.fresh_seconds, output))
+
+    async def get_or_compute(
+        self,
+        identified_product: Optional[str],
+        compute: PriceCompute,
+    ) -> PriceNodeOutput:
+        """
+        キャッシュを参照し、なければ計算して保存する
+
+        同じ商品の計算が実行中であれば、新たに計算せずその結果を待つ。
+
+        Args:
+            identified_product: 商品名
+            compute: 価格を計算する関数（古いエントリの再計算にも使用）
+        """
+        cached = self.lookup(identified_product, refresh=compute)
+        if cached is not None:
+            return cached
+        return await self.compute_shared(identified_product, compute)
+
+    async def compute_shared(
+        self,
+        identified_product: Optional[str],
+        compute: PriceCompute,
+    ) -> PriceNodeOutput:
+        """
+        計算して保存する（キャッシュは参照しない）
+
+        同じ商品の計算が実行中であればその結果を待つ。保存は計算した呼び出し元のみが行い、
+        合流した呼び出し元には共有された結果として from_cache=True で返す。
+
+        Args:
+            identified_product: 商品名
+            compute: 価格を計算する関数
+        """
+        key = self.flight_key(identified_product)
+        shared = self.flight.in_flight(key)
+
+        async def compute_and_store() -> PriceNodeOutput:
+            output = await compute()
+            self.store(identified_product, output)
+            return output
+
+        output = await self.flight.do(key, compute_and_store)
+        if shared:
+            self.shared += 1
+            return output.model_copy(update={"from_cache": True})
+        return output
+
+    @staticmethod
+    def flight_key(identified_product: Optional[str]) -> Optional[str]:
+        """single-flightのキー（キャッシュと同じ正規化した商品名）"""
+        return normalize_product_name(identified_product) if identified_product else None
+
+    def _schedule_refresh(self, key: str, refresh: PriceCompute) -> None:
+        """バックグラウンド再計算を開始（同じキーの再計算は1つだけ）"""
+        if key in self._refreshing:
+            return
+
+        async def run() -> None:
+            try:
+                output = await refresh()
+                if output.status == "complete":
+                    self._entries.set(key, (time.monotonic() + self.fresh_seconds, output))
+                    self.refreshes += 1
+                else:
+                    self.refresh_errors += 1
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.warning(f"Price cache refresh failed for {key}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(run())
+
+    def stats(self) -> dict[str, Any]:
+        """キャッシュの統計"""
+        total = self.fresh_hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "refreshing": len(self._refreshing),
+            "hit_rate": round((self.fresh_hits + self.stale_hits) / total, 3) if total else 0.0,
+        }
+
+
+# シングルトンインスタンス
+price_cache = PriceCache(
+    max_entries=settings.PRICE_CACHE_MAX_ENTRIES,
+    fresh_seconds=settings.PRICE_CACHE_FRESH_SECONDS,
+    stale_seconds=settings.PRICE_CACHE_STALE_SECONDS,
+    enabled=settings.PRICE_CACHE_ENABLED,
+    flight=SingleFlight("price", enabled=settings.SINGLEFLIGHT_ENABLED),
+)
@@ -0,0 +1,167 @@
+"""
+search と並行した価格調査
+
+vision_nodeの商品名候補で price の処理を search_node と同時に開始する。
+search の結果が一点物なら破棄し、特定された商品名が候補と大きく異なる場合
+（候補に型番などの数字を含む語が欠けている場合を含む）は破棄して通常どおり price_node で再調査する。
+価格キャッシュへの保存は、採用が決まった結果のみ行う。
+"""
+import asyncio
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Any, Optional
+
+from backend.core.config import settings
+from backend.core.logging import get_logger
+from backend.features.agent.normalize import normalize_product_name
+from backend.features.agent.price.cache import price_cache
+from backend.features.agent.price.node import estimate_price
+from backend.features.agent.price.schema import PriceNodeOutput
+from backend.features.agent.search.schema import SearchNodeOutput
+
+logger = get_logger(__name__)
+
+# 特定された商品名の属性の区切り（"NIKE Air Max 90, 白" の ", 白"）
+_ATTRIBUTE_SEPARATOR = re.compile(r"[,、]")
+
+
+def _model_tokens(identified: str) -> set[str]:
+    """特定された商品名のうち、属性を除いた部分の数字を含む語（型番・世代・容量など）"""
+    base = _ATTRIBUTE_SEPARATOR.split(unicodedata.normalize("NFKC", identified), maxsplit=1)[0]
+    return {token for token in normalize_product_name(base).split() if any(ch.isdigit() for ch in token)}
+
+
+def names_match(guess: str, identified: str, min_similarity: float) -> bool:
+    """
+    商品名候補と特定された商品名が同じ商品を指しているとみなせるか
+
+    正規化後に候補が特定された商品名を含む場合（候補の方が詳細）、または
+    類似度が min_similarity 以上の場合に一致とする。
+    search は特定した商品名にカンマ区切りで属性（色など）を付けるため、
+    候補が特定された商品名の一部であること自体は不一致の理由にしない。
+    ただし型番などの数字を含む語が候補に欠けている場合
+    （"iPhone" と "iPhone 15 Pro 256GB" など）は、別のバリエーションの価格になるため一致としない。
+    """
+    a = normalize_product_name(guess)
+    b = normalize_product_name(identified)
+    if not a or not b:
+        return False
+    if b in a:
+        return True
+    if a in b and not _model_tokens(identified) <= set(a.split()):
+        return False
+    return SequenceMatcher(None, a, b).ratio() >= min_similarity
+
+
+def _consume_exception(task: "asyncio.Task[PriceNodeOutput]") -> None:
+    """破棄したタスクの例外を回収する（"Task exception was never retrieved" を出さない）"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug(f"Concurrent price task failed: {task.exception()}")
+
+
+class ConcurrentPrice:
+    """search と並行した価格調査の開始・採否判定"""
+
+    def __init__(self, enabled: bool, min_similarity: float):
+        """
+        Args:
+            enabled: Falseの場合は並行実行しない
+            min_similarity: 結果を採用する商品名の類似度の下限（0〜1）
+        """
+        self.enabled = enabled
+        self.min_similarity = min_similarity
+        self.started = 0
+        self.used = 0
+        self.discarded = 0
+        self.reruns = 0
+
+    def start(
+        self,
+        item_name: Optional[str],
+        visual_features: Optional[list[str]],
+    ) -> Optional["asyncio.Task[PriceNodeOutput]"]:
+        """
+        商品名候補で価格調査を開始（無効・商品名なしの場合はNone）
+
+        キャッシュは参照のみ行い、結果の保存は resolve で採用が決まった場合に行う。
+        """
+        if not self.enabled or not item_name:
+            return None
+
+        async def run() -> PriceNodeOutput:
+            cached = price_cache.lookup(item_name)
+            if cached is not None:
+                return cached
+            # 実行中の調査に合流した場合は保存も調査した側が行うため、共有された結果として扱う
+            key = price_cache.flight_key(item_name)
+            shared = price_cache.flight.in_flight(key)
+            output = await price_cache.flight.do(
+                key,
+                lambda: estimate_price(item_name, visual_features),
+            )
+            return output.model_copy(update={"from_cache": True}) if shared else output
+
+        self.started += 1
+        task = asyncio.create_task(run())
+        # 呼び出し側で破棄した場合も例外を回収する
+        task.add_done_callback(_consume_exception)
+        return task
+
+    async def resolve(
+        self,
+        task: Optional["asyncio.Task[PriceNodeOutput]"],
+        item_name: Optional[str],
+        search_output: SearchNodeOutput,
+    ) -> Optional[PriceNodeOutput]:
+        """
+        search の結果を受けて並行調査の結果を採用するか判定
+
+        Returns:
+            採用する場合は PriceNodeOutput、破棄した場合はNone（price_nodeで通常どおり調査する）
+        """
+        if task is None:
+            return None
+
+        analysis = search_output.analysis
+        if analysis.classification != "mass_product":
+            task.cancel()
+            self.discarded += 1
+            return None
+
+        identified = analysis.identified_product or item_name
+        if not names_match(item_name, identified, self.min_similarity):
+            logger.info(f"Concurrent price discarded: guess={item_name!r}, identified={identified!r}")
+            task.cancel()
+            self.reruns += 1
+            return None
+
+        try:
+            output = await task
+        except Exception as e:
+            logger.warning(f"Concurrent price failed, falling back to price_node: {e}")
+            self.reruns += 1
+            return None
+
+        # 採用した結果のみ、調査に使った商品名（候補）で保存する
+        if not output.from_cache:
+            price_cache.store(item_name, output)
+        self.used += 1
+        return output
+
+    def stats(self) -> dict[str, Any]:
+        """並行調査の統計"""
+        return {
+            "started": self.started,
+            "used": self.used,
+            "discarded": self.discarded,
+            "reruns": self.reruns,
+            "use_rate": round(self.used / self.started, 3) if self.started else 0.0,
+        }
+
+
+# シングルトンインスタンス
+concurrent_price = ConcurrentPrice(
+    enabled=settings.CONCURRENT_PRICE_ENABLED,
+    min_similarity=settings.CONCURRENT_PRICE_MIN_SIMILARITY,
+)
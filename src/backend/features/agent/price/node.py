@@ -1,9 +1,12 @@
+from typing import Optional
+
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from backend.core.config import settings
 from backend.core.llm_callbacks import get_llm_callbacks
+from backend.core.llm_pool import GOOGLE_SEARCH_TOOLS, llm_pool
 from backend.core.logging import get_logger
+from backend.features.agent.price.cache import price_cache
 from backend.features.agent.price.schema import (
     PriceAnalysis,
     PriceNodeOutput,
@@ -14,7 +17,7 @@ from backend.features.agent.state import AgentState
 logger = get_logger(__name__)
 
 
-def price_node(state: AgentState) -> dict:
+async def price_node(state: AgentState) -> dict:
     """
     Node Price: 価格検索ノード（2段階処理版）
 
@@ -26,8 +29,14 @@ def price_node(state: AgentState) -> dict:
     - Step 1: Google Search Grounding でレポート作成（テキスト出力）
     - Step 2: レポートから価格情報を抽出（構造化出力）
 
+    同じ商品の相場がキャッシュにあればLLMを呼ばずに返す（古い場合は裏で再計算）。
+
+    vision_nodeで投機実行済み（price_outputが設定済み）の場合は何もしない。
+
     注意: このノードはgraph.pyの条件分岐でmass_productの場合のみ呼ばれる
     """
+    if state.get("price_output") is not None:
+        return {}
 
     # search_nodeの結果から商品情報を取得
     search_output = state.get("search_output")
@@ -40,6 +49,28 @@ def price_node(state: AgentState) -> dict:
         analysis_result.visual_features if analysis_result else []
     )
 
+    price_output = await price_cache.get_or_compute(
+        identified_product,
+        lambda: estimate_price(identified_product, visual_features),
+    )
+    return {"price_output": price_output}
+
+
+async def estimate_price(
+    identified_product: Optional[str],
+    visual_features: Optional[list[str]],
+) -> PriceNodeOutput:
+    """
+    Google Search Groundingで中古相場を調査し、価格レンジを算出する
+
+    Args:
+        identified_product: 商品名
+        visual_features: 視覚的特徴のリスト
+
+    Returns:
+        PriceNodeOutput（失敗時は status="error"）
+    """
+
     # 検索クエリを構築（シンプルに）
     search_query_parts = []
     if identified_product:
@@ -53,14 +84,10 @@ def price_node(state: AgentState) -> dict:
     # ========================================
     # Step 1: Google Search で相場レポートを作成
     # ========================================
-    llm_search = ChatGoogleGenerativeAI(
-        model=settings.MODEL_SEARCH_NODE,
-        project=settings.GCP_PROJECT_ID,
-        location=settings.GCP_LOCATION,
+    llm_search = llm_pool.get(
+        settings.MODEL_SEARCH_NODE,
         temperature=0,
-        max_retries=2,
-        vertexai=True,
-        callbacks=get_llm_callbacks("price.search"),
+        tools=GOOGLE_SEARCH_TOOLS,
     )
 
     search_prompt = f"""
@@ -106,25 +133,22 @@ Google検索で中古市場の相場を調査し、以下の内容を含むレ
 
     try:
         # Step 1: 検索してレポート作成（Grounding + テキスト出力）
-        search_response = llm_search.invoke(search_messages, tools=[{"google_search": {}}])
+        search_response = await llm_search.ainvoke(
+            search_messages,
+            config={"callbacks": get_llm_callbacks("price.search")},
+        )
         search_report = search_response.content
         logger.debug(f"Search Report: {search_report}")
 
         # ========================================
         # Step 2: レポートから価格情報を抽出
         # ========================================
-        llm_extract = ChatGoogleGenerativeAI(
-            model=settings.MODEL_SEARCH_NODE,
-            project=settings.GCP_PROJECT_ID,
-            location=settings.GCP_LOCATION,
+        structured_llm = llm_pool.get(
+            settings.MODEL_SEARCH_NODE,
             temperature=0,
-            max_retries=2,
-            vertexai=True,
-            callbacks=get_llm_callbacks("price.extract"),
+            schema=PriceAnalysis,
         )
 
-        structured_llm = llm_extract.with_structured_output(PriceAnalysis)
-
         extract_prompt = f"""
 以下の相場調査レポートから、価格情報を抽出してください。
 
@@ -158,7 +182,10 @@ Google検索で中古市場の相場を調査し、以下の内容を含むレ
         ]
 
         # Step 2: レポートから抽出（構造化出力のみ、Grounding なし）
-        analysis = structured_llm.invoke(extract_messages)
+        analysis = await structured_llm.ainvoke(
+            extract_messages,
+            config={"callbacks": get_llm_callbacks("price.extract")},
+        )
         logger.debug(f"Price Analysis: {analysis}")
 
         # PriceAnalysis を PriceNodeOutput に変換
@@ -175,26 +202,22 @@ Google検索で中古市場の相場を調査し、以下の内容を含むレ
         else:
             status = "complete"
 
-        return {
-            "price_output": PriceNodeOutput(
-                status=status,
-                valuation=valuation,
-                display_message=analysis.display_message,
-                price_factors=analysis.price_factors,
-            )
-        }
+        return PriceNodeOutput(
+            status=status,
+            valuation=valuation,
+            display_message=analysis.display_message,
+            price_factors=analysis.price_factors,
+        )
     except Exception as e:
         logger.error(f"Price Node LLM Error: {e}", exc_info=True)
         # フォールバック: エラー状態を返す
-        return {
-            "price_output": PriceNodeOutput(
-                status="error",
-                valuation=Valuation(
-                    min_price=0,
-                    max_price=0,
-                    currency="JPY",
-                    confidence="low",
-                ),
-                display_message=f"価格検索中にエラーが発生しました: {str(e)}",
-            )
-        }
+        return PriceNodeOutput(
+            status="error",
+            valuation=Valuation(
+                min_price=0,
+                max_price=0,
+                currency="JPY",
+                confidence="low",
+            ),
+            display_message=f"価格検索中にエラーが発生しました: {str(e)}",
+        )
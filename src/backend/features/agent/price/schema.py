@@ -34,3 +34,4 @@ class PriceNodeOutput(BaseModel):
     valuation: Valuation
     display_message: str
     price_factors: Optional[list[str]] = None  # 価格変動要因
+    from_cache: bool = False  # 価格キャッシュ・実行中の同じ商品の調査から共有した場合はTrue
@@ -0,0 +1,99 @@
+"""
+分類結果キャッシュ
+
+vision_nodeの商品名と上位の視覚的特徴をキーに、search_nodeの分類結果を保持する。
+確信度が高い分類ほど長く保持する。
+"""
+from typing import Any, Optional
+
+from backend.core.cache import TTLCache
+from backend.core.config import settings
+from backend.core.logging import get_logger
+from backend.features.agent.normalize import normalize_product_name
+from backend.features.agent.search.schema import SearchNodeOutput
+
+logger = get_logger(__name__)
+
+# キーに含める視覚的特徴の数（search_nodeの検索クエリと同じ）
+KEY_FEATURE_COUNT = 3
+
+
+class ClassificationCache:
+    """商品名・視覚的特徴をキーにした分類結果キャッシュ"""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_by_confidence: dict[str, float],
+        enabled: bool = True,
+    ):
+        """
+        Args:
+            max_entries: 最大保持件数
+            ttl_by_confidence: 確信度（high / medium / low）ごとの有効期間（秒）
+            enabled: Falseの場合は常にキャッシュなしとして動作
+        """
+        self.enabled = enabled
+        self.ttl_by_confidence = ttl_by_confidence
+        self._entries: TTLCache[SearchNodeOutput] = TTLCache(
+            max_entries=max_entries,
+            ttl_seconds=min(ttl_by_confidence.values()),
+        )
+
+    @staticmethod
+    def make_key(item_name: Optional[str], visual_features: Optional[list[str]]) -> Optional[str]:
+        """正規化した商品名と上位の視覚的特徴からキーを作成"""
+        if not item_name:
+            return None
+        features = [
+            normalize_product_name(feature)
+            for feature in (visual_features or [])[:KEY_FEATURE_COUNT]
+        ]
+        return "|".join([normalize_product_name(item_name), *features])
+
+    def lookup(
+        self,
+        item_name: Optional[str],
+        visual_features: Optional[list[str]],
+    ) -> Optional[SearchNodeOutput]:
+        """キャッシュ済みの分類結果を取得"""
+        key = self.make_key(item_name, visual_features)
+        if not self.enabled or key is None:
+            return None
+
+        cached = self._entries.get(key)
+        if cached is not None:
+            logger.info(f"Classification cache hit: {key}")
+        return cached
+
+    def store(
+        self,
+        item_name: Optional[str],
+        visual_features: Optional[list[str]],
+        output: SearchNodeOutput,
+    ) -> None:
+        """検索が成功した分類結果のみ、確信度に応じたTTLで保存"""
+        key = self.make_key(item_name, visual_features)
+        if not self.enabled or key is None or not output.search_performed:
+            return
+
+        ttl = self.ttl_by_confidence.get(output.analysis.confidence)
+        if not ttl:
+            return
+        self._entries.set(key, output, ttl_seconds=ttl)
+
+    def stats(self) -> dict[str, Any]:
+        """キャッシュの統計"""
+        return self._entries.stats()
+
+
+# シングルトンインスタンス
+classification_cache = ClassificationCache(
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl_by_confidence={
+        "high": settings.SEARCH_CACHE_TTL_HIGH_SECONDS,
+        "medium": settings.SEARCH_CACHE_TTL_MEDIUM_SECONDS,
+        "low": settings.SEARCH_CACHE_TTL_LOW_SECONDS,
+    },
+    enabled=settings.SEARCH_CACHE_ENABLED,
+)
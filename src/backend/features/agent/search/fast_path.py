@@ -0,0 +1,156 @@
+"""
+分類の高速パス
+
+Google Lensの結果だけで既製品と判断できる場合（knowledge_graphがあり、
+主要なECサイト・フリマの価格付きマッチが十分ある場合）に、
+Google Search GroundingのLLM呼び出しを行わずに SearchNodeOutput を返す。
+根拠が曖昧な場合はNoneを返し、通常どおりLLMで判定する。
+"""
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from backend.core.config import settings
+from backend.core.logging import get_logger
+from backend.features.agent.search.schema import SearchAnalysis, SearchNodeOutput
+from backend.features.agent.vision.serpapi_schema import (
+    GoogleLensResponse,
+    GoogleLensVisualMatch,
+)
+
+logger = get_logger(__name__)
+
+# 既製品が流通している主要なECサイト・フリマ（ソース名・ドメインに対する部分一致）
+# ポータル全体に一致しないよう、Yahoo・PayPayはマーケットプレイスのサービスに絞る
+MARKETPLACE_KEYWORDS = (
+    "amazon",
+    "rakuten",
+    "楽天",
+    "mercari",
+    "メルカリ",
+    "auctions.yahoo",
+    "ヤフオク",
+    "paypayfleamarket",
+    "fril.jp",
+    "ラクマ",
+    "zozo",
+    "yodobashi",
+    "ヨドバシ",
+    "biccamera",
+    "ビックカメラ",
+    "kakaku.com",
+    "価格.com",
+    "2ndstreet",
+    "セカンドストリート",
+    "bookoff",
+    "ブックオフ",
+    "suruga-ya",
+    "駿河屋",
+    "snkrdunk",
+    "スニダン",
+    "stockx",
+    "ebay",
+    "walmart",
+)
+
+
+def is_marketplace(match: GoogleLensVisualMatch) -> bool:
+    """マッチが主要なECサイト・フリマのものか"""
+    host = urlparse(match.link).netloc if match.link else ""
+    text = f"{match.source or ''} {host}".lower()
+    return any(keyword in text for keyword in MARKETPLACE_KEYWORDS)
+
+
+def collect_evidence(lens_result: GoogleLensResponse) -> dict[str, Any]:
+    """判定に使う根拠を集計"""
+    matches = lens_result.visual_matches
+    kg_title = lens_result.knowledge_graph.title if lens_result.knowledge_graph else None
+    return {
+        "kg_title": kg_title,
+        "match_count": len(matches),
+        "marketplace_matches": sum(1 for match in matches if is_marketplace(match)),
+        "priced_matches": sum(1 for match in matches if match.price),
+    }
+
+
+class SearchFastPath:
+    """Lens結果による決定的な既製品判定"""
+
+    def __init__(
+        self,
+        enabled: bool,
+        min_matches: int,
+        min_marketplace_matches: int,
+        min_priced_matches: int,
+    ):
+        """
+        Args:
+            enabled: Falseの場合は常にLLMで判定
+            min_matches: 必要なvisual_matchesの件数
+            min_marketplace_matches: 必要なECサイト・フリマのマッチ件数
+            min_priced_matches: 必要な価格付きマッチの件数
+        """
+        self.enabled = enabled
+        self.min_matches = min_matches
+        self.min_marketplace_matches = min_marketplace_matches
+        self.min_priced_matches = min_priced_matches
+        self.decided = 0
+        self.fallbacks = 0
+
+    def classify(self, lens_result: Optional[GoogleLensResponse]) -> Optional[SearchNodeOutput]:
+        """
+        根拠が十分なら既製品として判定
+
+        Returns:
+            SearchNodeOutput、根拠が曖昧な場合はNone（LLMで判定する）
+        """
+        if not self.enabled or lens_result is None or lens_result.status == "Error":
+            return None
+
+        evidence = collect_evidence(lens_result)
+        decided = (
+            bool(evidence["kg_title"])
+            and evidence["match_count"] >= self.min_matches
+            and evidence["marketplace_matches"] >= self.min_marketplace_matches
+            and evidence["priced_matches"] >= self.min_priced_matches
+        )
+
+        # 精度を事後検証できるよう、判定と根拠を毎回記録する
+        logger.info(f"Search fast path: decided={decided}, evidence={evidence}")
+
+        if not decided:
+            self.fallbacks += 1
+            return None
+
+        self.decided += 1
+        return SearchNodeOutput(
+            search_results=[],
+            analysis=SearchAnalysis(
+                classification="mass_product",
+                confidence="high",
+                reasoning=(
+                    f"Google Lensで商品「{evidence['kg_title']}」が特定され、"
+                    f"{evidence['marketplace_matches']}件のECサイト・フリマ出品"
+                    f"（価格付き{evidence['priced_matches']}件）が見つかったため既製品と判定しました。"
+                ),
+                identified_product=evidence["kg_title"],
+            ),
+            search_performed=True,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """判定の統計"""
+        total = self.decided + self.fallbacks
+        return {
+            "decided": self.decided,
+            "fallbacks": self.fallbacks,
+            "decide_rate": round(self.decided / total, 3) if total else 0.0,
+        }
+
+
+# シングルトンインスタンス
+search_fast_path = SearchFastPath(
+    enabled=settings.SEARCH_FAST_PATH_ENABLED,
+    min_matches=settings.SEARCH_FAST_PATH_MIN_MATCHES,
+    min_marketplace_matches=settings.SEARCH_FAST_PATH_MIN_MARKETPLACE_MATCHES,
+    min_priced_matches=settings.SEARCH_FAST_PATH_MIN_PRICED_MATCHES,
+)
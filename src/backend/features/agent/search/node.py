@@ -1,9 +1,14 @@
+from typing import Optional
+
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from backend.core.config import settings
 from backend.core.llm_callbacks import get_llm_callbacks
+from backend.core.llm_pool import GOOGLE_SEARCH_TOOLS, llm_pool
 from backend.core.logging import get_logger
+from backend.features.agent.price.concurrent import concurrent_price
+from backend.features.agent.search.cache import classification_cache
+from backend.features.agent.search.fast_path import search_fast_path
 from backend.features.agent.search.schema import (
     SearchAnalysis,
     SearchNodeOutput,
@@ -13,7 +18,7 @@ from backend.features.agent.state import AgentState
 logger = get_logger(__name__)
 
 
-def search_node(state: AgentState) -> dict:
+async def search_node(state: AgentState) -> dict:
     """
     Node B: 画像検索・分類ノード（Grounding with Google Search版）
 
@@ -22,14 +27,62 @@ def search_node(state: AgentState) -> dict:
     2. 既製品(mass_product)か一点物(unique_item)かを判定
     3. 分類結果を返す
 
+    Google Lens結果だけで既製品と判断できる場合（高速パス）や、
+    同じ商品名・特徴の分類結果がキャッシュにある場合はLLMを呼ばずに返す。
+    並行価格調査が有効な場合は商品名候補で price を同時に開始し、
+    採用できればprice_outputも返す（price_nodeはスキップされる）。
+
+    vision_nodeで投機実行済み（search_outputが設定済み）の場合は何もしない。
+
     注意: このノードはgraph.pyの条件分岐でprocessableの場合のみ呼ばれる
     """
+    if state.get("search_output") is not None:
+        return {}
 
     # vision_nodeの結果から商品情報を取得
     analysis_result = state.get("analysis_result")
     item_name = analysis_result.item_name if analysis_result else None
     visual_features = analysis_result.visual_features if analysis_result else []
 
+    fast_output = search_fast_path.classify(state.get("lens_result"))
+    if fast_output is not None:
+        return {"search_output": fast_output}
+
+    cached = classification_cache.lookup(item_name, visual_features)
+    if cached is not None:
+        return {"search_output": cached}
+
+    price_task = concurrent_price.start(item_name, visual_features)
+    try:
+        search_output = await classify_item(item_name, visual_features)
+    except BaseException:
+        if price_task:
+            price_task.cancel()
+        raise
+    classification_cache.store(item_name, visual_features, search_output)
+
+    update: dict = {"search_output": search_output}
+    price_output = await concurrent_price.resolve(price_task, item_name, search_output)
+    if price_output is not None:
+        update["price_output"] = price_output
+    return update
+
+
+async def classify_item(
+    item_name: Optional[str],
+    visual_features: Optional[list[str]],
+) -> SearchNodeOutput:
+    """
+    Google Search Groundingで市場情報を調べ、既製品か一点物かを判定する
+
+    Args:
+        item_name: vision_nodeで推定された商品名
+        visual_features: 視覚的特徴のリスト
+
+    Returns:
+        SearchNodeOutput（失敗時は search_performed=False）
+    """
+
     # 検索クエリを構築
     search_query_parts = []
     if item_name:
@@ -39,20 +92,14 @@ def search_node(state: AgentState) -> dict:
 
     search_query = " ".join(search_query_parts) if search_query_parts else "商品"
 
-    # LLMを初期化
-    llm = ChatGoogleGenerativeAI(
-        model=settings.MODEL_SEARCH_NODE,
-        project=settings.GCP_PROJECT_ID,
-        location=settings.GCP_LOCATION,
+    # 共有プールからGrounding + 構造化出力のLLMを取得
+    structured_llm = llm_pool.get(
+        settings.MODEL_SEARCH_NODE,
         temperature=0,
-        max_retries=2,
-        vertexai=True,
-        callbacks=get_llm_callbacks("search"),
+        tools=GOOGLE_SEARCH_TOOLS,
+        schema=SearchAnalysis,
     )
 
-    # 構造化出力を設定
-    structured_llm = llm.with_structured_output(SearchAnalysis)
-
     system_prompt = f"""
 あなたは熟練の鑑定士AIエージェント『Ojoya』です。
 以下の商品情報を基に、Google検索で最新の市場情報を調べて、「既製品」か「一点物」かを判定してください。
@@ -114,27 +161,26 @@ def search_node(state: AgentState) -> dict:
 
     try:
         # Grounding + 構造化出力で1回のAPI呼び出しで完了
-        # structured_llm.invoke() は SearchAnalysis オブジェクトを直接返す
-        analysis = structured_llm.invoke(messages, tools=[{"google_search": {}}])
-
-        return {
-            "search_output": SearchNodeOutput(
-                search_results=[],  # Groundingでは個別の検索結果は取得しない
-                analysis=analysis,
-                search_performed=True,
-            )
-        }
+        # structured_llm.ainvoke() は SearchAnalysis オブジェクトを直接返す
+        analysis = await structured_llm.ainvoke(
+            messages,
+            config={"callbacks": get_llm_callbacks("search")},
+        )
+
+        return SearchNodeOutput(
+            search_results=[],  # Groundingでは個別の検索結果は取得しない
+            analysis=analysis,
+            search_performed=True,
+        )
     except Exception as e:
         logger.error(f"Search Node LLM Error: {e}", exc_info=True)
         # フォールバック: デフォルト判定
-        return {
-            "search_output": SearchNodeOutput(
-                search_results=[],
-                analysis=SearchAnalysis(
-                    classification="unique_item",
-                    confidence="low",
-                    reasoning=f"検索エラーのため判定できませんでした: {str(e)}",
-                ),
-                search_performed=False,
-            )
-        }
+        return SearchNodeOutput(
+            search_results=[],
+            analysis=SearchAnalysis(
+                classification="unique_item",
+                confidence="low",
+                reasoning=f"検索エラーのため判定できませんでした: {str(e)}",
+            ),
+            search_performed=False,
+        )
@@ -0,0 +1,75 @@
+"""
+投機実行モジュール
+
+ガードレールチェックの完了を待つ間に、後続ノード（search / price）を先行して開始する。
+ガードレールを通過すれば結果をそのまま使い、prohibited の場合はキャンセルして破棄する。
+"""
+import asyncio
+import time
+from typing import Any, Coroutine, Generic, Optional, TypeVar
+
+from backend.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class SpeculationStats:
+    """投機実行の統計（節約できた待ち時間と、破棄した処理時間）"""
+
+    def __init__(self):
+        self.started = 0
+        self.committed = 0
+        self.discarded = 0
+        self.saved_seconds = 0.0
+        self.wasted_seconds = 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "started": self.started,
+            "committed": self.committed,
+            "discarded": self.discarded,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "wasted_seconds": round(self.wasted_seconds, 3),
+            "avg_saved_ms": round(self.saved_seconds / self.committed * 1000, 1) if self.committed else 0.0,
+        }
+
+
+class Speculation(Generic[T]):
+    """ガードレール結果が出る前に開始した処理"""
+
+    def __init__(self, coro: Coroutine[Any, Any, T], stats: SpeculationStats):
+        self._stats = stats
+        self._started_at = time.monotonic()
+        self._finished_at: Optional[float] = None
+        self.task = asyncio.create_task(coro)
+        self.task.add_done_callback(self._on_done)
+        stats.started += 1
+
+    def _on_done(self, _: asyncio.Task) -> None:
+        self._finished_at = time.monotonic()
+
+    def _elapsed(self) -> float:
+        return (self._finished_at or time.monotonic()) - self._started_at
+
+    def commit(self) -> "asyncio.Task[T]":
+        """
+        ガードレール通過直後に呼び出し、結果を待つためのタスクを取得する
+
+        ガードレール待ちと重なっていた処理時間を節約時間として記録する。
+        """
+        self._stats.committed += 1
+        self._stats.saved_seconds += self._elapsed()
+        return self.task
+
+    def discard(self) -> None:
+        """ガードレールで拒否された場合に呼び出し、処理をキャンセルして破棄する"""
+        self.task.cancel()
+        self._stats.discarded += 1
+        self._stats.wasted_seconds += self._elapsed()
+        logger.info(f"Speculative work discarded after {self._elapsed():.3f}s")
+
+
+# シングルトンインスタンス
+speculation_stats = SpeculationStats()
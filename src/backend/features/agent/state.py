@@ -1,14 +1,18 @@
 from typing import Optional
 from typing_extensions import TypedDict
 
+from backend.core.image import ImagePayload
 from backend.features.agent.vision.schema import InitialAnalysis
+from backend.features.agent.vision.serpapi_schema import GoogleLensResponse
 from backend.features.agent.search.schema import SearchNodeOutput
 from backend.features.agent.price.schema import PriceNodeOutput
 
 
 class AgentState(TypedDict):
     messages: list
+    image: Optional[ImagePayload]               # API境界でデコード済みのリクエスト画像
     analysis_result: Optional[InitialAnalysis]  # node_visionの結果
+    lens_result: Optional[GoogleLensResponse]   # node_visionで取得したGoogle Lens結果
     search_output: Optional[SearchNodeOutput]   # node_searchの結果
     price_output: Optional[PriceNodeOutput]     # node_priceの結果
     retry_count: int                            # リトライ回数
\ No newline at end of file
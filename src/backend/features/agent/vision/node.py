@@ -6,16 +6,20 @@ Vision Node - SerpApi Google Lens統合
 """
 
 import asyncio
-import re
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from backend.core.config import settings
+from backend.core.image import ImagePayload
+from backend.core.llm_pool import llm_pool
 from backend.core.logging import get_logger
 from backend.core.serpapi import serpapi_client
+from backend.core.serpapi_cache import lens_cache
 from backend.core.storage import storage_client
+from backend.features.agent.price.node import price_node
+from backend.features.agent.search.node import search_node
+from backend.features.agent.speculation import Speculation, speculation_stats
 from backend.features.agent.state import AgentState
 from backend.features.agent.vision.schema import InitialAnalysis
 from backend.features.agent.vision.serpapi_schema import GoogleLensResponse
@@ -23,23 +27,6 @@ from backend.features.agent.vision.serpapi_schema import GoogleLensResponse
 logger = get_logger(__name__)
 
 
-def _extract_image_base64_from_messages(messages: list) -> Optional[str]:
-    """メッセージから画像Base64を抽出"""
-    for msg in messages:
-        if hasattr(msg, "content") and isinstance(msg.content, list):
-            for content in msg.content:
-                if isinstance(content, dict) and content.get("type") == "image_url":
-                    image_url = content.get("image_url", {})
-                    url = image_url.get("url", "") if isinstance(image_url, dict) else image_url
-                    # data:image/...;base64,... 形式から抽出
-                    if url.startswith("data:image"):
-                        match = re.match(r"data:image/[^;]+;base64,(.+)", url)
-                        if match:
-                            return match.group(1)
-                        return url.split(",", 1)[-1] if "," in url else None
-    return None
-
-
 def _map_lens_result_to_analysis(
     lens_result: GoogleLensResponse,
 ) -> InitialAnalysis:
@@ -88,7 +75,7 @@ def _map_lens_result_to_analysis(
     )
 
 
-async def _check_guardrails(messages: list) -> Optional[InitialAnalysis]:
+async def _check_guardrails(image: ImagePayload) -> Optional[InitialAnalysis]:
     """
     軽量LLMでガードレールチェック
 
@@ -99,14 +86,7 @@ async def _check_guardrails(messages: list) -> Optional[InitialAnalysis]:
         return None
 
     try:
-        llm = ChatGoogleGenerativeAI(
-            model=settings.MODEL_GUARDRAIL,
-            project=settings.GCP_PROJECT_ID,
-            location=settings.GCP_LOCATION,
-            temperature=0,
-            max_tokens=50,
-            vertexai=True,
-        )
+        llm = llm_pool.get(settings.MODEL_GUARDRAIL, temperature=0, max_tokens=50)
 
         guardrail_prompt = """画像に以下が含まれているか確認してください:
 - 人物の顔が明確に写っている（モデル着用の商品写真は除く）
@@ -116,7 +96,10 @@ async def _check_guardrails(messages: list) -> Optional[InitialAnalysis]:
 
 上記のいずれかが含まれていれば「prohibited」、そうでなければ「ok」とだけ回答してください。"""
 
-        guardrail_messages = [SystemMessage(content=guardrail_prompt)] + messages
+        guardrail_messages = [
+            SystemMessage(content=guardrail_prompt),
+            HumanMessage(content=[image.media_block()]),
+        ]
 
         result = await llm.ainvoke(guardrail_messages)
 
@@ -135,14 +118,81 @@ async def _check_guardrails(messages: list) -> Optional[InitialAnalysis]:
         return None
 
 
+async def _search_lens(
+    image: ImagePayload,
+    on_progress: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> GoogleLensResponse:
+    """
+    画像でGoogle Lens検索を実行（レスポンスキャッシュ対応）
+
+    同じ画像・言語・国コードの検索結果がキャッシュにあれば、
+    GCSへのアップロードとSerpApi呼び出しを省略する。
+
+    Args:
+        image: デコード済みの画像
+        on_progress: 進捗メッセージの通知先（ストリーミング用）
+
+    Returns:
+        GoogleLensResponse
+
+    Raises:
+        Exception: GCSへのアップロードに失敗した場合
+    """
+    if settings.SERPAPI_CACHE_ENABLED:
+        cached = await lens_cache.get(image.sha256)
+        if cached is not None:
+            logger.info(f"Lens cache hit: {image.sha256[:12]}")
+            return cached
+
+    if on_progress:
+        await on_progress("画像をアップロード中...")
+
+    # SerpApi用に画像をGCSにアップロード
+    image_url = await storage_client.upload_temp_image_for_serpapi(image)
+
+    if on_progress:
+        await on_progress("Google Lensで類似商品を検索中...")
+
+    # SerpApi Google Lens検索
+    lens_result = await serpapi_client.search_by_image_url(
+        image_url=image_url,
+        search_type="products",
+    )
+
+    if settings.SERPAPI_CACHE_ENABLED:
+        await lens_cache.set(image.sha256, lens_result)
+
+    return lens_result
+
+
+async def _run_downstream_speculatively(
+    analysis: InitialAnalysis,
+    lens_result: GoogleLensResponse,
+) -> dict:
+    """
+    ガードレール待ちの間に search_node（設定によりprice_nodeも）を先行実行する
+
+    Returns:
+        search_output（と price_output）を含む辞書。後続ノードはこれらがあればスキップする。
+    """
+    state: dict = {"analysis_result": analysis, "lens_result": lens_result}
+    state.update(await search_node(state))
+
+    search_output = state["search_output"]
+    if settings.SPECULATIVE_PRICE_ENABLED and search_output.analysis.classification == "mass_product":
+        state.update(await price_node(state))
+
+    state.pop("analysis_result")
+    state.pop("lens_result")
+    return state
+
+
 async def _vision_node_async(state: "AgentState") -> dict:
     """Vision Nodeの非同期実装"""
 
-    messages = state["messages"]
-
-    # Step 1: 画像Base64を抽出
-    image_base64 = _extract_image_base64_from_messages(messages)
-    if not image_base64:
+    # Step 1: API境界でデコード済みの画像を取得
+    image = state.get("image")
+    if image is None:
         logger.error("No image found in messages")
         return {
             "analysis_result": InitialAnalysis(
@@ -154,45 +204,70 @@ async def _vision_node_async(state: "AgentState") -> dict:
         }
 
     # Step 2: ガードレールチェック（並行実行のため先に開始）
-    guardrail_task = asyncio.create_task(_check_guardrails(messages))
+    guardrail_task = asyncio.create_task(_check_guardrails(image))
+    speculation: Optional[Speculation[dict]] = None
 
-    # Step 3: SerpApi用に画像をGCSにアップロード
     try:
-        image_url = await storage_client.upload_temp_image_for_serpapi(image_base64)
-    except Exception as e:
-        logger.error(f"Failed to upload image for SerpApi: {e}")
-        return {
-            "analysis_result": InitialAnalysis(
-                category_type="unknown",
-                confidence="low",
-                reasoning=f"画像のアップロードに失敗しました: {str(e)}",
-                retry_advice="もう一度お試しください。",
+        # Step 3-4: GCSにアップロードしてSerpApi Google Lens検索（キャッシュ対応）
+        try:
+            lens_result = await _search_lens(image)
+        except Exception as e:
+            logger.error(f"Failed to upload image for SerpApi: {e}")
+            return {
+                "analysis_result": InitialAnalysis(
+                    category_type="unknown",
+                    confidence="low",
+                    reasoning=f"画像のアップロードに失敗しました: {str(e)}",
+                    retry_advice="もう一度お試しください。",
+                )
+            }
+
+        # Step 5: Google Lens結果をマッピング
+        analysis = _map_lens_result_to_analysis(lens_result)
+
+        # ガードレール待ちの間に後続ノードを投機実行
+        if (
+            settings.SPECULATIVE_SEARCH_ENABLED
+            and analysis.category_type == "processable"
+            and not guardrail_task.done()
+        ):
+            speculation = Speculation(
+                _run_downstream_speculatively(analysis, lens_result),
+                speculation_stats,
             )
-        }
 
-    # Step 4: SerpApi Google Lens検索
-    lens_result = await serpapi_client.search_by_image_url(
-        image_url=image_url,
-        search_type="products",
-    )
+        # Step 6: ガードレール結果を確認
+        guardrail_result = await guardrail_task
+    except BaseException:
+        # 途中で失敗・キャンセルされた場合は投機実行も破棄する
+        if speculation:
+            speculation.discard()
+        raise
+    finally:
+        # 途中で失敗・キャンセルされた場合はガードレールも止める
+        if not guardrail_task.done():
+            guardrail_task.cancel()
 
-    # Step 5: ガードレール結果を確認
-    guardrail_result = await guardrail_task
     if guardrail_result:
+        if speculation:
+            speculation.discard()
         return {"analysis_result": guardrail_result}
 
-    # Step 6: Google Lens結果をマッピング
-    analysis = _map_lens_result_to_analysis(lens_result)
-
     logger.info(
         f"Vision node completed: category={analysis.category_type}, "
         f"confidence={analysis.confidence}, item={analysis.item_name}"
     )
 
-    return {"analysis_result": analysis}
+    if speculation:
+        return {
+            "analysis_result": analysis,
+            "lens_result": lens_result,
+            **await speculation.commit(),
+        }
+    return {"analysis_result": analysis, "lens_result": lens_result}
 
 
-def vision_node(state: "AgentState") -> dict:
+async def vision_node(state: "AgentState") -> dict:
     """
     Vision Node - SerpApi Google Lens統合
 
@@ -200,18 +275,12 @@ def vision_node(state: "AgentState") -> dict:
     2. SerpApi Google Lensで検索
     3. 軽量LLMでガードレールチェック
     4. 結果をInitialAnalysisにマッピング
+
+    サーバーのイベントループ上で直接実行されるため、
+    リクエストがキャンセルされると処理も即座に中断される。
     """
     try:
-        # 非同期処理を実行
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # 既存のイベントループがある場合（FastAPI内など）
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, _vision_node_async(state))
-                return future.result()
-        else:
-            return asyncio.run(_vision_node_async(state))
+        return await _vision_node_async(state)
 
     except Exception as e:
         logger.error(f"Vision node error: {e}", exc_info=True)
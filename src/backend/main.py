@@ -7,7 +7,12 @@ from fastapi.staticfiles import StaticFiles
 
 from backend.api.v1.router import api_router
 from backend.core.config import settings
+from backend.core.image_pool import image_pool
+from backend.core.llm_pool import llm_pool
 from backend.core.logging import get_logger, setup_logging
+from backend.core.serpapi import serpapi_client
+from backend.core.serpapi_cache import lens_cache
+from backend.core.storage import storage_client
 
 # ロギング初期化
 setup_logging()
@@ -20,9 +25,20 @@ async def lifespan(app: FastAPI):
     logger.info(f"Starting {settings.PROJECT_NAME}")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
     logger.info(f"GCP Project: {settings.GCP_PROJECT_ID}")
+    # Geminiクライアントを事前生成（リクエスト間で共有）
+    llm_pool.warm_up()
+    # 画像処理用のプロセスプールを起動
+    image_pool.start()
+    # SerpApiの共有HTTPクライアント（keep-alive）を生成
+    serpapi_client.start()
     yield
     # 終了時
     logger.info(f"Shutting down {settings.PROJECT_NAME}")
+    llm_pool.clear()
+    image_pool.shutdown()
+    await storage_client.close()
+    await serpapi_client.close()
+    lens_cache.close()
 
 
 app = FastAPI(
@@ -0,0 +1,14 @@
+"""
+テスト共通の設定
+
+設定の必須項目をダミー値で埋める（.envがなくても実行できるように）。
+外部API（Vertex AI・SerpApi・Cloud Storage）は呼び出さない。
+"""
+import os
+
+os.environ.setdefault("GCP_PROJECT_ID", "test-project")
+os.environ.setdefault("GCP_LOCATION", "us-central1")
+os.environ.setdefault("MODEL_VISION_NODE", "gemini-2.5-flash")
+os.environ.setdefault("MODEL_SEARCH_NODE", "gemini-2.5-flash")
+os.environ.setdefault("SERPAPI_API_KEY", "test")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
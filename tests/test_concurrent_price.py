@@ -0,0 +1,22 @@
+"""search と並行した価格調査の採否判定（names_match）"""
+from backend.features.agent.price.concurrent import names_match
+
+
+def test_base_name_matches_name_with_attributes():
+    # search は特定した商品名にカンマ区切りで属性を付ける
+    assert names_match("NIKE Air Max 90", "NIKE Air Max 90, 白", 0.6)
+    assert names_match("iPhone 15 Pro", "iPhone 15 Pro, 256GB, ブラック", 0.6)
+
+
+def test_more_detailed_guess_matches():
+    assert names_match("NIKE Air Max 90 白", "NIKE Air Max 90", 0.6)
+
+
+def test_guess_missing_model_tokens_does_not_match():
+    assert not names_match("iPhone", "iPhone 15 Pro 256GB", 0.6)
+    assert not names_match("NIKE Air Max", "NIKE Air Max 90, 白", 0.6)
+
+
+def test_different_products_do_not_match():
+    assert not names_match("Canon EOS", "Nikon D750", 0.6)
+    assert not names_match("", "Nikon D750", 0.6)
@@ -0,0 +1,47 @@
+"""画像品質ゲート（被写体の占有率）"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from backend.core.image import ImagePayload, InvalidImageError
+from backend.core.image_quality import ImageQualityGate, measure_quality
+
+ANALYSIS_EDGE = 384
+
+
+def _payload(img: Image.Image) -> ImagePayload:
+    output = io.BytesIO()
+    img.save(output, format="PNG")
+    return ImagePayload.from_bytes(output.getvalue())
+
+
+def _texture(width: int, height: int, base: int, amplitude: int, seed: int = 0) -> Image.Image:
+    """base の色に ±amplitude のノイズを加えた画像"""
+    rng = np.random.default_rng(seed)
+    pixels = base + rng.integers(-amplitude, amplitude + 1, size=(height, width, 3))
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def test_full_frame_subject_has_unknown_coverage_and_passes():
+    # 商品が画面いっぱいに写っている（外周の色が被写体の色になる）
+    report = measure_quality(_payload(_texture(1024, 768, 120, 12)), ANALYSIS_EDGE)
+    assert report.coverage is None
+
+    gate = ImageQualityGate()
+    gate.evaluate(report)
+    assert gate.rejected["small_subject"] == 0
+    assert gate.stats()["coverage_unknown"] == 1
+
+
+def test_small_subject_is_rejected():
+    img = Image.new("RGB", (1024, 768), (230, 230, 230))
+    img.paste(_texture(120, 120, 100, 60), (450, 300))
+    report = measure_quality(_payload(img), ANALYSIS_EDGE)
+    assert report.coverage is not None and report.coverage < 0.05
+
+    gate = ImageQualityGate()
+    with pytest.raises(InvalidImageError):
+        gate.evaluate(report)
+    assert gate.rejected["small_subject"] == 1
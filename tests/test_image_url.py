@@ -0,0 +1,40 @@
+"""査定画像URLの署名"""
+import pytest
+
+from backend.core.config import settings
+from backend.core.image_url import ImageUrlSigner
+
+
+def _verify(signer: ImageUrlSigner, query: dict[str, str], appraisal_id: str = "a1") -> bool:
+    size = int(query["size"]) if "size" in query else None
+    return signer.verify(query["uid"], appraisal_id, size, int(query["expires"]), query["signature"])
+
+
+def test_url_verifies_after_reinitialisation_with_same_key():
+    query = ImageUrlSigner("shared-key").sign("u1", "a1", size=128)
+    # 再起動後・別インスタンスを想定して作り直す
+    assert _verify(ImageUrlSigner("shared-key"), query)
+
+
+def test_url_signed_with_other_key_is_rejected():
+    query = ImageUrlSigner("key-1").sign("u1", "a1")
+    assert not _verify(ImageUrlSigner("key-2"), query)
+
+
+def test_tampered_or_expired_url_is_rejected():
+    signer = ImageUrlSigner("shared-key")
+    query = signer.sign("u1", "a1", size=128)
+    assert not _verify(signer, query, appraisal_id="a2")
+    assert not _verify(signer, {**query, "uid": "u2"})
+    assert not _verify(signer, {**query, "size": "512"})
+    assert not signer.verify("u1", "a1", 128, 1000, query["signature"])
+
+
+def test_key_is_required_outside_development(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_URL_SIGNING_KEY", "")
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+    with pytest.raises(RuntimeError):
+        ImageUrlSigner()
+
+    monkeypatch.setattr(settings, "IMAGE_URL_SIGNING_KEY", "configured")
+    assert _verify(ImageUrlSigner(), ImageUrlSigner().sign("u1", "a1"))
@@ -0,0 +1,54 @@
+"""価格キャッシュ（同じ商品の同時計算の合流）"""
+import asyncio
+
+from backend.core.singleflight import SingleFlight
+from backend.features.agent.price.cache import PriceCache
+from backend.features.agent.price.schema import PriceNodeOutput, Valuation
+
+
+class CountingCache(PriceCache):
+    """保存回数を数えるキャッシュ"""
+
+    def __init__(self):
+        super().__init__(
+            max_entries=10,
+            fresh_seconds=60,
+            stale_seconds=120,
+            flight=SingleFlight("price-test"),
+        )
+        self.stores = 0
+
+    def store(self, identified_product, output):
+        self.stores += 1
+        super().store(identified_product, output)
+
+
+def _output() -> PriceNodeOutput:
+    return PriceNodeOutput(
+        status="complete",
+        valuation=Valuation(min_price=1000, max_price=2000, currency="JPY", confidence="high"),
+        display_message="ok",
+    )
+
+
+def test_only_leader_stores_and_followers_are_reported_as_shared():
+    cache = CountingCache()
+    calls = 0
+
+    async def compute() -> PriceNodeOutput:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return _output()
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.compute_shared("NIKE Air Max 90", compute) for _ in range(3))
+        )
+
+    leader, *followers = asyncio.run(main())
+    assert calls == 1
+    assert cache.stores == 1
+    assert not leader.from_cache
+    assert all(output.from_cache for output in followers)
+    assert cache.stats()["shared"] == 2
@@ -0,0 +1,19 @@
+"""分類の高速パス（主要なECサイト・フリマの判定）"""
+from backend.features.agent.search.fast_path import is_marketplace
+from backend.features.agent.vision.serpapi_schema import GoogleLensVisualMatch
+
+
+def _match(link: str, source: str) -> GoogleLensVisualMatch:
+    return GoogleLensVisualMatch(position=1, title="NIKE Air Max 90", link=link, source=source)
+
+
+def test_yahoo_marketplaces_are_marketplaces():
+    assert is_marketplace(_match("https://auctions.yahoo.co.jp/item/x1", "Yahoo!オークション"))
+    assert is_marketplace(_match("https://paypayfleamarket.yahoo.co.jp/item/z1", "Yahoo!フリマ"))
+    assert is_marketplace(_match("https://example.com/x", "ヤフオク!"))
+
+
+def test_other_yahoo_pages_are_not_marketplaces():
+    assert not is_marketplace(_match("https://news.yahoo.co.jp/articles/1", "Yahoo!ニュース"))
+    assert not is_marketplace(_match("https://search.yahoo.co.jp/search?p=nike", "Yahoo! JAPAN"))
+    assert not is_marketplace(_match("https://detail.chiebukuro.yahoo.co.jp/q/1", "Yahoo!知恵袋"))
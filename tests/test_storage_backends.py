@@ -0,0 +1,17 @@
+"""ストレージバックエンドの共通インターフェース"""
+import pytest
+
+from backend.core.storage_backends import MemoryStorageBackend, StorageBackend
+
+
+def test_incomplete_backend_fails_on_instantiation():
+    class UploadOnlyBackend(StorageBackend):
+        async def upload(self, path: str, data: bytes, content_type: str) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        UploadOnlyBackend()
+
+
+def test_memory_backend_implements_interface():
+    assert isinstance(MemoryStorageBackend(), StorageBackend)